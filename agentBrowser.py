@@ -21,40 +21,46 @@ This code looks for subfolders too, so if you store your .FBX motion clips
 in the same directory as your .FBX agents you may get some unexpected results.
 
 In order to avoid that, make sure to have ONLY YOUR .FBX CHARACTERS in the
-Agent Directory.
+Agent Directory, or add the folders of your motion clips to the 'EXCLUDE' variable.
 
 * If you are using HOUDINI 18.5, replace the 'copysourcelayer1' parameter
 by 'sourcecopy' so that it can be run in the old AGENT LAYER node.
+
+* This tool needs 'agentCatalog.py', 'directoryScanner.py', 'networkBuilder.py' and 'shelfProfiler.py'
+to be in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs).
 """
 
 # Import built-in modules.
-from collections import OrderedDict
-import os
 import sys
 
+# Import local modules.
+import agentCatalog
+import networkBuilder
+import shelfProfiler
+
 # This is where your Agents are stored.
 AGENT_DIR = "F:/3D/modelos"
 
-# Dictionary to store Agent names and file paths.
-agents = OrderedDict()
-
-# Iterate the Agent Directory and get its path, subdirectories and files.
-for path,subdirs,files in os.walk(AGENT_DIR):
-   
-    # Iterate .FBX files and store their names and paths in the dictionary.
-    for file in files:
-        if file.endswith(".fbx"):
-            agent_name = file.split(".")
-            agent_name = agent_name[0]
-            filepath = os.path.join(path, file)
-            agents[agent_name] = filepath
+# Files and folders to skip in the Agent Directory (e.g: "clips" for your motion clips),
+# and how many folders deep to look (None: no limit).
+EXCLUDE = ()
+MAX_DEPTH = None
+
+# List of (Agent name, file path), one per .FBX file (names may repeat across folders).
+# NOTE: They are read from the catalog of the Agent Directory (see 'agentCatalog.py'),
+# which only looks again at the folders that changed since the last launch.
+with shelfProfiler.phase("search fbx"):
+    with agentCatalog.AgentCatalog(AGENT_DIR, exclude=EXCLUDE, max_depth=MAX_DEPTH) as catalog:
+        catalog.refresh()
+        agents = catalog.agents()
             
-# Unpack names and paths from the dictionary and store them in lists.
+# Unpack names and paths from the (name, path) list and store them in lists.
 agent_list = []
-[agent_list.append(agent_name) for agent_name in agents.keys()]
+[agent_list.append(agent_name) for agent_name, filepath in agents]
 
 file_list = []
-[file_list.append(filepath) for filepath in agents.values()]
+[file_list.append(filepath) for agent_name, filepath in agents]
 
 # Open a "Select from list" window and ask the user to choose one or more agents.
 # NOTE: The output will be a tuple with index(es).
@@ -79,6 +85,10 @@ agent_setup_node = hou.node(f"{obj.path()}/{geo_node_name}")
 if not agent_setup_node:
     agent_setup_node = obj.createNode("geo", geo_node_name)
    
+# Queue every node in a Network Builder and create them all at once at the end
+# (single undo group, no recooks while building).
+builder = networkBuilder.NetworkBuilder("Agent Browser")
+
 # Iterate every index in the "selected_agents" tuple.
 for index in selected_agents:
 
@@ -87,42 +97,49 @@ for index in selected_agents:
 
     # If the Agent node doesn't exist, create it.
     if not agent_node:
-        agent_node = agent_setup_node.createNode("agent", agent_list[index])
-       
-        # Set the Agent Name.
-        agent_node.parm("agentname").set("$OS")
-       
-        # Set the Input as FBX and the corresponding file path.
-        agent_node.parm("input").set(2)
-        agent_node.parm("fbxfile").set(file_list[index])
-        agent_node.parm("fbxclipname").set("tpose")
+        # Set the Agent Name, the Input as FBX and the corresponding file path.
+        agent_node = builder.create_node(
+            agent_setup_node, "agent", agent_list[index],
+            parms={
+                "agentname": "$OS",
+                "input": 2,
+                "fbxfile": file_list[index],
+                "fbxclipname": "tpose"})
    
         # Create an Agent Clip node and connect it to the Agent node.
-        agent_clip_node = agent_setup_node.createNode("agentclip", f"{agent_list[index]}_clips")
-        agent_clip_node.setInput(0, agent_node)
+        agent_clip_node = builder.create_node(
+            agent_setup_node, "agentclip", f"{agent_list[index]}_clips",
+            inputs=[agent_node])
 
         # Create an Agent Layer node, connect it to the Agent Clip node,
         # and activate the Source Layer checkbox so we can see the character.
-        agent_layer_node = agent_setup_node.createNode("agentlayer", f"{agent_list[index]}_layer")
-        agent_layer_node.setInput(0, agent_clip_node)
-        agent_layer_node.parm("copysourcelayer1").set(1)
+        agent_layer_node = builder.create_node(
+            agent_setup_node, "agentlayer", f"{agent_list[index]}_layer",
+            parms={"copysourcelayer1": 1},
+            inputs=[agent_clip_node])
 
         # Create an Agent Prep node and connect it to the Agent Layer node.
-        agent_prep_node = agent_setup_node.createNode("agentprep", f"{agent_list[index]}_prep")
-        agent_prep_node.setInput(0, agent_layer_node)
+        agent_prep_node = builder.create_node(
+            agent_setup_node, "agentprep", f"{agent_list[index]}_prep",
+            inputs=[agent_layer_node])
 
         # Create an OUT (Null) node and connect it to the Agent Prep node.
-        out_node = agent_setup_node.createNode("null", f"OUT_{agent_list[index]}")
-        out_node.setInput(0, agent_prep_node)
+        out_node = builder.create_node(
+            agent_setup_node, "null", f"OUT_{agent_list[index]}",
+            inputs=[agent_prep_node])
         
         # Activate the Display/Render flags and set the color to black.
-        out_node.setDisplayFlag(True)
-        out_node.setRenderFlag(True)
-        out_node.setColor(hou.Color((0, 0, 0)))
-
-        # Layout nodes inside "agentSetup".
-        agent_setup_node.layoutChildren()
+        builder.call(lambda node: node.setDisplayFlag(True), out_node)
+        builder.call(lambda node: node.setRenderFlag(True), out_node)
+        builder.call(lambda node: node.setColor(hou.Color((0, 0, 0))), out_node)
 
     # If the Agent node already exists in the scene, let the user know.
     else:
         hou.ui.displayMessage(f"The agent «{agent_list[index]}» is already in your scene.")
+
+# Layout nodes inside "agentSetup" and create every queued node.
+builder.layout(agent_setup_node)
+builder.apply()
+
+# Show how long every phase took (if profiling is enabled).
+shelfProfiler.report("Agent Browser")
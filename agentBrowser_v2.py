@@ -10,16 +10,25 @@ in the scene.
 
 HOW IT WORKS
 ------------
-When you launch the tool for the first time, it will go through your
-Agent Directory and generate the thumbnails (it may take a few seconds).
+A window opens right away with your characters displayed in a grid.
 
-Then a window will open with all your characters displayed in a grid.
+The tool goes through your Agent Directory in the background, and the
+characters appear in the grid as they are found. The characters found are
+stored in a catalog (see 'agentCatalog.py'), so the next launches show them
+immediately and only look again at the folders that changed.
+
+When the scan is done, the tool generates the missing thumbnails, and
+regenerates the ones older than their .FBX file. They are rendered by a few
+headless 'hython' processes in the background (see 'thumbnailWorker.py'),
+so you can keep working while a progress bar fills up (or cancel it), and
+every thumbnail shows up in the grid as soon as it's ready. Without 'hython',
+they are rendered in this session instead.
 
 Click on the character you want to add as Agent, and the tool will
 automatically set up the Agent nodes for you. A green line will appear
 below the character to let you know that it is already in your scene.
 
-Feel free to change the 'AGENT_DIR' variable in the ThumbnailGenerator()
+Feel free to change the 'agent_dir' variable in the ThumbnailGenerator()
 class with your own Agent Directory.
 
 IMPORTANT
@@ -27,20 +36,38 @@ IMPORTANT
 This code looks for subfolders too, so if you store your .FBX motion clips
 in the same directory as your .FBX agents you may get some unexpected results.
 In order to avoid that, make sure to have ONLY YOUR .FBX CHARACTERS in the
-Agent Directory, each in its own folder.
+Agent Directory, each in its own folder (or add the folders of your motion clips
+to the 'self.exclude' variable in the ThumbnailGenerator() class).
 
 * If you are using HOUDINI 18.5, replace the .items() method by .iteritems()
 so that it can be run in PYTHON 2.7.
 
 * Replace also the 'copysourcelayer1' parameter by 'sourcecopy' so that it works
 with the old version of the Agent Layer node.
+
+* This tool needs 'agentCatalog.py', 'agentGridView.py', 'directoryScanner.py', 'hythonProcess.py',
+'networkBuilder.py', 'shelfProfiler.py' and 'thumbnailWorker.py' to be in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs).
 """
 
 # Import built-in modules.
-from collections import OrderedDict
-import os
-from PySide2 import QtGui, QtWidgets, QtCore
-import sys
+from PySide2 import QtWidgets, QtCore
+import json
+import queue
+import threading
+
+# Import local modules.
+import agentCatalog
+import agentGridView
+import hythonProcess
+import networkBuilder
+import shelfProfiler
+import thumbnailWorker
+
+# How often the grid is filled with the characters found (in milliseconds),
+# and the maximum number of characters added at once.
+FILL_INTERVAL = 50
+FILL_BATCH = 500
 
 
 class ThumbnailGenerator():
@@ -53,65 +80,54 @@ class ThumbnailGenerator():
     """
 
     
-    def check_thumbnails(self):
-        """Check if all .FBX files have a thumbnail, and if not, generate them."""
+    def __init__(self):
+        """Open the catalog of the Agent Directory."""
         # This is where your Agents are stored.
         self.agent_dir = "F:/3D/modelos"
 
-        # Initialize lists and a dictionary.
-        fbx_files, jpeg_files = [], []
-        self.need_thumbnail = {}
+        # Files and folders to skip in the Agent Directory (e.g: "clips" for your motion clips),
+        # and how many folders deep to look (None: no limit).
+        self.exclude = ()
+        self.max_depth = None
 
-        # Iterate the Agent Directory and get its path, subdirectories and files.
-        for path, subdirs, files in os.walk(self.agent_dir):
+        # Open the catalog (the characters found in previous launches).
+        self.catalog = agentCatalog.AgentCatalog(
+            self.agent_dir, exclude=self.exclude, max_depth=self.max_depth)
 
-            # Iterate every file in the Agent Directory.
-            for file in files:
-               
-                # If it's an .FBX, append it to the "fbx_files" list.
-                if file.endswith(".fbx"):        
-                    fbx_files.append(file)
-       
-                # If it's a .JPEG, append it to the "jpeg_files" list.
-                elif file.endswith(".jpeg"):            
-                    jpeg_files.append(file)
 
-        # Iterate every .FBX file in the "fbx_files" list.
-        for fbx_file in fbx_files:
+    @shelfProfiler.profiled("scan agents")
+    def scan(self, found):
+        """Bring the catalog of the Agent Directory up to date.
 
-            # If this .FBX file doesn't have a thumbnail,
-            # store its filename and path in the dictionary.
-            if fbx_file.replace("fbx","jpeg") not in jpeg_files:
-                agent_name = fbx_file.split(".")
-                agent_name = agent_name[0]
-                fbx_path = os.path.join(self.agent_dir, agent_name, fbx_file).replace("\\","/")
-                self.need_thumbnail[agent_name] = fbx_path                
+        'found' is called with a list of (name, path) characters for every folder listed.
+        Runs in a background thread, so it uses its own connection to the catalog.
+        """
+        # NOTE: Only the folders that changed since the last launch are listed again,
+        # many at the same time (see 'directoryScanner.py').
+        with agentCatalog.AgentCatalog(
+                self.agent_dir, exclude=self.exclude, max_depth=self.max_depth) as catalog:
+            catalog.refresh(found=found)
 
-        # Run SETUP_SCENE() and SETUP_NODES()
-        # for those .FBX that don't have a thumbnail.
-        if self.need_thumbnail:                              
-            self.setup_scene()
-            self.setup_nodes()
+
+    @shelfProfiler.profiled("check thumbnails")
+    def check_thumbnails(self):
+        """Return the (name, path) of the .FBX files without an up-to-date thumbnail."""
+        # Store the name and path of every .FBX file without a thumbnail,
+        # or with a thumbnail older than the .FBX file (i.e: the character was updated).
+        self.need_thumbnail = self.catalog.stale_thumbnails()
+
+        return self.need_thumbnail
 
 
+    @shelfProfiler.profiled("search fbx")
     def search_fbx(self):
-        """Search for .FBX files and store them in a dictionary."""
-        # Dictionary to store Agent names and file paths.
-        self.fbx_dict = OrderedDict()
-
-        # Iterate the Agent Directory and get its path, subdirectories and files.
-        for path, subdirs, files in os.walk(self.agent_dir):
-
-            # Iterate .FBX files and store their names and paths in the dictionary.
-            for file in files:
-                if file.endswith(".fbx"):
-                    agent_name = file.split(".")
-                    agent_name = agent_name[0]
-                    filepath = os.path.join(path, file).replace('\\','/')
-                    self.fbx_dict[agent_name] = filepath
-
-        # Return the dictionary (we'll need it later when generating the UI).
-        return self.fbx_dict
+        """Search for .FBX files and store them in a list."""
+        # List of (Agent name, file path) read from the catalog.
+        # NOTE: Several folders may hold characters with the same name.
+        self.fbx_list = self.catalog.agents()
+
+        # Return the list (we'll need it later when generating the UI).
+        return self.fbx_list
    
        
     def setup_scene(self):
@@ -128,6 +144,7 @@ class ThumbnailGenerator():
         self.viewport.changeType(hou.geometryViewportType.Front)
 
 
+    @shelfProfiler.profiled("setup nodes")
     def setup_nodes(self):    
         """Generate the nodes you need to take a screenshot of the Agent."""
         # Display a status message in Houdini.
@@ -137,8 +154,8 @@ class ThumbnailGenerator():
         # /obj context.
         obj = hou.node("/obj/")
        
-        # Iterate every item in the "need_thumbnail" dictionary.
-        for agent, filepath in self.need_thumbnail.items():
+        # Iterate every item in the "need_thumbnail" list.
+        for agent, filepath in self.need_thumbnail:
             # Create a Geometry node.
             geo = obj.createNode("geo",f"agent_{agent}")
            
@@ -176,7 +193,7 @@ class ThumbnailGenerator():
 
             # Set the output path and file format.
             opengl_node.parm("camera").set(cam_node.path())
-            opengl_node.parm("picture").set(filepath.replace("fbx","jpeg"))
+            opengl_node.parm("picture").set(agentCatalog.thumbnail_path(filepath))
             opengl_node.parm("vobjects").set(geo.name())
            
             # Run the OpenGL render.
@@ -199,14 +216,108 @@ class ThumbnailGenerator():
     def run(self):
         """Run the CHECK_THUMBNAILS() method.
 
-        If any thumbnail is missing, it will trigger the rest of the program.
+        If any thumbnail is missing, it will trigger the rest of the program
+        (rendering the thumbnails in this session).
         """
-        self.check_thumbnails()
+        # Run SETUP_SCENE() and SETUP_NODES()
+        # for those .FBX that need a new thumbnail.
+        if self.check_thumbnails():
+            self.setup_scene()
+            self.setup_nodes()
 
 
-# Create an instance of the ThumbnailGenerator class and launch it.
+# Create an instance of the ThumbnailGenerator class.
+# NOTE: It's launched by the Agent Browser once the Agent Directory has been scanned.
 thumbnail_generator = ThumbnailGenerator()
-thumbnail_generator.run()
+
+
+class ThumbnailWorkers(QtCore.QObject):
+    """
+    Render thumbnails in a few headless 'hython' processes (see 'thumbnailWorker.py'),
+    without blocking Houdini.
+    """
+
+    # Emitted with the .FBX path and the error ("" if it worked) of every thumbnail done.
+    thumbnailDone = QtCore.Signal(str, str)
+
+    # Emitted once every worker is done, with True if they were cancelled.
+    finished = QtCore.Signal(bool)
+
+
+    def __init__(self, hython, parent=None):
+        """Store the 'hython' executable."""
+        super(ThumbnailWorkers, self).__init__(parent)
+        self.hython = hython
+        self.processes = []
+        self.pending = set()
+
+
+    def start(self, fbx_paths):
+        """Split the .FBX files across the workers and start them."""
+        fbx_paths = list(fbx_paths)
+        self.pending = set(fbx_paths)
+
+        # One shard of files per worker (each worker renders its files one at a time).
+        workers = min(thumbnailWorker.worker_count(), len(fbx_paths))
+        for shard in (fbx_paths[i::workers] for i in range(workers)):
+            process = QtCore.QProcess(self)
+            process.setProcessChannelMode(QtCore.QProcess.SeparateChannels)
+            process.readyReadStandardOutput.connect(lambda process=process: self.read_output(process))
+            process.finished.connect(lambda *args, process=process: self.process_finished(process))
+            process.errorOccurred.connect(
+                lambda error, process=process:
+                    error == QtCore.QProcess.FailedToStart and self.process_finished(process))
+            process.start(self.hython, thumbnailWorker.worker_arguments())
+
+            # Send the list of files through stdin (it may be too long for a command line).
+            process.write(json.dumps(shard).encode("utf-8"))
+            process.closeWriteChannel()
+
+            self.processes.append(process)
+
+
+    def read_output(self, process):
+        """Emit 'thumbnailDone' for every result printed by a worker."""
+        while process.canReadLine():
+            line = bytes(process.readLine()).decode("utf-8", "replace")
+            result = thumbnailWorker.parse_result(line)
+
+            if result is not None and result["fbx"] in self.pending:
+                self.pending.discard(result["fbx"])
+                self.thumbnailDone.emit(result["fbx"], result["error"])
+
+
+    def process_finished(self, process):
+        """Forget a worker once it's done, and emit 'finished' after the last one."""
+        if process not in self.processes:
+            return
+
+        self.read_output(process)
+        self.processes.remove(process)
+
+        if not self.processes:
+            # Files left by workers that crashed are reported as errors
+            # (and the thumbnails they were rendering are removed).
+            for fbx_path in sorted(self.pending):
+                thumbnailWorker.remove_partial(fbx_path)
+                self.thumbnailDone.emit(fbx_path, f"{fbx_path}: the worker stopped before rendering it.")
+            self.pending.clear()
+            self.finished.emit(False)
+
+
+    def cancel(self):
+        """Stop every worker (thumbnails already rendered are kept)."""
+        processes, self.processes = self.processes, []
+        for process in processes:
+            process.kill()
+            process.waitForFinished(1000)
+
+        # Remove the thumbnails the workers were rendering when they were killed.
+        for fbx_path in self.pending:
+            thumbnailWorker.remove_partial(fbx_path)
+
+        self.pending.clear()
+        self.finished.emit(True)
 
 
 class AgentBrowser(QtWidgets.QWidget):
@@ -243,47 +354,177 @@ class AgentBrowser(QtWidgets.QWidget):
 
         # Run the search filter.
         self.search_filter()
-       
-        # Create the main scroll area.
-        self.scrollMain = QtWidgets.QScrollArea()
-        self.scrollMain.setWidgetResizable(True)
+
+        # Create the grid of characters.
+        # NOTE: Only the visible characters are drawn, and their thumbnails
+        # are loaded the first time they are visible.
+        self.grid = agentGridView.AgentGrid()
+        self.grid.agentClicked.connect(self.import_agent)
 
         # Generate a new style for the Scroll Bar.
         scrollStyle = "QScrollBar {"
         scrollStyle += "border: 1px solid grey;"
         scrollStyle += "background: #454545;"
         scrollStyle += "}"
-       
-        # Apply the new stylesheet to the main scroll area.
-        self.scrollMain.setStyleSheet(scrollStyle)
-               
-        # Add a Grid Layout to the main scroll area.
-        self.scrollMainLayout = QtWidgets.QGridLayout()
-        self.scrollMain.setLayout(self.scrollMainLayout)        
-       
-        # Create the main widget where we will store everything.
-        self.mainWidget = QtWidgets.QWidget()
-       
-        # Add a Grid Layout to the main widget.
-        self.mainWidgetLayout = QtWidgets.QGridLayout()        
-        self.mainWidget.setLayout(self.mainWidgetLayout)
-               
-        # Link the main widget to the main scroll area.
-        self.scrollMain.setWidget(self.mainWidget)
-       
-        # Add the main scroll area to the main window layout.
-        self.windowLayout.addWidget(self.scrollMain)      
-                     
-        # Initialize counters - this will help us know when to start a new row.
-        self.across, self.down = 0, 0
-       
-        # Create a Button Group.
-        self.buttonGroup = QtWidgets.QButtonGroup()
-       
-        # Run ADD_BUTTON() for each Agent in the dictionary.
-        # NOTE: The dictionary is first put in alphabetical order.
-        for i, (agent_in_dict, filepath_in_dict) in enumerate(sorted(thumbnail_generator.search_fbx().items())):
-            self.add_button(i, agent_in_dict, filepath_in_dict)                                                                                
+
+        # Apply the new stylesheet to the grid.
+        self.grid.setStyleSheet(scrollStyle)
+
+        # Add the grid to the main window layout.
+        self.windowLayout.addWidget(self.grid)
+
+        # Add a progress bar and a "Cancel" button, shown while thumbnails are rendered.
+        self.thumbnailsWidget = QtWidgets.QWidget()
+        self.thumbnailsWidgetLayout = QtWidgets.QHBoxLayout()
+        self.thumbnailsWidgetLayout.setContentsMargins(0, 0, 0, 0)
+        self.thumbnailsWidget.setLayout(self.thumbnailsWidgetLayout)
+
+        self.progressBar = QtWidgets.QProgressBar()
+        self.progressBar.setFormat("Rendering thumbnails: %v/%m")
+        self.thumbnailsWidgetLayout.addWidget(self.progressBar)
+
+        self.cancelButton = QtWidgets.QPushButton("Cancel")
+        self.cancelButton.clicked.connect(self.cancel_thumbnails)
+        self.thumbnailsWidgetLayout.addWidget(self.cancelButton)
+
+        self.thumbnailsWidget.hide()
+        self.windowLayout.addWidget(self.thumbnailsWidget)
+        self.thumbnailWorkers = None
+
+        # Mark the Agents that are already in your scene.
+        self.update_agents_in_scene()
+
+        # Show the characters found in previous launches right away.
+        self.grid.add_agents(thumbnail_generator.search_fbx())
+
+        # >>> Scan the Agent Directory.
+        self.start_scan()
+
+
+    def start_scan(self):
+        """Scan the Agent Directory in a background thread, and add the characters to the grid as they are found."""
+        # The scanner puts every batch of characters found in a queue, and a
+        # timer moves them to the grid (the UI can only be changed from this thread).
+        # NOTE: None in the queue means that the scan is over.
+        self.foundQueue = queue.Queue()
+
+        def scan():
+            try:
+                thumbnail_generator.scan(self.foundQueue.put)
+            finally:
+                self.foundQueue.put(None)
+
+        self.scanThread = threading.Thread(target=scan, daemon=True)
+        self.scanThread.start()
+
+        self.fillTimer = QtCore.QTimer(self)
+        self.fillTimer.setInterval(FILL_INTERVAL)
+        self.fillTimer.timeout.connect(self.fill_grid)
+        self.fillTimer.start()
+
+
+    def fill_grid(self):
+        """Add the characters found since the last call to the grid (in a single batch)."""
+        batch, finished = [], False
+        while len(batch) < FILL_BATCH:
+            try:
+                agents = self.foundQueue.get_nowait()
+            except queue.Empty:
+                break
+
+            if agents is None:
+                finished = True
+                break
+
+            batch.extend(agents)
+
+        if batch:
+            self.grid.add_agents(batch)
+
+        if finished:
+            self.fillTimer.stop()
+            self.scan_finished()
+
+
+    def scan_finished(self):
+        """Remove the characters that don't exist anymore, and generate the missing thumbnails."""
+        # NOTE: The grid is keyed by path, so keep every path in the catalog
+        # (characters with the same name in different folders are all kept).
+        self.grid.keep_agents(thumbnail_generator.catalog.paths())
+
+        # Show how long the scan took (if profiling is enabled).
+        shelfProfiler.report("Agent Browser scan")
+
+        # >>> Generate the missing (or outdated) thumbnails.
+        need_thumbnail = thumbnail_generator.check_thumbnails()
+        if need_thumbnail:
+            self.render_thumbnails(path for name, path in need_thumbnail)
+
+
+    def render_thumbnails(self, fbx_paths):
+        """Render thumbnails in background workers, and show each one in the grid as soon as it's ready."""
+        fbx_paths = list(fbx_paths)
+        hython = hythonProcess.hython_path()
+
+        # Without 'hython', render them in this session (blocking Houdini until they are done).
+        if not hython:
+            thumbnail_generator.setup_scene()
+            thumbnail_generator.setup_nodes()
+            self.grid.reload_thumbnails(fbx_paths)
+            return
+
+        self.thumbnailErrors = []
+        self.thumbnailsRendered = 0
+        self.progressBar.setRange(0, len(fbx_paths))
+        self.progressBar.setValue(0)
+        self.thumbnailsWidget.show()
+
+        self.thumbnailWorkers = ThumbnailWorkers(hython, self)
+        self.thumbnailWorkers.thumbnailDone.connect(self.thumbnail_done)
+        self.thumbnailWorkers.finished.connect(self.thumbnails_finished)
+        self.thumbnailWorkers.start(fbx_paths)
+
+
+    def thumbnail_done(self, fbx_path, error):
+        """Show a new thumbnail in the grid and move the progress bar."""
+        if error:
+            self.thumbnailErrors.append(error)
+        else:
+            self.thumbnailsRendered += 1
+            self.grid.reload_thumbnails([fbx_path])
+
+        self.progressBar.setValue(self.progressBar.value() + 1)
+
+
+    def cancel_thumbnails(self):
+        """Stop rendering thumbnails (the missing ones are rendered the next time)."""
+        if self.thumbnailWorkers is not None:
+            self.thumbnailWorkers.cancel()
+
+
+    def thumbnails_finished(self, cancelled):
+        """Hide the progress bar and let the user know how it went."""
+        self.thumbnailsWidget.hide()
+        self.thumbnailWorkers = None
+
+        if cancelled:
+            hou.ui.setStatusMessage(
+                f"Thumbnails cancelled: {self.thumbnailsRendered} of "
+                f"{self.progressBar.maximum()} rendered.",
+                severity=hou.severityType.Warning)
+        elif self.thumbnailErrors:
+            hou.ui.setStatusMessage(
+                f"{len(self.thumbnailErrors)} thumbnails couldn't be generated: "
+                + "; ".join(self.thumbnailErrors[:3]),
+                severity=hou.severityType.Warning)
+        else:
+            hou.ui.setStatusMessage("Thumbnails have been successfully generated.")
+
+
+    def closeEvent(self, event):
+        """Stop rendering thumbnails when the window is closed."""
+        self.cancel_thumbnails()
+        super(AgentBrowser, self).closeEvent(event)
 
 
     def search_filter(self):
@@ -310,98 +551,21 @@ class AgentBrowser(QtWidgets.QWidget):
 
 
     def update_grid(self, text):
-        """Show only the buttons whose name matches the search filter input."""
+        """Show only the characters whose name matches the search filter input."""
+        self.grid.set_filter(text)
 
-        # Iterate every button in the group.
-        for button in self.buttonGroup.buttons():
-            # If the search filter input matches the text on the button, show it.
-            if text.lower() in button.text().lower():
-                button.show()
-            # If it doesn't match, hide the button.
-            else:
-                button.hide()
 
-
-    def update_button_color(self, button, agent_in_dict):
+    def update_agents_in_scene(self):
         """
-        Check if the Agent is already in your scene.        
-        If so, change the button color to green.
+        Check which Agents are already in your scene.
+        The grid draws a green line below them.
         """
-        # Store in a list the Agents that are already in your scene.
+        # Store the Agents that are already in your scene.
         agents_in_scene = [node.parm("agentname").eval() for node in hou.nodeType("Sop/agent").instances()]
-
-        # If the Agent for whom we are generating the button is in the list,
-        # change the style of that button.
-        if agent_in_dict in agents_in_scene:
-            # Generate a new style for the Tool Button.
-            newStyle = "QToolButton {"
-            newStyle += "border-style: hidden;"
-            newStyle += "padding: 5px;"
-            newStyle += "border-bottom: 5px solid green;"
-            newStyle += "}"
-           
-            newStyle += "QToolButton:hover {"
-            newStyle += "background-color: #545454;"
-            newStyle += "}"
-
-            # Apply the new stylesheet to the Tool Button.
-            button.setStyleSheet(newStyle)
+        self.grid.set_in_scene(agents_in_scene)
 
 
-    def add_button(self, i, agent_in_dict, filepath_in_dict):
-        """
-        Create a Tool Button with the Agent's name and thumbnail,
-        then add it to the Main Widget Layout.
-        """
-        # Create a Tool Button and add it to the button group.
-        # The index of this button will be the iterator 'i'.
-        self.button = QtWidgets.QToolButton()
-        self.buttonGroup.addButton(self.button, i)
-
-        # Set the button style to "Text Under Icon".
-        self.button.setToolButtonStyle(QtCore.Qt.ToolButtonTextUnderIcon)
-
-        # The text on the button will be the Agent's name.
-        self.button.setText(agent_in_dict)
-       
-        # Create an Icon and link it to the Agent's thumbnail.
-        icon = QtGui.QIcon()
-        icon.addPixmap(QtGui.QPixmap(filepath_in_dict.replace("fbx", "jpeg")))
-
-        # Add the Icon to the Tool Button.
-        self.button.setIcon(icon)
-        self.button.setIconSize(QtCore.QSize(150,150))
-       
-        # Generate a new style for the Tool Button.
-        style = "QToolButton {"
-        style += "border-style: hidden;"
-        style += "border-width: 5px;"
-        style += "}"
-       
-        style += "QToolButton:hover {"
-        style += "background-color: #545454;"
-        style += "}"
-
-        # Apply the new stylesheet to the Tool Button.
-        self.button.setStyleSheet(style)
-
-        # Update the button's color.
-        self.update_button_color(self.button, agent_in_dict)
-
-        # When the button is clicked, import the corresponding Agent.
-        self.button.clicked.connect(lambda: self.import_agent(agent_in_dict, filepath_in_dict, i))
-
-        # Add Tool Button to the main widget layout.
-        self.mainWidgetLayout.addWidget(self.button, self.down, self.across)
-        self.across += 1
-
-        # If we already have 4 elements in our grid, start a new row.
-        if self.across == 4:
-            self.across = 0
-            self.down += 1
-
-
-    def import_agent(self, agent_in_dict, filepath_in_dict, i):
+    def import_agent(self, agent_in_dict, filepath_in_dict):
         """Create a Geometry node called 'agentSetup' to store Agent nodes."""
         # /obj context.
         obj = hou.node("/obj/")
@@ -421,48 +585,57 @@ class AgentBrowser(QtWidgets.QWidget):
 
         # If the Agent node doesn't exist, create it.
         if not agent_node:
-            agent_node = agent_setup_node.createNode("agent", agent_in_dict)
-
-            # Set the Agent Name.
-            agent_node.parm("agentname").set("$OS")
-
-            # Set the Input as FBX and the corresponding file path.
-            agent_node.parm("input").set(2)
-            agent_node.parm("fbxfile").set(filepath_in_dict)
-            agent_node.parm("fbxclipname").set("tpose")
+            # Queue every node in a Network Builder and create them at once
+            # (single undo group, no recooks while building).
+            builder = networkBuilder.NetworkBuilder("Agent Browser")
+
+            # Set the Agent Name, the Input as FBX and the corresponding file path.
+            agent_node = builder.create_node(
+                agent_setup_node, "agent", agent_in_dict,
+                parms={
+                    "agentname": "$OS",
+                    "input": 2,
+                    "fbxfile": filepath_in_dict,
+                    "fbxclipname": "tpose"})
                          
             # Create an Agent Clip node and connect it to the Agent node.
-            agent_clip_node = agent_setup_node.createNode("agentclip", f"{agent_in_dict}_clips")
-            agent_clip_node.setInput(0, agent_node)
+            agent_clip_node = builder.create_node(
+                agent_setup_node, "agentclip", f"{agent_in_dict}_clips",
+                inputs=[agent_node])
    
             # Create an Agent Layer node, connect it to the Agent Clip node,
             # and activate the Source Layer checkbox so we can see the character.
-            agent_layer_node = agent_setup_node.createNode("agentlayer", f"{agent_in_dict}_layer")
-            agent_layer_node.setInput(0, agent_clip_node)
-            agent_layer_node.parm("copysourcelayer1").set(1)
+            agent_layer_node = builder.create_node(
+                agent_setup_node, "agentlayer", f"{agent_in_dict}_layer",
+                parms={"copysourcelayer1": 1},
+                inputs=[agent_clip_node])
 
             # Create an Agent Prep node and connect it to the Agent Layer node.
-            agent_prep_node = agent_setup_node.createNode("agentprep", f"{agent_in_dict}_prep")
-            agent_prep_node.setInput(0, agent_layer_node)
+            agent_prep_node = builder.create_node(
+                agent_setup_node, "agentprep", f"{agent_in_dict}_prep",
+                inputs=[agent_layer_node])
 
             # Create an OUT (Null) node and connect it to the Agent Prep node.
-            out_node = agent_setup_node.createNode("null", f"OUT_{agent_in_dict}")
-            out_node.setInput(0, agent_prep_node)
+            out_node = builder.create_node(
+                agent_setup_node, "null", f"OUT_{agent_in_dict}",
+                inputs=[agent_prep_node])
 
             # Activate the Display/Render flags and set the color to black.
-            out_node.setDisplayFlag(True)
-            out_node.setRenderFlag(True)
-            out_node.setColor(hou.Color((0, 0, 0)))
+            builder.call(lambda node: node.setDisplayFlag(True), out_node)
+            builder.call(lambda node: node.setRenderFlag(True), out_node)
+            builder.call(lambda node: node.setColor(hou.Color((0, 0, 0))), out_node)
 
             # Layout nodes inside "agentSetup".
-            agent_setup_node.layoutChildren()
+            builder.layout(agent_setup_node)
+
+            # Create every queued node.
+            builder.apply()
+
+            # Show how long the import took (if profiling is enabled).
+            shelfProfiler.report("Agent Browser import")
            
-            # Iterate every button in the group.
-            for button in self.buttonGroup.buttons():
-            # Applies the action to each button independently.
-                if button is self.buttonGroup.button(i):
-                    # Update the color (make it green).
-                    self.update_button_color(button, agent_in_dict)
+            # Mark the new Agent in the grid (with a green line).
+            self.update_agents_in_scene()
 
         # If the Agent node is already in the scene, let the user know.
         else:            
@@ -473,5 +646,9 @@ class AgentBrowser(QtWidgets.QWidget):
             self.message.show()
 
 # Create an instance of the AgentBrowser class and display it in a new window.
-agentBrowserUI = AgentBrowser()
-agentBrowserUI.show()
+with shelfProfiler.phase("open UI"):
+    agentBrowserUI = AgentBrowser()
+    agentBrowserUI.show()
+
+# Show how long the UI took to open (if profiling is enabled).
+shelfProfiler.report("Agent Browser")
@@ -0,0 +1,290 @@
+"""
+AGENT CATALOG
+-------------
+Remember the .FBX characters of an Agent Directory between launches.
+
+Used by 'agentBrowser.py' and 'agentBrowser_v2.py'.
+
+HOW IT WORKS
+------------
+- The catalog is a small SQLite database with every folder of the Agent
+  Directory (and its modification time), and every .FBX file (path, size,
+  modification time and the modification time of its .JPEG thumbnail).
+- REFRESH() revalidates the catalog from the folders' modification times:
+  a folder changes its modification time when files are added, removed or
+  renamed in it, so only those folders are listed again. The rest only cost
+  a stat() call, so a warm launch doesn't walk the whole tree. Folders are
+  listed (or checked) on a thread pool (see 'directoryScanner.py').
+- Files edited in place (same name) don't change their folder's modification
+  time, so the .FBX files and thumbnails of unchanged folders are checked
+  with a stat() call each (no listing). Use REFRESH(full=True) to list every
+  folder again (e.g: after changing the excluded globs or the maximum depth).
+- A thumbnail is stale if it's missing or older than its .FBX file.
+  STALE_THUMBNAILS() returns every character that needs a new one.
+- The catalog file is $AGENT_CATALOG if it's set, or
+  $HOUDINI_USER_PREF_DIR/agent_catalog.db otherwise (local, so the database
+  is never shared over the network). One file holds the catalogs of every
+  Agent Directory.
+- The file is versioned. Catalogs with another version are rebuilt from scratch.
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import built-in modules.
+import os
+import sqlite3
+
+# Import third-party modules.
+import hou
+
+# Import local modules.
+import directoryScanner
+
+# Version of the catalog format. Catalogs with another version are rebuilt.
+CATALOG_VERSION = 1
+
+# Environment variable to use another catalog file.
+CATALOG_ENV = "AGENT_CATALOG"
+
+# Name of the catalog file in $HOUDINI_USER_PREF_DIR.
+CATALOG_FILE = "agent_catalog.db"
+
+# Extensions of characters and thumbnails.
+FBX_EXTENSION = ".fbx"
+THUMBNAIL_EXTENSION = ".jpeg"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    parent TEXT,
+    mtime INTEGER NOT NULL,
+    PRIMARY KEY (root, path));
+CREATE TABLE IF NOT EXISTS agents (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    thumbnail_mtime INTEGER,
+    PRIMARY KEY (root, path));
+CREATE INDEX IF NOT EXISTS agents_folder ON agents (root, folder);
+"""
+
+
+def catalog_path():
+    """Return the path of the catalog file."""
+    filepath = os.environ.get(CATALOG_ENV)
+    if filepath:
+        return hou.text.expandString(filepath)
+
+    return os.path.join(hou.getenv("HOUDINI_USER_PREF_DIR") or "", CATALOG_FILE)
+
+
+def agent_name(filename):
+    """Return the Agent name of an .FBX file (its name up to the first dot)."""
+    return filename.split(".")[0]
+
+
+def thumbnail_path(fbx_path):
+    """Return the thumbnail of an .FBX file (a .JPEG next to it)."""
+    return os.path.splitext(fbx_path)[0] + THUMBNAIL_EXTENSION
+
+
+def file_state(fbx_path):
+    """Return the (size, mtime, thumbnail mtime) of an .FBX file (thumbnail mtime is None if it's missing).
+
+    Raises OSError if the .FBX file can't be read.
+    """
+    stat = os.stat(fbx_path)
+
+    try:
+        thumbnail_mtime = os.stat(thumbnail_path(fbx_path)).st_mtime_ns
+    except OSError:
+        thumbnail_mtime = None
+
+    return stat.st_size, stat.st_mtime_ns, thumbnail_mtime
+
+
+class AgentCatalog():
+    """The .FBX characters of an Agent Directory, kept in a SQLite database."""
+
+
+    def __init__(self, root, filepath=None, exclude=(), max_depth=None):
+        """Open (or create) the catalog of an Agent Directory.
+
+        Files and folders matching the 'exclude' globs (e.g: "clips"), or deeper
+        than 'max_depth', are left out (see 'directoryScanner.py').
+        """
+        # Paths are stored with forward slashes (like the rest of the tools).
+        self.root = os.path.normpath(root).replace("\\", "/")
+        self.filepath = filepath or catalog_path()
+        self.exclude = exclude
+        self.max_depth = max_depth
+
+        self.connection = sqlite3.connect(self.filepath)
+
+        # Rebuild catalogs written by another version of this module.
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != CATALOG_VERSION:
+            with self.connection:
+                self.connection.execute("DROP TABLE IF EXISTS folders")
+                self.connection.execute("DROP TABLE IF EXISTS agents")
+                self.connection.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+
+        self.connection.executescript(SCHEMA)
+
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+        return False
+
+
+    def refresh(self, full=False, found=None):
+        """Bring the catalog up to date with the Agent Directory.
+
+        Only folders whose modification time changed are listed again
+        (every folder if 'full' is True). Returns the number of folders listed.
+        If 'found' is a function, it's called with a list of the (name, path)
+        of the characters in every folder listed, as soon as it's listed.
+        """
+        # Load every known folder at once (Keys: paths, Values: mtimes),
+        # and the subfolders of each one.
+        known, children = {}, {}
+        for path, parent, mtime in self.connection.execute(
+                "SELECT path, parent, mtime FROM folders WHERE root = ?", (self.root,)):
+            known[path] = mtime
+            children.setdefault(parent, []).append(path)
+
+        # Load every known character at once, by folder
+        # (Keys: folder paths, Values: lists of (path, size, mtime, thumbnail mtime)).
+        folder_agents = {}
+        for path, folder, size, mtime, thumbnail_mtime in self.connection.execute(
+                "SELECT path, folder, size, mtime, thumbnail_mtime FROM agents WHERE root = ?",
+                (self.root,)):
+            folder_agents.setdefault(folder, []).append((path, (size, mtime, thumbnail_mtime)))
+
+        # Characters whose file or thumbnail changed in place: (size, mtime, thumbnail mtime, path).
+        # NOTE: Filled by the scanner threads (appending to a list is thread-safe).
+        edited = []
+
+        def reuse(path, mtime):
+            if full or known.get(path) != mtime:
+                return None
+
+            # Nothing was added, removed or renamed: reuse what we know,
+            # but check the characters and thumbnails edited in place.
+            for agent_path, state in folder_agents.get(path, ()):
+                try:
+                    new_state = file_state(agent_path)
+                except OSError:
+                    # The file is gone (or unreadable): list the folder again.
+                    return None
+                if new_state != state:
+                    edited.append(new_state + (agent_path,))
+
+            return children.get(path, ())
+
+        seen, listed = set(), 0
+
+        with self.connection:
+            # List the folders that changed on a thread pool, and store them as they come.
+            for folder in directoryScanner.scan_folders(
+                    self.root,
+                    include=(f"*{FBX_EXTENSION}", f"*{THUMBNAIL_EXTENSION}"),
+                    exclude=self.exclude,
+                    max_depth=self.max_depth,
+                    reuse=reuse):
+                seen.add(folder.path)
+
+                if folder.listed:
+                    agents = self.store_folder(folder)
+                    listed += 1
+
+                    if found is not None and agents:
+                        found(agents)
+
+            # Update the characters edited in place.
+            self.connection.executemany(
+                "UPDATE agents SET size = ?, mtime = ?, thumbnail_mtime = ? WHERE root = ? AND path = ?",
+                [(size, mtime, thumbnail_mtime, self.root, path)
+                 for size, mtime, thumbnail_mtime, path in edited])
+
+            # Forget the folders that don't exist anymore (and their characters).
+            removed = [(self.root, path) for path in known if path not in seen]
+            self.connection.executemany(
+                "DELETE FROM folders WHERE root = ? AND path = ?", removed)
+            self.connection.executemany(
+                "DELETE FROM agents WHERE root = ? AND folder = ?", removed)
+
+        return listed
+
+
+    def store_folder(self, folder):
+        """Replace what we know about a folder with a new listing (a directoryScanner.Folder).
+
+        Returns a list of the (name, path) of its characters.
+        """
+        # NOTE: Subfolders are stored when they are listed (with their own mtime).
+        parent = None if folder.path == self.root else os.path.dirname(folder.path)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO folders VALUES (?, ?, ?, ?)",
+            (self.root, folder.path, parent, folder.mtime))
+
+        # Keys: thumbnail paths, Values: mtimes.
+        thumbnails = {
+            entry.path: entry.mtime
+            for entry in folder.files
+            if entry.name.lower().endswith(THUMBNAIL_EXTENSION)}
+
+        rows = [
+            (self.root, entry.path, folder.path, agent_name(entry.name), entry.size, entry.mtime,
+             thumbnails.get(thumbnail_path(entry.path)))
+            for entry in folder.files
+            if entry.name.lower().endswith(FBX_EXTENSION)]
+
+        self.connection.execute(
+            "DELETE FROM agents WHERE root = ? AND folder = ?", (self.root, folder.path))
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO agents VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+        return [(name, path) for root, path, parent, name, size, mtime, thumbnail in rows]
+
+
+    def agents(self):
+        """Return the (name, path) of every character, sorted by name.
+
+        NOTE: Characters are identified by their path (several folders may hold an Agent with the same name).
+        """
+        return self.connection.execute(
+            "SELECT name, path FROM agents WHERE root = ? ORDER BY name, path", (self.root,)).fetchall()
+
+
+    def paths(self):
+        """Return the .FBX path of every character (a set)."""
+        return {path for path, in self.connection.execute(
+            "SELECT path FROM agents WHERE root = ?", (self.root,))}
+
+
+    def stale_thumbnails(self):
+        """Return the characters without a thumbnail, or with a thumbnail older than their .FBX file.
+
+        Returns a list of (name, path), sorted by name.
+        """
+        return self.connection.execute(
+            "SELECT name, path FROM agents WHERE root = ? "
+            "AND (thumbnail_mtime IS NULL OR thumbnail_mtime < mtime) "
+            "ORDER BY name, path", (self.root,)).fetchall()
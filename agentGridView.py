@@ -0,0 +1,224 @@
+"""
+AGENT GRID VIEW
+---------------
+A grid of characters with their thumbnails.
+
+Used by 'agentBrowser_v2.py'.
+
+HOW IT WORKS
+------------
+- AgentGridModel stores the name and .FBX path of every character. New
+  characters are added in batches (a single insert per batch), so the grid
+  can be filled while the Agent Directory is still being scanned.
+- AgentGrid is a QListView showing that model as icons, sorted by name and
+  filtered by a search text. Unlike a button per character, only the visible
+  characters are drawn, and a thumbnail is only loaded the first time it's
+  visible.
+- AgentDelegate draws a green line below the characters that are already
+  in the scene.
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import third-party modules.
+from PySide2 import QtCore, QtGui, QtWidgets
+
+# Import local modules.
+import agentCatalog
+import shelfProfiler
+
+# Size of the thumbnails in the grid.
+ICON_SIZE = 150
+
+# Custom data roles: the .FBX path, and whether the Agent is in the scene.
+PATH_ROLE = QtCore.Qt.UserRole
+IN_SCENE_ROLE = QtCore.Qt.UserRole + 1
+
+
+class AgentGridModel(QtCore.QAbstractListModel):
+    """Characters (name and .FBX path) with their thumbnails."""
+
+
+    def __init__(self, parent=None):
+        """Start with an empty grid."""
+        super(AgentGridModel, self).__init__(parent)
+
+        # List of (name, path), and the row of every path.
+        self.agent_list = []
+        self.rows = {}
+
+        # Names of the Agents already in the scene.
+        self.in_scene = set()
+
+        # Keys: .FBX paths, Values: thumbnails (QIcon, None if there's no thumbnail).
+        self.icons = {}
+
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        """Return the number of characters."""
+        return 0 if parent.isValid() else len(self.agent_list)
+
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        """Return what to show for every character."""
+        if not index.isValid():
+            return None
+
+        name, path = self.agent_list[index.row()]
+
+        if role == QtCore.Qt.DisplayRole:
+            return name
+        if role == QtCore.Qt.DecorationRole:
+            return self.icon(path)
+        if role in (QtCore.Qt.ToolTipRole, PATH_ROLE):
+            return path
+        if role == IN_SCENE_ROLE:
+            return name in self.in_scene
+
+        return None
+
+
+    def icon(self, path):
+        """Return the thumbnail of a character (loaded the first time it's needed)."""
+        if path not in self.icons:
+            with shelfProfiler.phase("load thumbnails"):
+                pixmap = QtGui.QPixmap(agentCatalog.thumbnail_path(path))
+
+            # Scale it once, so the view doesn't scale a big image on every redraw.
+            self.icons[path] = None if pixmap.isNull() else QtGui.QIcon(pixmap.scaled(
+                ICON_SIZE, ICON_SIZE, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation))
+
+        return self.icons[path]
+
+
+    def add_agents(self, agents):
+        """Add a batch of (name, path) characters (characters already in the grid are skipped)."""
+        new_agents = []
+        for name, path in agents:
+            if path not in self.rows:
+                self.rows[path] = len(self.agent_list) + len(new_agents)
+                new_agents.append((name, path))
+
+        if not new_agents:
+            return
+
+        first = len(self.agent_list)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(new_agents) - 1)
+        self.agent_list.extend(new_agents)
+        self.endInsertRows()
+
+
+    def keep_agents(self, paths):
+        """Remove the characters whose path is not in 'paths' (e.g: deleted since the last launch)."""
+        paths = set(paths)
+        if all(path in paths for path in self.rows):
+            return
+
+        self.beginResetModel()
+        self.agent_list = [(name, path) for name, path in self.agent_list if path in paths]
+        self.rows = {path: row for row, (name, path) in enumerate(self.agent_list)}
+        self.endResetModel()
+
+
+    def set_in_scene(self, names):
+        """Set the names of the Agents already in the scene."""
+        self.in_scene = set(names)
+        if self.agent_list:
+            self.dataChanged.emit(self.index(0), self.index(len(self.agent_list) - 1))
+
+
+    def reload_thumbnails(self, paths):
+        """Load the thumbnails of some characters again (e.g: after rendering them)."""
+        for path in paths:
+            self.icons.pop(path, None)
+            row = self.rows.get(path)
+            if row is not None:
+                self.dataChanged.emit(self.index(row), self.index(row))
+
+
+class AgentDelegate(QtWidgets.QStyledItemDelegate):
+    """Draw a green line below the Agents already in the scene."""
+
+
+    def paint(self, painter, option, index):
+        """Draw the character, and the line if it's in the scene."""
+        super(AgentDelegate, self).paint(painter, option, index)
+
+        if index.data(IN_SCENE_ROLE):
+            rect = option.rect
+            painter.fillRect(
+                QtCore.QRect(rect.left() + 5, rect.bottom() - 5, rect.width() - 10, 5),
+                QtGui.QColor("green"))
+
+
+class AgentGrid(QtWidgets.QListView):
+    """A grid of characters, sorted by name and filtered by a search text."""
+
+    # Emitted with the name and .FBX path of a character when it's clicked.
+    agentClicked = QtCore.Signal(str, str)
+
+
+    def __init__(self, parent=None):
+        """Create the model and set up the view."""
+        super(AgentGrid, self).__init__(parent)
+
+        self.agentModel = AgentGridModel(self)
+
+        # Sort and filter the characters without touching the model.
+        # NOTE: Rows are sorted as they are inserted, so the grid stays sorted while it fills.
+        self.proxyModel = QtCore.QSortFilterProxyModel(self)
+        self.proxyModel.setSourceModel(self.agentModel)
+        self.proxyModel.setFilterCaseSensitivity(QtCore.Qt.CaseInsensitive)
+        self.proxyModel.setSortCaseSensitivity(QtCore.Qt.CaseInsensitive)
+        self.proxyModel.setDynamicSortFilter(True)
+        self.proxyModel.sort(0)
+        self.setModel(self.proxyModel)
+
+        self.agentDelegate = AgentDelegate(self)
+        self.setItemDelegate(self.agentDelegate)
+
+        # Icons with the name under them, in a grid that wraps with the window.
+        # Every item has the same size, so Qt never measures every character.
+        self.setViewMode(QtWidgets.QListView.IconMode)
+        self.setIconSize(QtCore.QSize(ICON_SIZE, ICON_SIZE))
+        self.setGridSize(QtCore.QSize(ICON_SIZE + 20, ICON_SIZE + 40))
+        self.setResizeMode(QtWidgets.QListView.Adjust)
+        self.setMovement(QtWidgets.QListView.Static)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QtWidgets.QListView.Batched)
+        self.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+
+        self.clicked.connect(self.emitAgentClicked)
+
+
+    def emitAgentClicked(self, index):
+        """Emit 'agentClicked' with the character of a (proxy) index."""
+        self.agentClicked.emit(index.data(QtCore.Qt.DisplayRole), index.data(PATH_ROLE))
+
+
+    def set_filter(self, text):
+        """Show only the characters whose name contains a text."""
+        self.proxyModel.setFilterFixedString(text)
+
+
+    def add_agents(self, agents):
+        """Add a batch of (name, path) characters."""
+        self.agentModel.add_agents(agents)
+
+
+    def keep_agents(self, paths):
+        """Remove the characters whose path is not in 'paths'."""
+        self.agentModel.keep_agents(paths)
+
+
+    def set_in_scene(self, names):
+        """Set the names of the Agents already in the scene."""
+        self.agentModel.set_in_scene(names)
+
+
+    def reload_thumbnails(self, paths):
+        """Load the thumbnails of some characters again."""
+        self.agentModel.reload_thumbnails(paths)
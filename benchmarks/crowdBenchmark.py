@@ -0,0 +1,244 @@
+"""
+CROWD BENCHMARK
+---------------
+Measure how every phase of 'crowdToSolaris.py' and 'materialStylesheetsGUI.py'
+scales with the size of the Crowd, on any machine (no Houdini license needed).
+
+HOW IT WORKS
+------------
+Run it with any Python 3 interpreter:
+
+    python benchmarks/crowdBenchmark.py --output results.json
+
+- Houdini is replaced by 'fakeHou.py', which generates synthetic crowds
+  (N Agents, M Agent definitions, K shapes each plus collision layers) and
+  counts every node operation the tools ask for.
+- For every crowd size, these phases are timed (best of --repeat runs):
+    extraction       Read the Agents and Agent Shapes from the geometry.
+    slots            Index every (Agent, Shape) pair.
+    dedup            Hash the textures and group them into materials.
+    ui_model         Build the shape table model (skipped without PySide2).
+    prim_lookup      Find the prims of every shape in the imported stage.
+    solaris_nodes    Queue and create the Material Library / Assign Material network.
+    solaris_layer    Write the USD material layer and its Sublayer node.
+    mat_nodes        Create the Principled Shaders in /mat.
+    stylesheet       Generate the Material Stylesheet in the hip file.
+    stylesheet_rerun Run the stylesheet generation again (nothing changed).
+    stylesheet_file  Write the Material Stylesheet to an external file.
+- Results (times, node operations, USD operations) are written as JSON, so
+  two runs can be compared to spot regressions.
+"""
+
+# Import built-in modules.
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+# Make sure we can import the modules from the repository root (and fakeHou).
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+# Replace Houdini (and USD, if missing) BEFORE importing the crowd modules.
+import fakeHou
+REAL_PXR = fakeHou.install()
+
+# Import local modules.
+import crowdBuild
+import crowdIntrospection
+import crowdMaterials
+import networkBuilder
+
+# The table model needs Qt (optional).
+try:
+    from PySide2 import QtWidgets
+    import shapeTableView
+except ImportError:
+    shapeTableView = None
+
+# Version of the results format.
+RESULTS_VERSION = 1
+
+# Crowd sizes: (Agents, Agent definitions, shapes per definition, collision layers).
+SCENARIOS = (
+    (100, 5, 10, 1),
+    (1000, 20, 20, 2),
+    (5000, 50, 30, 2),
+    (20000, 100, 40, 4))
+
+# Number of different texture contents (textures are shared between shapes).
+TEXTURE_CONTENTS = 64
+
+
+def write_textures(folder, shape_slots):
+    """Write one small texture file per slot, with many duplicated contents."""
+    textures = []
+    for slot, (agent, shape) in enumerate(shape_slots):
+        filepath = os.path.join(folder, f"{agent}_{shape}.png")
+        with open(filepath, "wb") as f:
+            f.write(f"texture{slot % TEXTURE_CONTENTS}".encode("utf-8") * 256)
+        textures.append(filepath)
+
+    return textures
+
+
+def timed(function, repeat, setup=None):
+    """Run a function 'repeat' times and return (best time, result, node ops, USD ops) of the best run.
+
+    'setup' runs before every run (not timed).
+    """
+    best = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        fakeHou.node_ops.clear()
+        fakeHou.usd_ops.clear()
+
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+
+        if best is None or seconds < best[0]:
+            best = (seconds, result, dict(fakeHou.node_ops), dict(fakeHou.usd_ops))
+
+    return best
+
+
+def run_scenario(agents, definitions, shapes, collision_layers, repeat):
+    """Time every phase for a crowd size. Returns a dictionary of results."""
+    phases = {}
+
+    def record(name, function, setup=None):
+        seconds, result, node_ops, usd_ops = timed(function, repeat, setup)
+        phases[name] = {"seconds": seconds, "node_ops": node_ops, "usd_ops": usd_ops}
+        return result
+
+    # Generate the crowd and the scene.
+    fakeHou.reset()
+    geo = fakeHou.synthetic_crowd(agents, definitions, shapes, collision_layers)
+    obj = fakeHou.node("/obj").createNode("geo", "crowd")
+    sop_node = obj.createNode("filecache", "filecache1")
+    sop_node.geo = geo
+
+    # CROWD INFO
+    agents_shapes_dict = record("extraction", lambda: crowdIntrospection.read_agent_shapes(geo))
+    shape_slots = record("slots", lambda: crowdIntrospection.shape_slots(agents_shapes_dict))
+
+    texture_dir = tempfile.mkdtemp(prefix="crowdBenchmark_")
+    try:
+        textures = write_textures(texture_dir, shape_slots)
+
+        # Hash every texture from scratch on every run.
+        materials, slot_materials, errors = record(
+            "dedup",
+            lambda: crowdBuild.prepare_materials(textures),
+            setup=crowdMaterials._hash_cache.clear)
+    finally:
+        shutil.rmtree(texture_dir, ignore_errors=True)
+
+    # UI
+    if shapeTableView is not None:
+        # NOTE: Qt needs an application before creating fonts (keep a reference to it).
+        application = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+        record("ui_model", lambda: shapeTableView.ShapeTableModel(shape_slots))
+
+    # CROWD TO SOLARIS
+    stage = fakeHou.synthetic_stage(geo, crowdBuild.PATH_PREFIX)
+    prims, patterns = record(
+        "prim_lookup",
+        lambda: crowdBuild.material_prims(stage, shape_slots, materials, slot_materials))
+
+    def build_network(queue):
+        lop = fakeHou.node("/stage")
+        builder = networkBuilder.NetworkBuilder("Benchmark")
+        import_node = crowdBuild.queue_import(builder, lop, sop_node)
+        queue(builder, lop, sop_node, import_node, materials, prims, patterns)
+        builder.layout(lop)
+        builder.apply()
+
+    def reset_stage():
+        fakeHou.node("/stage").child_nodes.clear()
+
+    record("solaris_nodes", lambda: build_network(crowdBuild.queue_material_nodes), reset_stage)
+    record("solaris_layer", lambda: build_network(crowdBuild.queue_material_layer), reset_stage)
+
+    # MATERIAL STYLESHEETS
+    def reset_mat():
+        fakeHou.node("/mat").child_nodes.clear()
+
+    def reset_styles():
+        fakeHou.styles.stylesheets.clear()
+
+    record("mat_nodes", lambda: crowdBuild.build_mat_nodes(materials), reset_mat)
+    record("stylesheet", lambda: crowdBuild.build_stylesheet(obj, shape_slots, slot_materials), reset_styles)
+    record("stylesheet_rerun", lambda: crowdBuild.build_stylesheet(obj, shape_slots, slot_materials))
+    record(
+        "stylesheet_file",
+        lambda: crowdBuild.build_stylesheet(obj, shape_slots, slot_materials, external=True))
+
+    return {
+        "agents": agents,
+        "definitions": definitions,
+        "shapes": shapes,
+        "collision_layers": collision_layers,
+        "slots": len(shape_slots),
+        "materials": len(materials),
+        "phases": phases}
+
+
+def parse_args(argv=None):
+    """Return the command line options."""
+    parser = argparse.ArgumentParser(
+        description="Measure every phase of the crowd tools on synthetic crowds.")
+    parser.add_argument(
+        "--output", default=os.path.join(BENCHMARK_DIR, "crowdBenchmark.json"),
+        help="JSON file where the results are written.")
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Number of runs per phase (the best one is kept).")
+    parser.add_argument(
+        "--scenario", nargs=4, type=int, action="append",
+        metavar=("AGENTS", "DEFINITIONS", "SHAPES", "COLLISION_LAYERS"),
+        help="Crowd size to test instead of the default ones. Can be used many times.")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run every scenario, print a summary and write the results."""
+    args = parse_args(argv)
+    scenarios = args.scenario or SCENARIOS
+
+    results = {
+        "version": RESULTS_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "usd": "pxr" if REAL_PXR else "stand-in",
+        "scenarios": []}
+
+    for scenario in scenarios:
+        result = run_scenario(*scenario, repeat=args.repeat)
+        results["scenarios"].append(result)
+
+        print(f"\n{result['agents']} agents, {result['definitions']} definitions, "
+              f"{result['shapes']} shapes (+{result['collision_layers']} collision) > "
+              f"{result['slots']} slots, {result['materials']} materials")
+        for name, phase in result["phases"].items():
+            print(f"  {name:<18} {phase['seconds'] * 1e3:>10.2f} ms "
+                  f"{sum(phase['node_ops'].values()):>8} node ops "
+                  f"{sum(phase['usd_ops'].values()):>10} usd ops")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
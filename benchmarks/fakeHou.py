@@ -0,0 +1,479 @@
+"""
+FAKE HOU
+--------
+A stand-in for Houdini's 'hou' module, so the crowd tools can be benchmarked
+on any machine (no Houdini license needed).
+
+Used by 'crowdBenchmark.py'.
+
+HOW IT WORKS
+------------
+- INSTALL() registers this module as 'hou' (and, if USD is not installed, a
+  stand-in 'pxr' whose Sdf calls are only counted), so importing the crowd
+  modules works as usual.
+- Only the parts of the HOM used by the crowd tools are implemented: nodes,
+  parameters, styles, undo groups, update modes and crowd geometry.
+- Every node operation (createNode, setParms, setInput, layoutChildren...)
+  is counted in NODE_OPS, and every Sdf call in USD_OPS, so benchmarks can
+  report how much work each phase asks Houdini to do.
+- SYNTHETIC_CROWD() generates a Crowd geometry (N Agents, M Agent
+  definitions, K shapes each plus collision layers), and SYNTHETIC_STAGE()
+  the USD stage a SOP Import would make of it.
+"""
+
+# Import built-in modules.
+from collections import Counter
+import atexit
+import contextlib
+import os
+import sys
+import tempfile
+import types
+
+# Number of node operations, by name (e.g: "createNode").
+node_ops = Counter()
+
+# Number of Sdf calls (only counted when the 'pxr' stand-in is used).
+usd_ops = Counter()
+
+# Folder used as $HIP (removed when Python exits).
+_hip_folder = tempfile.TemporaryDirectory(prefix="fakeHou_")
+atexit.register(_hip_folder.cleanup)
+hip_dir = _hip_folder.name
+
+
+# NODES
+
+class Parm():
+    """A node parameter."""
+
+
+    def __init__(self, node, name, value=""):
+        self.node = node
+        self.parm_name = name
+        self.value = value
+        self.expression = None
+
+
+    def name(self):
+        return self.parm_name
+
+
+    def eval(self):
+        return self.value
+
+
+    def set(self, value):
+        node_ops["set"] += 1
+        self.value = value
+
+
+    def setExpression(self, expression, language=None):
+        node_ops["setExpression"] += 1
+        self.expression = expression
+
+
+class ParmTemplateGroup():
+    """The parameter layout of a node (only used to add spare parameters)."""
+
+
+    def __init__(self):
+        self.templates = []
+
+
+    def append(self, template):
+        self.templates.append(template)
+
+
+class StringParmTemplate():
+    """A string parameter template."""
+
+
+    def __init__(self, name, label, num_components=1, **kwargs):
+        self.parm_name = name
+
+
+    def name(self):
+        return self.parm_name
+
+
+class Node():
+    """A node in a network."""
+
+
+    def __init__(self, name, node_type="subnet", parent=None):
+        self.node_name = name
+        self.node_type = node_type
+        self.parent_node = parent
+        self.child_nodes = {}
+        self.parms = {}
+        self.inputs = []
+        self.geo = None
+        self.usd_stage = None
+
+
+    def name(self):
+        return self.node_name
+
+
+    def path(self):
+        if self.parent_node is None:
+            return "/"
+        parent_path = self.parent_node.path()
+        return f"{parent_path.rstrip('/')}/{self.node_name}"
+
+
+    def parent(self):
+        return self.parent_node
+
+
+    def children(self):
+        return tuple(self.child_nodes.values())
+
+
+    def node(self, path):
+        """Return a child (or descendant) by relative path, or None."""
+        node = self
+        for name in path.strip("/").split("/"):
+            node = node.child_nodes.get(name)
+            if node is None:
+                return None
+
+        return node
+
+
+    def createNode(self, node_type, node_name=None):
+        node_ops["createNode"] += 1
+
+        # Find a unique name (e.g: "geo1", "geo2"...).
+        name = node_name or f"{node_type}1"
+        base, number = name.rstrip("0123456789"), 1
+        while name in self.child_nodes:
+            number += 1
+            name = f"{base}{number}"
+
+        node = Node(name, node_type, self)
+        self.child_nodes[name] = node
+
+        return node
+
+
+    def parm(self, name):
+        return self.parms.get(name)
+
+
+    def setParms(self, values):
+        node_ops["setParms"] += 1
+        for name, value in values.items():
+            self.parms.setdefault(name, Parm(self, name)).value = value
+
+
+    def setParmExpressions(self, expressions, language=None):
+        node_ops["setParmExpressions"] += 1
+        for name, expression in expressions.items():
+            self.parms.setdefault(name, Parm(self, name)).expression = expression
+
+
+    def parmTemplateGroup(self):
+        return ParmTemplateGroup()
+
+
+    def setParmTemplateGroup(self, group):
+        node_ops["setParmTemplateGroup"] += 1
+        for template in group.templates:
+            self.parms.setdefault(template.name(), Parm(self, template.name()))
+
+
+    def setInput(self, index, node):
+        node_ops["setInput"] += 1
+        self.inputs[index:index + 1] = [node]
+
+
+    def layoutChildren(self, *args, **kwargs):
+        node_ops["layoutChildren"] += 1
+
+
+    def setDisplayFlag(self, on):
+        node_ops["setDisplayFlag"] += 1
+
+
+    def setSelected(self, on, clear_all_selected=False):
+        node_ops["setSelected"] += 1
+
+
+    def cookCount(self):
+        return 1
+
+
+    def isTimeDependent(self):
+        return False
+
+
+    def geometry(self):
+        return self.geo
+
+
+    def stage(self):
+        return self.usd_stage
+
+
+# CROWD GEOMETRY
+
+class Prim():
+    """An Agent primitive."""
+
+
+    def __init__(self, shape_library):
+        self.shape_library = shape_library
+
+
+    def intrinsicValue(self, name):
+        return self.shape_library
+
+
+class Point():
+    """A point with its Agent primitive."""
+
+
+    def __init__(self, prim):
+        self.prim = prim
+
+
+    def prims(self):
+        return (self.prim,)
+
+
+class Geometry():
+    """A Crowd geometry: one point (and Agent primitive) per Agent."""
+
+
+    def __init__(self, agent_names, shape_libraries):
+        self.agent_names = agent_names
+        self.agent_prims = {
+            name: Prim(library) for name, library in shape_libraries.items()}
+
+
+    def pointStringAttribValues(self, name):
+        return tuple(self.agent_names)
+
+
+    def point(self, number):
+        return Point(self.agent_prims[self.agent_names[number]])
+
+
+def definition_name(definition):
+    """Return the name of a synthetic Agent definition."""
+    return f"agent{definition}"
+
+
+def shape_name(definition, shape):
+    """Return the name of a synthetic Agent Shape."""
+    return f"agent{definition}_shape{shape}"
+
+
+def synthetic_crowd(agents, definitions, shapes, collision_layers=1):
+    """Return a Crowd geometry with 'agents' Agents of 'definitions' definitions.
+
+    Every definition has 'shapes' shapes, plus 'collision_layers' collision shapes.
+    """
+    shape_libraries = {
+        definition_name(d): tuple(
+            [shape_name(d, s) for s in range(shapes)]
+            + [f"collision_{d}_{c}" for c in range(collision_layers)])
+        for d in range(definitions)}
+    agent_names = [definition_name(a % definitions) for a in range(agents)]
+
+    return Geometry(agent_names, shape_libraries)
+
+
+# USD STAGE
+
+class UsdPrim():
+    """A prim in a synthetic USD stage."""
+
+
+    def __init__(self, path, children=()):
+        self.prim_path = path
+        self.child_prims = list(children)
+
+
+    def __bool__(self):
+        return True
+
+
+    def GetName(self):
+        return self.prim_path.rsplit("/", 1)[-1]
+
+
+    def GetPath(self):
+        return self.prim_path
+
+
+    def GetChildren(self):
+        return self.child_prims
+
+
+class Stage():
+    """A synthetic USD stage."""
+
+
+    def __init__(self, prims):
+        self.prims = prims
+
+
+    def GetPrimAtPath(self, path):
+        return self.prims.get(str(path))
+
+
+def synthetic_stage(geo, prefix="/crowd"):
+    """Return the stage a SOP Import makes of a Crowd (/crowd/<agent>_<id>/<shape>)."""
+    agent_prims = []
+    for number, agent in enumerate(geo.agent_names):
+        agent_path = f"{prefix}/{agent}_{number}"
+        shapes = geo.agent_prims[agent].shape_library
+        agent_prims.append(UsdPrim(agent_path, [
+            UsdPrim(f"{agent_path}/{shape.replace('.', '_')}") for shape in shapes]))
+
+    return Stage({prefix: UsdPrim(prefix, agent_prims)})
+
+
+# HOU MODULE
+
+class Styles():
+    """The stylesheets stored in the hip file."""
+
+
+    def __init__(self):
+        self.stylesheets = {}
+
+
+    def styleExists(self, name):
+        return name in self.stylesheets
+
+
+    def getStyleAsJSON(self, name):
+        return self.stylesheets[name]
+
+
+    def addStyle(self, name, description, json_text):
+        node_ops["addStyle"] += 1
+        self.stylesheets[name] = json_text
+
+
+    def removeStyle(self, name):
+        node_ops["removeStyle"] += 1
+        del self.stylesheets[name]
+
+
+class Text():
+    """String helpers."""
+
+
+    def expandString(self, text):
+        return text.replace("$HIP", hip_dir)
+
+
+class Undos():
+    """Undo groups."""
+
+
+    @contextlib.contextmanager
+    def group(self, label):
+        yield
+
+
+# Update modes.
+updateMode = types.SimpleNamespace(AutoUpdate="AutoUpdate", OnMouseUp="OnMouseUp", Manual="Manual")
+_update_mode = [updateMode.AutoUpdate]
+
+# Expression languages.
+exprLanguage = types.SimpleNamespace(Hscript="Hscript", Python="Python")
+
+styles = Styles()
+text = Text()
+undos = Undos()
+root = Node("")
+
+
+def updateModeSetting():
+    return _update_mode[0]
+
+
+def setUpdateMode(mode):
+    _update_mode[0] = mode
+
+
+def node(path):
+    return root if path == "/" else root.node(path)
+
+
+def frame():
+    return 1.0
+
+
+def getenv(name, default=None):
+    return hip_dir if name == "HIP" else os.environ.get(name, default)
+
+
+def reset():
+    """Empty the scene: /obj, /stage and /mat only, no styles, no counted operations."""
+    root.child_nodes = {
+        name: Node(name, node_type, root)
+        for name, node_type in (("obj", "obj"), ("stage", "lopnet"), ("mat", "matnet"))}
+    styles.stylesheets.clear()
+    node_ops.clear()
+    usd_ops.clear()
+
+
+# PXR STAND-IN
+
+class Recorder():
+    """Accepts any Sdf call (counting it) and returns another Recorder."""
+
+
+    def __init__(self, name="Sdf"):
+        object.__setattr__(self, "recorder_name", name)
+
+
+    def __getattr__(self, name):
+        return Recorder(name)
+
+
+    def __setattr__(self, name, value):
+        usd_ops[name] += 1
+
+
+    def __call__(self, *args, **kwargs):
+        usd_ops[self.recorder_name] += 1
+        return Recorder(self.recorder_name)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        return False
+
+
+    def __bool__(self):
+        # Layers are never found, so they are always created anew.
+        return False
+
+
+def install():
+    """Register this module as 'hou' (and a 'pxr' stand-in if USD is missing).
+
+    Returns True if the real 'pxr' module is used.
+    """
+    sys.modules["hou"] = sys.modules[__name__]
+    reset()
+
+    try:
+        import pxr.Sdf
+        return True
+    except ImportError:
+        pxr = types.ModuleType("pxr")
+        pxr.Sdf = Recorder()
+        sys.modules["pxr"] = pxr
+        return False
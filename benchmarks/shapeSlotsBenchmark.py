@@ -0,0 +1,93 @@
+"""
+SHAPE SLOTS BENCHMARK
+---------------------
+Compare the old and new ways of finding the multiparm slot of every
+Agent Shape when creating materials in 'crowdToSolaris.py'.
+
+- OLD: Append every shape to an auxiliary list and call 'aux_list.index(shape)'
+  for each of them (quadratic, and wrong when two Agents share a shape name).
+- NEW: Enumerate 'crowdIntrospection.shape_slots()' (linear).
+
+HOW IT WORKS
+------------
+Run it with any Python 3 interpreter (no Houdini needed):
+
+    python benchmarks/shapeSlotsBenchmark.py
+
+The time per shape of the NEW approach should stay flat as the number of
+shapes grows, while the OLD one keeps growing.
+"""
+
+# Import built-in modules.
+import os
+import sys
+import timeit
+import types
+
+# Make sure we can import the modules from the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The functions we measure don't use Houdini, so an empty 'hou'
+# module is enough to import crowdIntrospection outside of it.
+try:
+    import hou
+except ImportError:
+    sys.modules["hou"] = types.ModuleType("hou")
+
+# Import local modules.
+import crowdIntrospection
+
+# Number of shapes to test, and shapes per Agent.
+SHAPE_COUNTS = (500, 1000, 2000, 3000, 4000, 5000)
+SHAPES_PER_AGENT = 10
+
+
+def synthetic_crowd(shape_count):
+    """Return a dictionary of Agents and Agent Shapes with 'shape_count' shapes in total."""
+    return {
+        f"agent{a}": tuple(
+            f"shape{a}_{s}" for s in range(SHAPES_PER_AGENT))
+        for a in range(shape_count // SHAPES_PER_AGENT)}
+
+
+def old_slots(agents_shapes_dict, textures):
+    """Build the multiparm values with the auxiliary list (OLD approach)."""
+    parms = {}
+    aux_list = []
+
+    for agent, shapes in agents_shapes_dict.items():
+        for shape in shapes:
+            aux_list.append(shape)
+            texture = textures[aux_list.index(shape)]
+            parm_counter = aux_list.index(shape) + 1
+            parms[f"matpath{parm_counter}"] = f"{agent}_{shape}"
+            parms[f"texture{parm_counter}"] = texture
+
+    return parms
+
+
+def new_slots(agents_shapes_dict, textures):
+    """Build the multiparm values with the precomputed shape slots (NEW approach)."""
+    parms = {}
+
+    for slot, (agent, shape) in enumerate(crowdIntrospection.shape_slots(agents_shapes_dict)):
+        parm_counter = slot + 1
+        parms[f"matpath{parm_counter}"] = f"{agent}_{shape}"
+        parms[f"texture{parm_counter}"] = textures[slot]
+
+    return parms
+
+
+if __name__ == "__main__":
+    print(f"{'shapes':>8} {'old (ms)':>10} {'new (ms)':>10} {'old us/shape':>14} {'new us/shape':>14}")
+
+    for shape_count in SHAPE_COUNTS:
+        agents_shapes_dict = synthetic_crowd(shape_count)
+        textures = [f"/textures/{i}.jpg" for i in range(shape_count)]
+
+        # Keep the best of a few runs to reduce noise.
+        old = min(timeit.repeat(lambda: old_slots(agents_shapes_dict, textures), number=1, repeat=3))
+        new = min(timeit.repeat(lambda: new_slots(agents_shapes_dict, textures), number=1, repeat=3))
+
+        print(f"{shape_count:>8} {old * 1e3:>10.2f} {new * 1e3:>10.2f} "
+              f"{old / shape_count * 1e6:>14.2f} {new / shape_count * 1e6:>14.2f}")
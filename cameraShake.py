@@ -3,8 +3,15 @@ CAMERA SHAKE TOOL
 -----------------
 Add some movement to your camera to make it look like it's handheld.
 Make sure your Camera node is selected when running this tool!
+
+This tool needs 'networkBuilder.py' and 'shelfProfiler.py' to be in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs).
 """
 
+# Import local modules.
+import networkBuilder
+import shelfProfiler
+
 # Get the selected camera.
 this_node = hou.selectedNodes()
 this_cam = this_node[0]
@@ -16,81 +23,74 @@ obj = hou.node("/obj")
 chopnet = obj.findOrCreateMotionEffectsNetwork()
 chopnet.setName(f"cameraShake_{this_cam.name()}", unique_name=True)
 
-# Inside the CHOPNet, create a Channel node and give it a name.
-channel_node = chopnet.createNode("channel")
-channel_node.setName(f"{this_cam.name()}_rotationClips", unique_name=True)
-
-# Pick the rotation channels from the camera and use "Euler Rotation".
-channel_node.parm("name0").set(f"{this_cam.name()}:r")
-channel_node.parm("type0").set(1)
-
-# Store the newly created channel's values as individual variables.
-channel_value_x = channel_node.parm("value0x")
-channel_value_y = channel_node.parm("value0y")
-channel_value_z = channel_node.parm("value0z")
+# Queue every node in a Network Builder and create them all at once
+# (single undo group, no recooks while building).
+builder = networkBuilder.NetworkBuilder("Camera Shake")
 
 # Store the camera's rotation parameters as individual variables.
 cam_rot_x = this_cam.parm("rx")
 cam_rot_y = this_cam.parm("ry")
 cam_rot_z = this_cam.parm("rz")
 
+# Inside the CHOPNet, create a Channel node.
+# Pick the rotation channels from the camera and use "Euler Rotation".
+# Set the channel units to Frames and the graph color to green.
+channel_node = builder.create_node(
+    chopnet, "channel",
+    parms={
+        "name0": f"{this_cam.name()}:r",
+        "type0": 1,
+        "units": 0})
+builder.call(lambda node: node.parmTuple("gcolor").set((0,1,0)), channel_node)
+
+# Give the Channel node a name.
+builder.call(
+    lambda node: node.setName(f"{this_cam.name()}_rotationClips", unique_name=True),
+    channel_node)
+
 # CONDITIONAL:
 # If rotation is animated, copy those keyframes into the channel's node values.
 # If rotation is NOT animated, just copy the camera's rotation values.
-if len(cam_rot_x.keyframes()) > 0:
-    for k in cam_rot_x.keyframes():
-        channel_value_x.setKeyframe(k)    
-else: 
-    channel_node.parm("value0x").set(this_cam.parm("rx").eval())
-
-if len(cam_rot_y.keyframes()) > 0:
-    for k in cam_rot_y.keyframes():
-        channel_value_y.setKeyframe(k)
-else: 
-    channel_node.parm("value0y").set(this_cam.parm("ry").eval())
-
-if len(cam_rot_z.keyframes()) > 0:
-    for k in cam_rot_z.keyframes():
-        channel_value_z.setKeyframe(k)    
-else: 
-    channel_node.parm("value0z").set(this_cam.parm("rz").eval())
-
-# Set the channel units to Frames and the graph color to green.
-channel_node.parm("units").set(0)
-channel_node.parmTuple("gcolor").set((0,1,0))
+for axis, cam_rot in zip("xyz", (cam_rot_x, cam_rot_y, cam_rot_z)):
+    if len(cam_rot.keyframes()) > 0:
+        builder.call(
+            lambda node, axis=axis, cam_rot=cam_rot:
+                node.parm(f"value0{axis}").setKeyframes(cam_rot.keyframes()),
+            channel_node)
+    else:
+        builder.set_parms(channel_node, {f"value0{axis}": cam_rot.eval()})
 
 # Turn off the Export flag on the Channel node.
-channel_node.setExportFlag(0)
-
-# Inside the CHOPNet, create a Math node.
-math_node = channel_node.parent().createNode("math")
-math_node.setName(f"{this_cam.name()}_addNoiseToRotation", unique_name=True)
-
-# The Math node will sum (Add) the rotation channels to the noise.
-math_node.parm("chopop").set(1)
-
-# Turn on the Display and Export flags on the Math node.
-math_node.setDisplayFlag(1)
-math_node.setExportFlag(1)
+builder.call(lambda node: node.setExportFlag(0), channel_node)
 
 # Inside the CHOPNet, create a Noise node.
-noise_node = chopnet.createNode("noise")
-
 # The name of the noise channels will be the same as in the Channel node (cam:rx,ry,rz).
-noise_node.parm("channelname").set(f"`run('chopls {channel_node.path()}')`")
+# Set the roughness to 0 for camera-like movements.
+noise_node = builder.create_node(chopnet, "noise", parms={"rough": 0})
+builder.call(
+    lambda noise, channel: noise.parm("channelname").set(f"`run('chopls {channel.path()}')`"),
+    noise_node, channel_node)
 
 # The seed of the noise will be $C (number of channels, i.e: 3).
-noise_node.parm("seed").setExpression("$C")
-
-# Set the roughness to 0 for camera-like movements.
-noise_node.parm("rough").set(0)
+builder.set_expressions(noise_node, {"seed": "$C"})
 
+# Inside the CHOPNet, create a Math node.
+# The Math node will sum (Add) the rotation channels to the noise.
 # Plug the Channel and Noise nodes into the Math inputs.
-math_node.setInput(0, channel_node)
-math_node.setInput(1, noise_node)
+math_node = builder.create_node(
+    chopnet, "math",
+    parms={"chopop": 1},
+    inputs=[channel_node, noise_node])
+builder.call(
+    lambda node: node.setName(f"{this_cam.name()}_addNoiseToRotation", unique_name=True),
+    math_node)
+
+# Turn on the Display and Export flags on the Math node.
+builder.call(lambda node: node.setDisplayFlag(1), math_node)
+builder.call(lambda node: node.setExportFlag(1), math_node)
 
 # Layout nodes inside the CHOPNet.
-chopnet.layoutChildren()
+builder.layout(chopnet)
 
 
 # CONTROLLERS
@@ -137,16 +137,21 @@ folder = hou.FolderParmTemplate(
 group.append(folder)
 
 # Applies this new template to the CHOPNet.
-chopnet.setParmTemplateGroup(group)
+builder.call(lambda node: node.setParmTemplateGroup(group), chopnet)
 
 # The «Stabilization» parameter controls the noise's «Period» parameter.
-noise_node.parm("period").setExpression(f"ch('{chopnet.path()}/stab')")
-
-# The «Amp» parameter controls the noise's «Amp» parameter
-noise_node.parm("amp").setExpression(f"ch('{chopnet.path()}/amp')")
-
+# The «Amp» parameter controls the noise's «Amp» parameter.
 # The «Seed» parameter controls the noise's Y Translate (changes the waveform and adds variation).
-noise_node.parm("transy").setExpression(f"ch('{chopnet.path()}/seed')")
+builder.set_expressions(noise_node, {
+    "period": f"ch('{chopnet.path()}/stab')",
+    "amp": f"ch('{chopnet.path()}/amp')",
+    "transy": f"ch('{chopnet.path()}/seed')"})
+
+# Create every queued node.
+builder.apply()
 
 # Deselect everything except the CHOPNet so the user sees where to tweak the values.
 chopnet.setCurrent(1, clear_all_selected=1)
+
+# Show how long every phase took (if profiling is enabled).
+shelfProfiler.report("Camera Shake")
@@ -0,0 +1,189 @@
+"""
+CROWD BATCH
+-----------
+Build the Crowd materials of many shots without any UI (e.g: on the farm).
+
+Does the same as 'crowdToSolaris.py' (--mode solaris) or
+'materialStylesheetsGUI.py' (--mode stylesheet), using a shape > texture
+mapping file instead of the UI.
+
+HOW IT WORKS
+------------
+- Run with hython. Every shot is a hip file and the path of its Crowd SOP
+  node (for stylesheets, the File Cache inside the Geometry node):
+
+    hython crowdBatch.py --mapping textures.json \\
+        --shot shot010.hip /obj/crowd/filecache1 \\
+        --shot shot020.hip /obj/crowd/filecache1
+
+- Or list the shots in a JSON file ([{"hip": ..., "sop": ..., "mapping": ...}],
+  where "mapping" is optional and overrides --mapping for that shot):
+
+    hython crowdBatch.py --mode stylesheet --mapping textures.json --shots shots.json
+
+- The mapping file is a JSON dictionary of Agents, Agent Shapes and textures:
+
+    {"<agent>": {"<shape>": "<texture file>"}}
+
+  The preset file saved by the shelf tools (see 'texturePresets.py') works too.
+
+- Every shot is loaded, built and saved in turn, so one hython process covers
+  the whole sequence. Shots that fail are reported and skipped, and the exit
+  code is 1 if any of them failed.
+
+- Set SHELF_PROFILE=1 (and optionally SHELF_PROFILE_LOG) to print how long
+  every phase of every shot took (see 'shelfProfiler.py').
+"""
+
+# Import built-in modules.
+import argparse
+import json
+import os
+import sys
+import traceback
+
+# Make sure we can import the modules living next to this script.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Import third-party modules.
+import hou
+
+# Import local modules.
+import crowdBuild
+import crowdIntrospection
+import shelfProfiler
+
+
+def parse_args(argv=None):
+    """Return the command line options."""
+    parser = argparse.ArgumentParser(
+        description="Build the Crowd materials of many shots without any UI.")
+    parser.add_argument(
+        "--mode", choices=("solaris", "stylesheet"), default="solaris",
+        help="Build a /stage network (solaris) or /mat shaders and a Material Stylesheet (stylesheet).")
+    parser.add_argument(
+        "--mapping",
+        help="Shape > texture mapping file ({\"<agent>\": {\"<shape>\": \"<texture>\"}}).")
+    parser.add_argument(
+        "--shot", nargs=2, action="append", default=[], metavar=("HIP", "SOP"),
+        help="A hip file and the path of its Crowd SOP node. Can be used many times.")
+    parser.add_argument(
+        "--shots",
+        help="JSON file with a list of shots ([{\"hip\": ..., \"sop\": ..., \"mapping\": ...}]).")
+    parser.add_argument(
+        "--all-frames", action="store_true",
+        help="Look for Agent Shapes in every cached frame instead of the current one.")
+    parser.add_argument(
+        "--usd-layer", action="store_true",
+        help="(solaris) Write materials to a USD layer instead of material nodes.")
+    parser.add_argument(
+        "--external-stylesheet", action="store_true",
+        help="(stylesheet) Store the Stylesheet in an external file.")
+    parser.add_argument(
+        "--preflight", action="store_true",
+        help="Check every texture and convert it to a mip-mapped format.")
+    parser.add_argument(
+        "--no-save", action="store_true",
+        help="Don't save the hip files (dry run).")
+
+    return parser.parse_args(argv)
+
+
+def read_shots(args):
+    """Return a list of shots (dictionaries with 'hip', 'sop' and 'mapping' keys)."""
+    shots = [{"hip": hip, "sop": sop} for hip, sop in args.shot]
+
+    if args.shots:
+        with open(args.shots) as f:
+            shots.extend(json.load(f))
+
+    # Shots without their own mapping file use the one from the command line.
+    for shot in shots:
+        shot.setdefault("mapping", args.mapping)
+
+    return shots
+
+
+def build_shot(shot, args, mappings):
+    """Load a shot, build its materials and save it."""
+    with shelfProfiler.phase("load hip"):
+        hou.hipFile.load(shot["hip"], suppress_save_prompt=True, ignore_load_warnings=True)
+
+    # Forget the shapes read in the previous shot (nodes of another hip may share the same path).
+    crowdIntrospection.clear_cache()
+
+    sop_node = hou.node(shot["sop"])
+    if sop_node is None:
+        raise ValueError(f"Node not found: {shot['sop']}")
+
+    # Read every mapping file only once.
+    mapping_file = shot["mapping"]
+    if mapping_file and mapping_file not in mappings:
+        mappings[mapping_file] = crowdBuild.load_mapping(mapping_file)
+    mapping = mappings.get(mapping_file, {})
+
+    # Find the Agents and Agent Shapes and pick the texture of every shape.
+    with shelfProfiler.phase("read shapes"):
+        if args.all_frames and crowdIntrospection.cache_file(sop_node):
+            agents_shapes_dict = crowdIntrospection.discover_shapes(sop_node)
+        else:
+            agents_shapes_dict = crowdIntrospection.agent_shapes_index(sop_node)
+
+    shape_slots = crowdIntrospection.shape_slots(agents_shapes_dict)
+    textures = crowdBuild.slot_textures(shape_slots, mapping)
+
+    if args.mode == "solaris":
+        output_node, errors = crowdBuild.build_solaris(
+            sop_node, shape_slots, textures,
+            usd_layer=args.usd_layer, preflight=args.preflight)
+        result = output_node.path()
+
+    else:
+        materials, slot_materials, errors = crowdBuild.prepare_materials(
+            textures, preflight=args.preflight)
+        crowdBuild.build_mat_nodes(materials)
+        changed, filepath = crowdBuild.build_stylesheet(
+            sop_node.parent(), shape_slots, slot_materials,
+            external=args.external_stylesheet)
+        result = filepath or f"{changed} styles updated"
+
+    for error in errors:
+        print(f"  WARNING: {error}")
+
+    if not args.no_save:
+        with shelfProfiler.phase("save hip"):
+            hou.hipFile.save()
+
+    return f"{len(shape_slots)} shapes, {sum(1 for texture in textures if texture)} textured > {result}"
+
+
+def main(argv=None):
+    """Build every shot. Returns the exit code (1 if any shot failed)."""
+    args = parse_args(argv)
+    shots = read_shots(args)
+    if not shots:
+        print("No shots to build (use --shot or --shots).")
+        return 1
+
+    mappings, failed = {}, []
+    for shot in shots:
+        print(f"{shot['hip']} ({shot['sop']})")
+        try:
+            print(f"  {build_shot(shot, args, mappings)}")
+        except Exception:
+            # Keep going with the next shot.
+            traceback.print_exc()
+            failed.append(shot["hip"])
+
+        # Print how long every phase of this shot took (if profiling is enabled).
+        shelfProfiler.report(f"crowdBatch {shot['hip']}")
+
+    print(f"{len(shots) - len(failed)} of {len(shots)} shots built.")
+    for hip in failed:
+        print(f"  FAILED: {hip}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
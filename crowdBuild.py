@@ -0,0 +1,383 @@
+"""
+CROWD BUILD
+-----------
+Build the material networks of a Crowd without any UI.
+
+Used by 'crowdToSolaris.py', 'materialStylesheetsGUI.py' and 'crowdBatch.py'.
+
+HOW IT WORKS
+------------
+- PREPARE_MATERIALS() groups the texture of every shape slot into materials
+  (see 'crowdMaterials.py') and optionally preflights them
+  (see 'texturePreflight.py').
+- BUILD_SOLARIS() imports a Crowd into /stage and creates its materials
+  (as nodes or as a USD layer), like 'crowdToSolaris.py'.
+- BUILD_MAT_NODES() and BUILD_STYLESHEET() create the Principled Shaders in
+  /mat and the Material Stylesheet of a Geometry node, like
+  'materialStylesheetsGUI.py'.
+- Every phase is measured by 'shelfProfiler.py' when profiling is enabled.
+- LOAD_MAPPING() and SLOT_TEXTURES() read a shape > texture mapping file
+  ({"<agent>": {"<shape>": "<texture file>"}}) and turn it into the texture
+  of every shape slot.
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import built-in modules.
+import json
+
+# Import third-party modules.
+import hou
+
+# Import local modules.
+import crowdMaterials
+import crowdStylesheet
+import crowdUsdLayer
+import networkBuilder
+import shelfProfiler
+import texturePreflight
+
+# Where the Crowd is imported in the /stage context.
+PATH_PREFIX = "/crowd"
+
+# Where the USD layer with materials is written (when that option is enabled).
+# NOTE: {node} is replaced by the path of the Crowd SOP node, so every Crowd gets its own layer.
+MATERIAL_LAYER = "$HIP/usd/{node}_materials.usdc"
+
+# Where the USD layer with one collection per material is written ({node}: see MATERIAL_LAYER).
+COLLECTION_LAYER = "$HIP/usd/{node}_collections.usdc"
+
+
+def layer_path(template, sop_node):
+    """Return the (expanded) path of a Crowd's USD layer (e.g: $HIP/usd/obj_crowd_filecache1_materials.usdc)."""
+    node_name = sop_node.path().strip("/").replace("/", "_")
+
+    return hou.text.expandString(template.format(node=node_name))
+
+
+def load_mapping(filepath):
+    """Read a shape > texture mapping file (Keys: Agent names, Values: {shape: texture}).
+
+    Preset files saved by the shelf tools (see 'texturePresets.py') can be used too.
+    """
+    with open(filepath) as f:
+        mapping = json.load(f)
+
+    # Preset files store the mapping in their "agents" key.
+    if "version" in mapping and isinstance(mapping.get("agents"), dict):
+        return mapping["agents"]
+
+    return mapping
+
+
+def slot_textures(shape_slots, mapping):
+    """Return the texture of every (Agent, Shape) pair in a mapping ("" for none)."""
+    return [mapping.get(agent, {}).get(shape, "") for agent, shape in shape_slots]
+
+
+@shelfProfiler.profiled("prepare materials")
+def prepare_materials(textures, preflight=False):
+    """Group the texture of every slot into materials.
+
+    Returns a tuple of:
+    - A dictionary of materials (Keys: Material names, Values: texture files).
+    - A list with the material name of every slot.
+    - A list of error messages from the preflight (empty if it's disabled).
+    """
+    materials, slot_materials = crowdMaterials.group_by_texture(textures)
+
+    # Check every texture and use its converted (mip-mapped) file instead.
+    errors = []
+    if preflight:
+        materials, errors = texturePreflight.preflight_materials(materials)
+
+    return materials, slot_materials, errors
+
+
+def is_static(sop_node):
+    """Return True if a Crowd is the same on every frame (e.g: a layout, or a single cached frame)."""
+    return not sop_node.isTimeDependent()
+
+
+@shelfProfiler.profiled("find prims")
+def material_prims(stage, shape_slots, materials, slot_materials, static=True):
+    """Return the prims using every material, found in the stage of the current frame.
+
+    Returns a tuple of two dictionaries (Keys: Material names):
+    - Values: the prim paths found (listed in the material's collection).
+    - Values: wildcard patterns (/crowd/<agent>_*/<shape>) for the shapes that
+      may have other prims on other frames: shapes without prims on this frame
+      (e.g: found in other cached frames), or every shape if the Crowd isn't
+      'static' (e.g: Agents born later in the simulation).
+    """
+    # Find the prims of every shape in the stage (once).
+    prim_paths = crowdUsdLayer.shape_prim_paths(stage, PATH_PREFIX, shape_slots)
+
+    # Iterate every slot and add its prims (or its pattern) to the lists of its material.
+    prims = {name: [] for name in materials}
+    patterns = {name: [] for name in materials}
+    for slot, paths in enumerate(prim_paths):
+        material = slot_materials[slot]
+        prims[material].extend(paths)
+
+        if not static or not paths:
+            agent, shape = shape_slots[slot]
+            patterns[material].append(crowdUsdLayer.shape_pattern(PATH_PREFIX, agent, shape))
+
+    return prims, patterns
+
+
+def queue_import(builder, lop, sop_node):
+    """Queue a SOP Import node bringing the Crowd into a LOP network."""
+    # Import the Agents as "Skelroots" so we can apply textures to their Shapes.
+    return builder.create_node(
+        lop, "sopimport", "import_crowd",
+        parms={
+            "soppath": sop_node.path(),
+            "pathprefix": PATH_PREFIX,
+            "enable_agenthandling": 1,
+            "agenthandling": "skelroots"})
+
+
+def queue_material_nodes(builder, lop, sop_node, input_node, materials, prims, patterns=None):
+    """Queue a Material Library and an Assign Material node with every material.
+
+    'prims' and 'patterns' are the prim paths and wildcard patterns of every
+    material (see MATERIAL_PRIMS()). Returns the Assign Material node (a PendingNode).
+    """
+    patterns = patterns or {}
+
+    # Write one USD collection per material, listing the exact prims using it,
+    # and queue a Sublayer node to bring them on top of the Crowd.
+    # NOTE: Binding collections is much cheaper than matching wildcard
+    # patterns against the whole Crowd hierarchy on every cook.
+    filepath = layer_path(COLLECTION_LAYER, sop_node)
+    with shelfProfiler.phase("write USD layer"):
+        crowdUsdLayer.write_collection_layer(filepath, PATH_PREFIX, prims)
+
+    collections_node = builder.create_node(
+        lop, "sublayer", "crowd_collections",
+        parms={"num_files": 1},
+        inputs=[input_node])
+    builder.set_parms(collections_node, {"filepath1": filepath})
+
+    # Queue a Material Library node and connect it to the Sublayer.
+    mat_library_node = builder.create_node(
+        lop, "materiallibrary", "set_materials",
+        parms={"materials": len(materials)},
+        inputs=[collections_node])
+
+    # Queue an Assign Material node and connect it to the Material Library.
+    assign_mat_node = builder.create_node(
+        lop, "assignmaterial", "assign_materials",
+        parms={"nummaterials": len(materials)},
+        inputs=[mat_library_node])
+
+    # Initialize dictionaries to store the multiparm values,
+    # so each node gets all of them in a single call.
+    library_parms, assign_parms = {}, {}
+
+    # Iterate the materials. The multiparm index is the material index plus one.
+    for parm_counter, (mat_name, texture) in enumerate(materials.items(), 1):
+        # Queue a Principled Shader node in the Material Library.
+        mat_node = builder.create_node(
+            mat_library_node,
+            "principledshader",
+            mat_name,
+            parms={
+                "basecolor_useTexture": bool(texture),
+                "basecolor_texture": texture})
+
+        # Adjust the parameters in the Material Library node.
+        library_parms[f"matnode{parm_counter}"] = mat_node
+        library_parms[f"matpath{parm_counter}"] = mat_name
+        library_parms[f"matflag{parm_counter}"] = 0
+        library_parms[f"assign{parm_counter}"] = 0
+
+        # Adjust the parameters in the Assign Material node.
+        # NOTE: Every shape using this material on this frame is in the material's
+        # collection. Shapes that may be on other frames are matched by their pattern too.
+        assign_parms[f"primpattern{parm_counter}"] = " ".join(
+            [f"{PATH_PREFIX}.collection:{mat_name}"] + patterns.get(mat_name, []))
+        assign_parms[f"matspecpath{parm_counter}"] = f"/materials/{mat_name}"
+
+    # Queue all the multiparm values.
+    builder.set_parms(mat_library_node, library_parms)
+    builder.set_parms(assign_mat_node, assign_parms)
+
+    # Layout nodes in the Material Library.
+    builder.layout(
+        mat_library_node,
+        horizontal_spacing=1.0,
+        vertical_spacing=1.0)
+
+    return assign_mat_node
+
+
+def queue_material_layer(builder, lop, sop_node, input_node, materials, prims, patterns=None):
+    """Write every material and binding to a USD layer, and queue a Sublayer node bringing it.
+
+    'prims' and 'patterns' are the prim paths and wildcard patterns of every
+    material (see MATERIAL_PRIMS()). Shapes with patterns are also bound by an
+    Assign Material node after the Sublayer. Returns the last node (a PendingNode).
+    """
+    # Write the layer.
+    # NOTE: Every material is bound once, to a collection listing the prims using it.
+    filepath = layer_path(MATERIAL_LAYER, sop_node)
+    with shelfProfiler.phase("write USD layer"):
+        crowdUsdLayer.write_material_layer(filepath, PATH_PREFIX, materials, prims)
+
+    # Queue a Sublayer node to bring the layer on top of the Crowd.
+    layer_node = builder.create_node(
+        lop, "sublayer", "crowd_materials",
+        parms={"num_files": 1},
+        inputs=[input_node])
+    builder.set_parms(layer_node, {"filepath1": filepath})
+
+    # USD collections can't hold wildcards, so the shapes that may be on other
+    # frames are bound by an Assign Material node (reading the layer's materials).
+    patterns = {name: pattern for name, pattern in (patterns or {}).items() if pattern}
+    if not patterns:
+        return layer_node
+
+    assign_mat_node = builder.create_node(
+        lop, "assignmaterial", "assign_other_frames",
+        parms={"nummaterials": len(patterns)},
+        inputs=[layer_node])
+
+    assign_parms = {}
+    for parm_counter, (mat_name, mat_patterns) in enumerate(patterns.items(), 1):
+        assign_parms[f"primpattern{parm_counter}"] = " ".join(mat_patterns)
+        assign_parms[f"matspecpath{parm_counter}"] = f"{crowdUsdLayer.MATERIALS_ROOT}/{mat_name}"
+    builder.set_parms(assign_mat_node, assign_parms)
+
+    return assign_mat_node
+
+
+def build_solaris(sop_node, shape_slots, textures=None, usd_layer=False, preflight=False,
+                  lop=None):
+    """Import a Crowd into a LOP network (/stage by default) and create its materials.
+
+    'textures' is a list with the texture file of every slot ("" for none).
+    If it's None, only the SOP Import is created.
+    Returns a tuple with the last node of the network and a list of preflight errors.
+    """
+    lop = lop or hou.node("/stage")
+
+    # Every node is queued in a Network Builder and created at once
+    # (no recooks while building). The SOP Import is created first, so the
+    # whole build is wrapped in one undo group (nested groups are merged into it).
+    builder = networkBuilder.NetworkBuilder("Crowd to Solaris")
+
+    with hou.undos.group(builder.label):
+        import_node = queue_import(builder, lop, sop_node)
+        output_node, errors = import_node, []
+
+        if textures is not None:
+            materials, slot_materials, errors = prepare_materials(textures, preflight)
+
+            # Create the SOP Import now, and find the prims of every shape
+            # in its stage to know which prims use each material.
+            builder.apply()
+            # NOTE: The stage only holds the Agents of the current frame, so Crowds
+            # that change over time also get wildcard patterns (see MATERIAL_PRIMS()).
+            prims, patterns = material_prims(
+                import_node.node.stage(), shape_slots, materials, slot_materials,
+                static=is_static(sop_node))
+
+            # Write the materials to a USD layer, or create the material nodes.
+            if usd_layer:
+                output_node = queue_material_layer(
+                    builder, lop, sop_node, import_node, materials, prims, patterns)
+            else:
+                output_node = queue_material_nodes(
+                    builder, lop, sop_node, import_node, materials, prims, patterns)
+
+        # Display the last node and set it as selected.
+        builder.call(lambda node: node.setDisplayFlag(1), output_node)
+        builder.call(lambda node: node.setSelected(1, clear_all_selected=True), output_node)
+
+        # Layout nodes in the LOP network and create every queued node.
+        builder.layout(lop)
+        builder.apply()
+
+    return output_node.node, errors
+
+
+@shelfProfiler.profiled("mat nodes")
+def build_mat_nodes(materials, mat=None):
+    """Create a Principled Shader per material in a SHOP/MAT network (/mat by default).
+
+    Shaders already in the network (e.g: from a previous run) are reused, and
+    only their texture is updated if it changed.
+    """
+    mat = mat or hou.node("/mat")
+
+    # Queue every node in a Network Builder and create them at once at the end.
+    builder = networkBuilder.NetworkBuilder("Material Stylesheets for Crowd")
+
+    # Keep track of the nodes we need to create.
+    new_nodes = 0
+
+    for mat_name, texture in materials.items():
+        mat_node = mat.node(mat_name)
+        parms = {
+            "basecolor_useTexture": bool(texture),
+            "basecolor_texture": texture}
+
+        # If it doesn't exist, queue a Principled Shader node pointing to the texture.
+        if mat_node is None:
+            builder.create_node(mat, "principledshader", mat_name, parms=parms)
+            new_nodes += 1
+
+        # If it exists but points to another file, only update its texture.
+        elif mat_node.parm("basecolor_texture").eval() != texture:
+            builder.set_parms(mat_node, parms)
+
+    # Layout nodes in the network (only if we added new ones).
+    if new_nodes:
+        builder.layout(mat, horizontal_spacing=1.0, vertical_spacing=1.0)
+
+    builder.apply()
+
+
+@shelfProfiler.profiled("stylesheet")
+def build_stylesheet(geo_node, shape_slots, slot_materials, external=False):
+    """Generate the Material Stylesheet of a Geometry node.
+
+    If 'external' is True, the stylesheet is written to a file that the node
+    reads lazily (see 'crowdStylesheet.py'), instead of being stored in the hip file.
+    Returns a tuple with the number of styles that changed (None for external
+    files) and the stylesheet file (an empty string if it's stored in the hip file).
+    """
+    # Create a style for each material, targeting every Agent Shape using it.
+    styles = crowdStylesheet.material_styles(shape_slots, slot_materials)
+    stylesheet_name = f"{geo_node.name()}_stylesheet"
+
+    # Write the styles one at a time to a file and link it to the Geometry node.
+    if external:
+        filepath = crowdStylesheet.styles_file(stylesheet_name)
+        crowdStylesheet.write_styles_file(filepath, styles)
+        crowdStylesheet.link_styles_file(geo_node, filepath)
+
+        # Remove the stylesheet stored in the hip file (if any), so it isn't applied twice.
+        if hou.styles.styleExists(stylesheet_name):
+            hou.styles.removeStyle(stylesheet_name)
+
+        return None, filepath
+
+    # Styles created by older versions of the tool (one per Agent Shape) are replaced.
+    old_labels = [f"{agent}_{shape}" for agent, shape in shape_slots]
+
+    # Load the stylesheet generated in a previous run (if any) and update only the styles that changed.
+    existing_styles = crowdStylesheet.load_styles(stylesheet_name)
+    merged, changed = crowdStylesheet.update_styles(existing_styles, list(styles), old_labels)
+
+    # Save the stylesheet only if something changed.
+    if changed:
+        crowdStylesheet.save_styles(stylesheet_name, merged)
+
+    return changed, ""
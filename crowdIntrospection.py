@@ -0,0 +1,373 @@
+"""
+CROWD INTROSPECTION
+-------------------
+Shared helpers to find out which Agents and Agent Shapes live in a Crowd sim.
+
+Used by 'crowdToSolaris.py' and 'materialStylesheetsGUI.py'.
+
+HOW IT WORKS
+------------
+- AGENT_SHAPES_INDEX() returns a dictionary of Agent names and Agent Shapes
+  (Keys: Agent Names, Values: tuple of Agent Shapes).
+- Results are stored per SOP node, so reopening either tool on the same
+  cache is instant and does not cook the geometry again.
+- The stored results are discarded as soon as the node cooks again or the
+  cache file it reads from is modified on disk.
+- When the node reads from a cache on disk (e.g: File Cache), a small
+  manifest is written next to it (<cache name>.shapes.json). Later runs read
+  that manifest instead of loading the cached crowd, and only fall back to
+  cooking the geometry when the manifest is missing, older than the cache,
+  or doesn't cover the frame(s) being read (it stores the frames it lists).
+- DISCOVER_SHAPES() looks for Agent Shapes in EVERY frame of a cache (e.g:
+  Agent layers that switch mid-shot). The frames are split across a pool of
+  headless 'hython' processes running 'crowdShapeWorker.py', and their
+  results are merged into a single dictionary.
+
+IMPORTANT
+---------
+Make sure this file (and 'hythonProcess.py') is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import built-in modules.
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import re
+import subprocess
+
+# Import third-party modules.
+import hou
+
+# Import local modules.
+import hythonProcess
+
+# Parameters where File Cache and File nodes store their file path.
+CACHE_FILE_PARMS = ("sopoutput", "file")
+
+# Version of the shape manifest format. Manifests with another version are ignored.
+MANIFEST_VERSION = 1
+
+# Frame number and geometry extension at the end of a cache file name
+# (e.g: ".0012.bgeo.sc"). They are removed to name the manifest.
+CACHE_SUFFIX = re.compile(r"(?:[._]\d+)?\.(?:bgeo|geo|abc|usd|usda|usdc)(?:\.(?:sc|gz|lz4))?$")
+
+# Minimum number of cache files a worker process should read.
+# Below this, starting 'hython' costs more than reading the files here.
+MIN_FILES_PER_WORKER = 20
+
+# Script run by every worker process.
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "crowdShapeWorker.py")
+
+# Stored results, keyed by SOP node path.
+# Values are tuples of (cache key, agent shapes index).
+_index_cache = {}
+
+# Stored results of DISCOVER_SHAPES(), keyed by (SOP node path, first frame, last frame).
+_discovery_cache = {}
+
+
+def cache_file(node):
+    """Return the file a SOP node reads from, or an empty string if none."""
+    for parm_name in CACHE_FILE_PARMS:
+        parm = node.parm(parm_name)
+        if parm is not None:
+            return parm.eval()
+
+    return ""
+
+
+def cache_key(node):
+    """Return a value that changes whenever the node's geometry may change."""
+    # Pick the modification time of the cache file (if it exists on disk).
+    filepath = cache_file(node)
+    mtime = os.path.getmtime(filepath) if os.path.isfile(filepath) else None
+
+    return (node.cookCount(), mtime)
+
+
+def manifest_path(node):
+    """Return the path of the shape manifest for a node's cache, or an empty string."""
+    filepath = cache_file(node)
+    if not filepath:
+        return ""
+
+    # Remove the frame number and extension from the cache file name
+    # (i.e: All the frames of a cache share the same manifest).
+    folder, filename = os.path.split(filepath)
+    name = CACHE_SUFFIX.sub("", filename)
+
+    return os.path.join(folder, f"{name}.shapes.json").replace("\\", "/")
+
+
+def read_manifest(node, first, last):
+    """Return the manifest of a node's cache, or None if it is missing, stale,
+    or doesn't cover every frame from 'first' to 'last'.
+    """
+    manifest = manifest_path(node)
+    if not manifest or not os.path.isfile(manifest):
+        return None
+
+    # Load the manifest, ignoring broken files and other versions.
+    try:
+        with open(manifest) as f:
+            data = json.load(f)
+        manifest_first, manifest_last = (int(frame) for frame in data["frame_range"][:2])
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+    if data.get("version") != MANIFEST_VERSION:
+        return None
+
+    # A manifest only lists the shapes of the frames it was written from.
+    if first < manifest_first or last > manifest_last:
+        return None
+
+    # Without a cache on disk there is nothing to compare against.
+    filepaths = cache_files(node, (manifest_first, manifest_last, 1))
+    if not filepaths:
+        return None
+
+    # If any frame it covers was written after the manifest, the manifest is stale.
+    if max(os.path.getmtime(filepath) for filepath in filepaths) > os.path.getmtime(manifest):
+        return None
+
+    return data
+
+
+def write_manifest(node, agents_shapes_dict, frame_range):
+    """Write the manifest of a node's cache next to the cache file."""
+    # Only caches that exist on disk get a manifest.
+    manifest = manifest_path(node)
+    if not manifest or not os.path.isfile(cache_file(node)):
+        return
+
+    data = {
+        "version": MANIFEST_VERSION,
+        "frame_range": list(frame_range),
+        "agents": {agent: list(shapes) for agent, shapes in agents_shapes_dict.items()},
+    }
+
+    # The cache folder may be read-only (e.g: a published cache).
+    # In that case, simply skip the manifest.
+    try:
+        with open(manifest, "w") as f:
+            json.dump(data, f, indent=4)
+    except OSError:
+        pass
+
+
+def read_agent_shapes(geo):
+    """Read the Agents and their Agent Shapes from a Crowd geometry.
+
+    The points are visited once, and shapes are stored under the Agent name
+    of each point, so the result is correct for any number of Agents.
+    Only one shape library is read per Agent name, so the cost grows with
+    the number of Agent definitions, not with the size of the crowd.
+    """
+    # Pick the "Agent Name" point attribute.
+    # NOTE: This is a single call that returns the names of every point at once.
+    agent_names = geo.pointStringAttribValues("agentname")
+
+    # Initialize a dictionary of ordered sets
+    # (Keys: Agent Names, Values: dictionaries whose keys are the Agent Shapes).
+    shape_sets = {}
+
+    # Iterate the points (i.e: the Agents) in a single pass.
+    for point_number, agent in enumerate(agent_names):
+        # Agents sharing the same name share the same shape library,
+        # so only the first point of each Agent needs to be looked at.
+        if agent in shape_sets:
+            continue
+
+        # Get the Agent primitive attached to this point and
+        # pick its "agentshapelibrary" intrinsic.
+        prim = geo.point(point_number).prims()[0]
+        shape_library = prim.intrinsicValue("agentshapelibrary")
+
+        # Discard shapes from the Collision Layer (keep only the "default" and custom ones).
+        shape_sets[agent] = dict.fromkeys(
+            x for x in shape_library if not x.startswith("collision"))
+
+    # Convert the ordered sets into tuples.
+    return {agent: tuple(shape_set) for agent, shape_set in shape_sets.items()}
+
+
+def agent_shapes_index(node):
+    """Return a dictionary of Agent names and Agent Shapes for a SOP node.
+
+    The result is reused until the node cooks again or its cache file changes.
+    """
+    # If nothing changed since the last time, return the stored result.
+    stored = _index_cache.get(node.path())
+    if stored and stored[0] == cache_key(node):
+        return stored[1]
+
+    # If the cache has an up-to-date manifest, read it without cooking the node.
+    frame = int(hou.frame())
+    manifest = read_manifest(node, frame, frame)
+    if manifest:
+        agents_shapes_dict = {
+            agent: tuple(shapes) for agent, shapes in manifest["agents"].items()}
+
+    # Otherwise, read the Agents from the geometry (this may cook the node)
+    # and write a manifest for the next time.
+    else:
+        agents_shapes_dict = read_agent_shapes(node.geometry())
+        write_manifest(node, agents_shapes_dict, (frame, frame))
+
+    # Store the result with the key we get AFTER cooking the node.
+    _index_cache[node.path()] = (cache_key(node), agents_shapes_dict)
+
+    return agents_shapes_dict
+
+
+def shape_slots(agents_shapes_dict):
+    """Return a stable index of every Agent Shape as a list of (agent, shape) pairs.
+
+    The position of a pair in the list is its slot: the index of its button
+    and texture, and (plus one) the index of its multiparms. Shapes shared
+    by several Agents get one slot per Agent.
+    """
+    return [
+        (agent, shape)
+        for agent, shapes in agents_shapes_dict.items()
+        for shape in shapes]
+
+
+def merge_agent_shapes(agents_shapes_dict, other):
+    """Add the Agents and Agent Shapes of 'other' to 'agents_shapes_dict'."""
+    for agent, shapes in other.items():
+        # Use an ordered set to join both groups of shapes,
+        # removing duplicates but keeping their order.
+        shape_set = dict.fromkeys(agents_shapes_dict.get(agent, ()))
+        shape_set.update(dict.fromkeys(shapes))
+        agents_shapes_dict[agent] = tuple(shape_set)
+
+    return agents_shapes_dict
+
+
+def read_cache_files(filepaths):
+    """Load cache files from disk and return the union of their Agents and Agent Shapes."""
+    agents_shapes_dict = {}
+
+    for filepath in filepaths:
+        # Load the cached frame in a standalone geometry (no nodes involved).
+        geo = hou.Geometry()
+        geo.loadFromFile(filepath)
+        merge_agent_shapes(agents_shapes_dict, read_agent_shapes(geo))
+
+    return agents_shapes_dict
+
+
+def cache_frame_range(node):
+    """Return the (first, last, increment) frames of a node's cache."""
+    # File Cache nodes store their frame range in the "Start/End/Inc" parameter.
+    frame_parm = node.parmTuple("f")
+    if frame_parm is not None:
+        first, last, increment = frame_parm.eval()
+    # Otherwise, use the frame range of the scene.
+    else:
+        first, last = hou.playbar.frameRange()
+        increment = 1
+
+    return int(first), int(last), max(int(increment), 1)
+
+
+def cache_files(node, frame_range):
+    """Return the cache files on disk for every frame in the range (without duplicates)."""
+    # Find the parameter storing the file path.
+    parm = next(
+        (node.parm(name) for name in CACHE_FILE_PARMS if node.parm(name) is not None),
+        None)
+    if parm is None:
+        return []
+
+    # Evaluate the file path at every frame.
+    # NOTE: Static caches return the same file for every frame.
+    first, last, increment = frame_range
+    filepaths = dict.fromkeys(
+        parm.evalAtFrame(frame) for frame in range(first, last + 1, increment))
+
+    return [filepath for filepath in filepaths if os.path.isfile(filepath)]
+
+
+def run_worker(hython, filepaths):
+    """Read a list of cache files in a headless 'hython' process."""
+    # Send the list of files through stdin (it may be too long for a command line).
+    process = subprocess.run(
+        [hython, WORKER_SCRIPT],
+        input=json.dumps(filepaths),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True)
+
+    # If the worker failed, read its files here instead.
+    if process.returncode != 0:
+        return read_cache_files(filepaths)
+
+    # The result is printed as JSON on the last line of the output.
+    lines = process.stdout.strip().splitlines()
+    if not lines:
+        return {}
+
+    # If something else was printed last (e.g: a license warning), read the files here instead.
+    try:
+        return json.loads(lines[-1])
+    except ValueError:
+        return read_cache_files(filepaths)
+
+
+def discover_shapes(node, workers=None):
+    """Return a dictionary of Agent names and Agent Shapes found in ANY frame of a cache.
+
+    The cache files are split across 'workers' headless 'hython' processes
+    (one per CPU by default). Small caches, or sessions without 'hython',
+    are read in this process instead.
+    """
+    frame_range = cache_frame_range(node)
+    first, last = frame_range[:2]
+
+    # If nothing changed since the last time, return the stored result.
+    stored = _discovery_cache.get((node.path(), first, last))
+    if stored and stored[0] == cache_key(node):
+        return stored[1]
+
+    # If the cache has an up-to-date manifest covering these frames, use it.
+    manifest = read_manifest(node, first, last)
+    if manifest:
+        agents_shapes_dict = {
+            agent: tuple(shapes) for agent, shapes in manifest["agents"].items()}
+
+    else:
+        # Get the cache files and decide how many workers we need.
+        filepaths = cache_files(node, frame_range)
+        workers = workers or os.cpu_count() or 1
+        workers = min(workers, len(filepaths) // MIN_FILES_PER_WORKER)
+        hython = hythonProcess.hython_path()
+
+        # Few files (or no 'hython'): read them here.
+        if workers < 2 or not hython:
+            agents_shapes_dict = read_cache_files(filepaths)
+
+        # Otherwise, split the files into one shard per worker and merge their results.
+        # NOTE: Threads only wait for the worker processes, which do the actual work.
+        else:
+            shards = [filepaths[i::workers] for i in range(workers)]
+            agents_shapes_dict = {}
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for result in pool.map(lambda shard: run_worker(hython, shard), shards):
+                    merge_agent_shapes(agents_shapes_dict, result)
+
+        # Write a manifest for the next time.
+        write_manifest(node, agents_shapes_dict, (first, last))
+
+    _discovery_cache[(node.path(), first, last)] = (cache_key(node), agents_shapes_dict)
+
+    return agents_shapes_dict
+
+
+def clear_cache():
+    """Forget every stored result."""
+    _index_cache.clear()
+    _discovery_cache.clear()
@@ -0,0 +1,112 @@
+"""
+CROWD MATERIALS
+---------------
+Shared helpers to decide which materials the crowd tools need to create.
+
+Used by 'crowdToSolaris.py' and 'materialStylesheetsGUI.py'.
+
+HOW IT WORKS
+------------
+- GROUP_BY_TEXTURE() takes the texture file chosen for every shape slot and
+  groups the slots by texture content (SHA-1 of the file), so shapes using the
+  same image (even from different paths) or no image at all share ONE material.
+- Hashes are stored per file path, size and modification time, so the same
+  texture is only read once per Houdini session.
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import built-in modules.
+import hashlib
+import os
+import re
+
+# Name of the material used by shapes without a texture.
+UNTEXTURED_MATERIAL = "untextured"
+
+# Size of the chunks read when hashing a texture (1 MB).
+HASH_CHUNK_SIZE = 1 << 20
+
+# Characters not allowed in node and USD prim names.
+INVALID_NAME_CHARS = re.compile(r"[^A-Za-z0-9_]")
+
+# Stored hashes, keyed by (file path, size, modification time).
+_hash_cache = {}
+
+
+def texture_hash(filepath):
+    """Return the SHA-1 of a texture file's content.
+
+    Missing files are hashed by their path, so they still get their own material.
+    """
+    # If the file doesn't exist, use its path instead of its content.
+    if not os.path.isfile(filepath):
+        return hashlib.sha1(filepath.encode("utf-8")).hexdigest()
+
+    # If the file didn't change since the last time, return the stored hash.
+    stat = os.stat(filepath)
+    key = (filepath, stat.st_size, stat.st_mtime)
+    if key in _hash_cache:
+        return _hash_cache[key]
+
+    # Read the file in chunks so big textures don't sit fully in memory.
+    sha1 = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha1.update(chunk)
+
+    _hash_cache[key] = sha1.hexdigest()
+
+    return _hash_cache[key]
+
+
+def material_name(filepath, digest):
+    """Return a valid node/prim name for the material of a texture file."""
+    # Use the file name (without extension) plus a short hash to keep it unique.
+    stem = os.path.splitext(os.path.basename(filepath))[0]
+    name = INVALID_NAME_CHARS.sub("_", stem)
+
+    # Names can't start with a number.
+    if not name or name[0].isdigit():
+        name = f"tex_{name}"
+
+    return f"{name}_{digest[:8]}"
+
+
+def group_by_texture(textures):
+    """Group shape slots by texture content.
+
+    'textures' is a list with the texture file of every slot ("" for none).
+    Returns a tuple of:
+    - A dictionary of materials (Keys: Material names, Values: texture files).
+    - A list with the material name of every slot.
+    """
+    materials = {}
+    slot_materials = []
+
+    # Material name of every texture path and texture hash we already looked at.
+    path_materials, hash_materials = {}, {}
+
+    for filepath in textures:
+        # Slots without a texture share the same material.
+        if not filepath:
+            name = UNTEXTURED_MATERIAL
+
+        # Hash every path only once (many slots usually share the same file).
+        elif filepath in path_materials:
+            name = path_materials[filepath]
+
+        # Files with the same content share the material of the first one found.
+        else:
+            digest = texture_hash(filepath)
+            name = hash_materials.setdefault(digest, material_name(filepath, digest))
+            path_materials[filepath] = name
+
+        # The first texture found for a material is the one it will use.
+        materials.setdefault(name, filepath)
+        slot_materials.append(name)
+
+    return materials, slot_materials
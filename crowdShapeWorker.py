@@ -0,0 +1,32 @@
+"""
+CROWD SHAPE WORKER
+------------------
+Headless worker used by crowdIntrospection.DISCOVER_SHAPES().
+
+HOW IT WORKS
+------------
+- Run with 'hython crowdShapeWorker.py'.
+- Reads a JSON list of cache files from stdin.
+- Loads every file and prints the union of their Agents and Agent Shapes
+  as a JSON dictionary on the last line of stdout.
+"""
+
+# Import built-in modules.
+import json
+import os
+import sys
+
+# Make sure we can import the modules living next to this script.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Import local modules.
+import crowdIntrospection
+
+
+if __name__ == "__main__":
+    # Read the list of cache files.
+    filepaths = json.load(sys.stdin)
+
+    # Load them and print the result.
+    agents_shapes_dict = crowdIntrospection.read_cache_files(filepaths)
+    print(json.dumps(agents_shapes_dict))
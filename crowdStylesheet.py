@@ -0,0 +1,209 @@
+"""
+CROWD STYLESHEET
+----------------
+Shared helpers to generate the Material Stylesheet of a Crowd.
+
+Used by 'materialStylesheetsGUI.py'.
+
+HOW IT WORKS
+------------
+- MATERIAL_STYLES() builds ONE style per material, whose target matches
+  every shape using that material (a space-separated shape pattern), instead
+  of one style per Agent Shape. This keeps the stylesheet small and fast to
+  match at render time, even on huge crowds.
+- UPDATE_STYLES() compares those styles with the ones already in the scene,
+  matching them by label (crowd:<material>). Only new or changed styles are
+  rewritten, styles of materials that are no longer used are removed, and
+  styles the tool doesn't know about are kept as they are, so running the
+  tool again doesn't create duplicate values.
+- Stylesheets are stored as minified JSON.
+- Optionally, WRITE_STYLES_FILE() writes the stylesheet to an external file
+  (one style at a time, so big stylesheets never sit fully in memory) and
+  LINK_STYLES_FILE() makes the object read that file only when its Material
+  Style Sheet is evaluated, instead of embedding the JSON in the hip file.
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import built-in modules.
+from collections import OrderedDict
+import json
+import os
+
+# Import third-party modules.
+import hou
+
+# Labels of the styles generated by this module start with this prefix.
+# Styles with other labels are never modified.
+LABEL_PREFIX = "crowd:"
+
+# Where external stylesheet files are written.
+STYLESHEET_DIR = "$HIP/stylesheets"
+
+# Object parameter (render property) holding the Material Style Sheet.
+STYLESHEET_PARM = "shop_materialstylesheet"
+
+
+def shape_style(label, shape, material_path):
+    """Return the style overriding the material of a shape (or shape pattern)."""
+    # Target geometry
+    sub_target = OrderedDict()
+    sub_target["label"] = "Sub-target"
+    sub_target["shape"] = shape
+
+    target = OrderedDict()
+    target["label"] = "Target"
+    target["subTarget"] = sub_target
+
+    # Override materials
+    name = OrderedDict()
+    name["type"] = "string"
+    name["value"] = material_path
+
+    material = OrderedDict()
+    material["name"] = name
+
+    overrides = OrderedDict()
+    overrides["material"] = material
+
+    style = OrderedDict()
+    style["label"] = label
+    style["target"] = target
+    style["overrides"] = overrides
+
+    return style
+
+
+def material_styles(shape_slots, slot_materials, material_root="/mat"):
+    """Yield one style per material, targeting every shape that uses it.
+
+    'shape_slots' is a list of (agent, shape) pairs, and 'slot_materials'
+    the material name of every slot.
+    """
+    # Group the shapes by material, removing duplicates but keeping their order.
+    material_shapes = OrderedDict()
+    for (agent, shape), material in zip(shape_slots, slot_materials):
+        material_shapes.setdefault(material, OrderedDict())[shape] = None
+
+    # Create a style per material. Its target is a pattern with all its shapes.
+    # NOTE: Styles are created one at a time, as they are needed.
+    for material, shapes in material_shapes.items():
+        yield shape_style(
+            f"{LABEL_PREFIX}{material}",
+            " ".join(shapes),
+            f"{material_root}/{material}")
+
+
+def load_styles(stylesheet_name):
+    """Return the styles of a stylesheet in the scene (an empty list if it doesn't exist)."""
+    if not hou.styles.styleExists(stylesheet_name):
+        return []
+
+    stylesheet = json.loads(hou.styles.getStyleAsJSON(stylesheet_name))
+
+    return stylesheet.get("styles", [])
+
+
+def update_styles(existing, styles, obsolete_labels=()):
+    """Merge new styles into the existing ones, matching them by label.
+
+    Existing styles generated by this module (see LABEL_PREFIX) that are not
+    in 'styles', or whose label is in 'obsolete_labels', are removed.
+    Returns a tuple with the merged list of styles and how many of them changed.
+    """
+    # Remove the styles we generated before and don't need anymore.
+    labels = {style["label"] for style in styles}
+    obsolete_labels = set(obsolete_labels)
+    merged = [
+        style for style in existing
+        if style.get("label") in labels or not (
+            style.get("label", "").startswith(LABEL_PREFIX)
+            or style.get("label") in obsolete_labels)]
+    changed = len(existing) - len(merged)
+
+    # Index the remaining styles by label.
+    positions = {style.get("label"): i for i, style in enumerate(merged)}
+
+    for style in styles:
+        position = positions.get(style["label"])
+
+        # New style: add it at the end.
+        if position is None:
+            positions[style["label"]] = len(merged)
+            merged.append(style)
+            changed += 1
+
+        # Existing style with different values: replace it.
+        elif merged[position] != style:
+            merged[position] = style
+            changed += 1
+
+    return merged, changed
+
+
+def save_styles(stylesheet_name, styles):
+    """Store the styles in the scene as a stylesheet, replacing the previous one."""
+    stylesheet = OrderedDict()
+    stylesheet["styles"] = styles
+
+    if hou.styles.styleExists(stylesheet_name):
+        hou.styles.removeStyle(stylesheet_name)
+
+    # Store it as minified JSON (no indentation, no spaces after separators).
+    hou.styles.addStyle(stylesheet_name, "", json.dumps(stylesheet, separators=(",", ":")))
+
+
+def styles_file(stylesheet_name):
+    """Return the (unexpanded) path of the external file of a stylesheet."""
+    return f"{STYLESHEET_DIR}/{stylesheet_name}.json"
+
+
+def write_styles_file(filepath, styles):
+    """Write styles to a minified JSON file, encoding them one at a time.
+
+    'styles' can be any iterable (e.g: the generator returned by MATERIAL_STYLES()),
+    so the whole stylesheet never needs to be in memory.
+    """
+    # Create the folder if needed.
+    filepath = hou.text.expandString(filepath)
+    folder = os.path.dirname(filepath)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    encoder = json.JSONEncoder(separators=(",", ":"))
+
+    # Write to a temporary file first, so a render never reads a half-written stylesheet.
+    temp_filepath = f"{filepath}.tmp"
+    with open(temp_filepath, "w") as f:
+        f.write('{"styles":[')
+        for i, style in enumerate(styles):
+            if i:
+                f.write(",")
+            for chunk in encoder.iterencode(style):
+                f.write(chunk)
+        f.write("]}")
+
+    os.replace(temp_filepath, filepath)
+
+
+def link_styles_file(node, filepath):
+    """Make an object read its Material Style Sheet from a file.
+
+    The file is only read when the parameter is evaluated (e.g: at render time),
+    so the stylesheet is not stored in the hip file.
+    """
+    # Add the Material Style Sheet parameter if the object doesn't have it yet.
+    parm = node.parm(STYLESHEET_PARM)
+    if parm is None:
+        group = node.parmTemplateGroup()
+        group.append(hou.StringParmTemplate(STYLESHEET_PARM, "Material Style Sheet", 1))
+        node.setParmTemplateGroup(group)
+        parm = node.parm(STYLESHEET_PARM)
+
+    # Read the file with a Python expression (i.e: lazily).
+    parm.setExpression(
+        f"hou.readFile(hou.text.expandString({filepath!r}))",
+        hou.exprLanguage.Python)
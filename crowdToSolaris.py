@@ -6,24 +6,70 @@ Import your Crowd sim into Solaris and optionally add textures with a UI.
 HOW IT WORKS
 ------------
 - Run the tool and select the SOP node containing your Crowd sim.
+- If the node reads from a cache on disk, choose whether to look for shapes
+  in the current frame or in every cached frame.
 - The 'Apply Textures to Crowd' window will open.
-- Choose a texture file for each shape and hit 'Apply Materials'.
+- Choose a texture file for each shape (double-click its Texture cell, or
+  click on '...' to browse) and hit 'Apply Materials'.
+  You can also click on 'Match Folder...' and pick a folder with your
+  textures: every shape gets the texture whose name matches it best, and
+  the match score is shown next to it so you can review it.
 
 The following nodes will be created in the /stage/ context:
 
 - SOP Import: Brings your Crowd sim into Solaris. 
+- Sublayer: Brings a USD layer ($HIP/usd/<node>_collections.usdc) with one
+  collection per material, listing the exact prims of its shapes.
 - Material Library: Contains the Principled Shader materials.
-- Assign Material: Assigns those materials to their corresponding shapes.
+  Shapes using the same texture (or no texture) share a single material.
+- Assign Material: Assigns those materials to their collections.
+
+If 'Write materials to a USD layer' is checked, the Material Library and
+Assign Material nodes are replaced by a single Sublayer node, bringing a USD
+layer ($HIP/usd/<node>_materials.usdc) with every material and binding.
+Its cook time doesn't grow with the number of shapes.
+
+Collections only list the prims of the current frame. If the Crowd changes
+over time (e.g: Agents born later in the sim), or a shape was only found in
+other cached frames, its prims are also matched with a wildcard pattern
+(/crowd/<agent>_*/<shape>), which is slower to cook.
+
+If 'Preflight textures' is checked, every texture is checked and converted
+to a tiled, mip-mapped format (RAT by default, see 'texturePreflight.py')
+before creating the materials, so the renderer only loads the mip levels
+it needs. Missing or unconvertible files are reported.
 
 If you do not want to add any textures, click on 'Skip this step'
 and only the SOP Import will be created.
+
+The textures you apply are saved as presets (see 'texturePresets.py'), and
+filled in automatically the next time the same Agents show up in any shot.
+
+To build the same network without any UI (e.g: on the farm, or for many
+shots at once), use 'crowdBatch.py' with a shape > texture mapping file.
+
+IMPORTANT
+---------
+This tool needs 'crowdBuild.py', 'crowdIntrospection.py', 'crowdMaterials.py',
+'crowdStylesheet.py', 'crowdUsdLayer.py', 'hythonProcess.py', 'networkBuilder.py', 'shapeTableView.py',
+'shelfProfiler.py', 'textureMatcher.py', 'texturePreflight.py' and 'texturePresets.py'
+to be in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs).
 """
 
 # Import built-in modules.
-from numpy import cumsum
-from PySide2 import QtGui, QtWidgets, QtCore
+from PySide2 import QtWidgets
 import sys
 
+# Import local modules.
+import crowdBuild
+import crowdIntrospection
+import shapeTableView
+import shelfProfiler
+import textureMatcher
+import texturePresets
+
+
 # GATHER AGENT INFO
 # Let the user choose the SOP node containing the Crowd.
 selected_node = hou.ui.selectNode(
@@ -36,79 +82,32 @@ if selected_node:
 else:
     sys.exit()
     
-# Initialize lists to store Agent Names and Agent Shapes.
-agent_list = []
-shape_list = []
-
-# Access the Geometry level, pick the "Agent Name" point attribute
-# and add it to the Agent list.
-geo = crowd_cache_node.geometry()
-agent_name = geo.pointStringAttribValues("agentname")
-agent_list.append(agent_name)
-
-# Access the Primitive level.
-prims = geo.prims()
-
-# Iterate the Prims (i.e: the Agents).
-for prim in prims:
-    # Pick the "agentshapelibrary" intrinsic and add it to an auxiliary variable.
-    shape_library = prim.intrinsicValue("agentshapelibrary")
-    # Discard shapes from the Collision Layer (keep only the "default" and custom ones).
-    shape_library = tuple(x for x in shape_library if not x.startswith("collision"))
-    # Add this tuple of shapes to the Shape list.
-    shape_list.append(shape_library)
-
-# Calculate how many elements are stored in the Agent list and Shape list.
-agent_count = sum([len(agent_name) for agent_name in agent_list])
-shape_count = sum([len(shape_name) for shape_name in shape_list])
-
-
-# OPTIMIZE LISTS 
-# Iterate every tuple in the Agent Name list.
-for tuple in agent_list:
-    # Convert the tuple into a dictionary to remove duplicates,
-    # then convert into a list.
-    agent_list = list(dict.fromkeys(tuple))
-
-# Calculate how many agents are in the optimized Agent list.
-agent_optimized_count = len(agent_list)
-   
-# Convert the Agent Shape list into a dictionary to remove duplicates,
-# then convert into a list.
-shape_list = list(dict.fromkeys(shape_list))
-
-# Calculate how many shapes are in the optimized Shape list.
-shape_optimized_count = sum([len(shape_name) for shape_name in shape_list])
-
+# If the node reads from a cache on disk, let the user look for shapes in
+# every cached frame (e.g: Agent layers that switch mid-shot).
+# NOTE: We ask first, so only the chosen search is run.
+choice = 0
+if crowdIntrospection.cache_file(crowd_cache_node):
+    choice = hou.ui.displayMessage(
+        "Where should the tool look for Agent Shapes?",
+        buttons=("Current Frame", "All Cached Frames"),
+        title="Crowd to Solaris")
 
 # GENERATE A DICTIONARY OF AGENTS AND SHAPES
-# Initialize a dictionary.
-agents_shapes_dict = {}
-
-# Iterate the Agent Names and Agent Shape lists in parallel.
-for agent,shape in zip(agent_list,shape_list):
-    # Add values to the dictionary (Keys: Agent Names, Values: Agent Shapes).
-    agents_shapes_dict[agent] = shape
-
-
-# STORE LENGTH OF AGENT SHAPES LISTS
-# Initialize a list.
-lengths = []
+# Keys: Agent Names, Values: Agent Shapes.
+# NOTE: The result is reused if you run the tool again on the same node.
+if choice == 1:
+    with shelfProfiler.phase("discover shapes"):
+        agents_shapes_dict = crowdIntrospection.discover_shapes(crowd_cache_node)
+else:
+    with shelfProfiler.phase("read shapes"):
+        agents_shapes_dict = crowdIntrospection.agent_shapes_index(crowd_cache_node)
 
-# Iterate every list of Agent Shapes in the dictionary and get its length.
-for list_of_shapes in agents_shapes_dict.values():
-    lengths.append(len(list_of_shapes))
 
-# Generate a cumulative sum of the lengths.
-# This will act as a counter for buttons later.
-counter = list(cumsum(lengths))
+# Get a stable index (i.e: slot) of every (Agent, Shape) pair.
+shape_slots = crowdIntrospection.shape_slots(agents_shapes_dict)
 
 
 # APPLY TEXTURES TO CROWD UI
-# Create a Button Group.
-buttongroup = QtWidgets.QButtonGroup()
-
-
 class ApplyTexturesToCrowdUI(QtWidgets.QWidget):
     """
     In this window, you will see a list of Agents with their
@@ -138,55 +137,44 @@ class ApplyTexturesToCrowdUI(QtWidgets.QWidget):
 
     def initUI(self):
         """Customize the UI."""        
-        # Set up the font.
-        self.font = QtGui.QFont()
-        self.font.setBold(True)
-             
         # Apply a Grid Layout to the main window.
         self.windowLayout = QtWidgets.QGridLayout()  
         self.setLayout(self.windowLayout)
         
-        # Create the main scroll area.
-        self.scrollMain = QtWidgets.QScrollArea()
-        self.scrollMain.setWidgetResizable(True)
-
-        # Generate a new style for the Scroll Bar.
-        scrollStyle = "QScrollBar {"
-        scrollStyle += "border: 1px solid grey;"
-        scrollStyle += "background: #454545;"
-        scrollStyle += "}"
-       
-        # Apply the new stylesheet to the main scroll area.
-        self.scrollMain.setStyleSheet(scrollStyle)
-               
-        # Add a Grid Layout to the main scroll area.
-        self.scrollMainLayout = QtWidgets.QGridLayout()
-        self.scrollMain.setLayout(self.scrollMainLayout)        
-        
-        # Create the main widget where we will store everything.
-        self.mainWidget = QtWidgets.QWidget()
-        
-        # Add a Grid Layout to the main widget.
-        self.mainWidgetLayout = QtWidgets.QGridLayout()        
-        self.mainWidget.setLayout(self.mainWidgetLayout)
-                
-        # Link the main widget to the main scroll area.
-        self.scrollMain.setWidget(self.mainWidget)
-        
-        # Add the main scroll area to the main window layout.
-        self.windowLayout.addWidget(self.scrollMain)               
-        
-        # Initialize a list to store labels.
-        self.labelList = []
-     
-        # Run ADDAGENTNAME() for each Agent Shape in the list.
-        for i, (agent_in_dict, shapes_in_dict) in enumerate(agents_shapes_dict.items()):
-            self.addAgentName(i, agent_in_dict, shapes_in_dict)
-                                   
+        # Create a table with every Agent Shape and its texture.
+        # NOTE: Only the visible rows are drawn, so big crowds open instantly.
+        self.table = shapeTableView.ShapeTable(shape_slots)
+        self.windowLayout.addWidget(self.table)
+
+        # Fill the shapes of known Agents with the textures used in previous shots.
+        self.table.set_textures(
+            texturePresets.preset_textures(shape_slots, texturePresets.load_presets()))
+
         # Add a spacer to the main window layout.
         self.spacer = QtWidgets.QSpacerItem(0,30)
         self.windowLayout.addItem(self.spacer)
      
+        # Add the "Match Folder" button to the main window layout.
+        # It fills every shape with the best matching texture in a folder.
+        self.matchButton = QtWidgets.QPushButton("Match Folder...")
+        self.matchButton.setMinimumSize(500,30)
+        self.matchButton.clicked.connect(self.matchFolder)
+        self.windowLayout.addWidget(self.matchButton)
+
+        # Add the "USD layer" checkbox to the main window layout.
+        # When checked, materials and bindings are written to a USD layer
+        # instead of Material Library / Assign Material nodes.
+        self.usdLayerCheckBox = QtWidgets.QCheckBox(
+            "Write materials to a USD layer (faster for big crowds)")
+        self.windowLayout.addWidget(self.usdLayerCheckBox)
+
+        # Add the "Preflight textures" checkbox to the main window layout.
+        # When checked, textures are checked and converted to a tiled,
+        # mip-mapped format before creating the materials.
+        self.preflightCheckBox = QtWidgets.QCheckBox(
+            "Preflight textures (check files and convert them to mip-mapped RAT)")
+        self.windowLayout.addWidget(self.preflightCheckBox)
+
         # Add the "Apply Textures" button to the main window layout.
         self.applyButton = QtWidgets.QPushButton("APPLY TEXTURES")
         self.applyButton.setMinimumSize(500,30)
@@ -209,199 +197,74 @@ class ApplyTexturesToCrowdUI(QtWidgets.QWidget):
         self.windowLayout.addWidget(self.skipButton)
 
 
-    def addAgentName(self, i, agent_in_dict, shapes_in_dict):
-        """Create label named after the Agent."""
-        # Create a widget to store the label.
-        self.labelWidget = QtWidgets.QWidget()
+    def matchFolder(self):
+        """Fill every shape with the best matching texture in a folder."""
+        # Let the user pick the folder with the textures.
+        folder = QtWidgets.QFileDialog.getExistingDirectory(
+            self,
+            "Choose a texture folder")
 
-        # Add a Grid Layout to the widget.
-        self.labelWidgetLayout = QtWidgets.QGridLayout()
-        self.labelWidget.setLayout(self.labelWidgetLayout)
-     
-        # Create a label named after the agent, add it to the widget layout.
-        self.label = QtWidgets.QLabel(agent_in_dict+f" ({lengths[i]} shapes)")
-        self.label.setFont(self.font)
-        self.labelWidgetLayout.addWidget(self.label)        
-     
-        # Add widget to the main widget layout.
-        self.mainWidgetLayout.addWidget(self.labelWidget)
-                   
-        # Run ADDLABEL().
-        self.addLabel(i, agent_in_dict, shapes_in_dict)
-     
-       
-    def addLabel(self, i, agent_in_dict, shapes_in_dict):     
-        """Create a label for each Agent Shape."""
-        # Create a widget to store the labels (and later, the buttons).
-        self.buttonWidget = QtWidgets.QWidget()
-        self.buttonWidget.setAutoFillBackground(True)
-        self.buttonWidget.setStyleSheet("background-color: #545454;")
-
-        # Add a Grid Layout to the widget.
-        self.buttonWidgetLayout = QtWidgets.QGridLayout()
-        self.buttonWidget.setLayout(self.buttonWidgetLayout)     
-
-        # Add widget to the main widget layout.
-        self.mainWidgetLayout.addWidget(self.buttonWidget)
-
-        # Iterate through the current agent's list of shapes.
-        for j, shape in enumerate(shapes_in_dict):
-            # Create a label named after the shape.
-            self.label = QtWidgets.QLabel(shape)
-            # Add label to the widget layout.
-            self.buttonWidgetLayout.addWidget(self.label)
-            # Run ADDBUTTONS().
-            self.addButtons(i, j, shape, shapes_in_dict)            
-
-
-    def addButtons(self, i, j, shape, shapes_in_dict):  
-        """Create a button next to each label."""
-        # Create a button.
-        self.button = QtWidgets.QPushButton("Browse File")
-       
-        # The first agent of the dictionary will have as "index"
-        # the index of the shape (i.e: Buttons will be indexed 0, 1...).
-        if i == 0:
-            index = j
-        # The rest of agents will have as "index" the index of the shape PLUS
-        # the length of the previous shape list (i.e: If the previous agent's
-        # button ended with index 2, this agent will start with index 3, 4...).
-        else:
-            index = j + counter[i-1]
-
-        # Add button to the group and tag it with an index.
-        buttongroup.addButton(self.button, index)
-
-        # When button is clicked, run CHOOSEFILE().
-        self.button.clicked.connect(lambda: self.chooseFile(shape, index))
-     
-        # Add button to the widget layout and place it in the 2nd column.
-        self.buttonWidgetLayout.addWidget(
-            self.button,
-            shapes_in_dict.index(shape),
-            1)
-
-
-    def chooseFile(self, shape, index):
-        """Let the user choose a texture file."""
-        # Iterate through every button in the group.
-        for button in buttongroup.buttons():
-            # Applies the action to each button independently.
-            if button is buttongroup.button(index):
-                # Open a File Dialog, pick the name of the file
-                # and set it as the button's text.
-                filename = QtWidgets.QFileDialog.getOpenFileName(
-                    self,
-                    "Choose a texture file")
-                    
-                self.path = filename[0]
-                button.setText(self.path)           
+        if not folder:
+            return
 
+        # Scan the folder once and match every shape against its textures.
+        with shelfProfiler.phase("scan folder"):
+            index = textureMatcher.TextureIndex(folder)
+        with shelfProfiler.phase("match shapes"):
+            matches = index.match_slots(shape_slots)
 
-    def storeTextures(self):
-        """Store the selected texture files in a list."""
-        # Initialize a list.
-        self.buttonTextList = []
-        # Pick the text on each button (i.e: file path) and add it to the list.
-        for button in buttongroup.buttons():
-            if button.text() == "Browse File":
-                self.buttonTextList.append("")
-            else:
-                self.buttonTextList.append(button.text())     
+        # Show the texture and its score next to every matched shape.
+        # Shapes without a good match keep their current texture.
+        self.table.set_matches(matches)
 
+        matched = sum(1 for filepath, score in matches if filepath)
+        hou.ui.displayMessage(
+            f"{matched} of {len(matches)} shapes matched a texture in {folder} "
+            f"({len(index)} textures found).",
+            title="Crowd to Solaris")
 
-    def importCrowdIntoStage(self):
-        """Create a SOP Import node in the /stage context to bring the Crowd."""
-        # Get the /stage context.
-        self.lop = hou.node("/stage")
+        shelfProfiler.report("Match Folder")
 
-        # Create a SOP Import node.
-        self.import_crowd_node = self.lop.createNode("sopimport","import_crowd")
-        self.import_crowd_node.parm("soppath").set(crowd_cache_node.path())
-        self.import_crowd_node.parm("pathprefix").set("/crowd")
 
-        # Import the Agents as "Skelroots" so we can apply textures to their Shapes.
-        self.import_crowd_node.parm("enable_agenthandling").set(1)
-        self.import_crowd_node.parm("agenthandling").set("skelroots")
+    def storeTextures(self):
+        """Store the selected texture files in a list."""
+        # Pick the texture of every shape slot ("" for none).
+        self.buttonTextList = self.table.textures()
 
 
     def createMaterials(self):
         """Create a Principled Shader node linked to a texture file."""
-        # Run IMPORTCROWDINTOSTAGE().
-        self.importCrowdIntoStage()
-        
         # If the "APPLY TEXTURES" button is pressed, materials will be created
-        # and applied to the Crowd. Otherwise, the tool will just switch to the
-        # Solaris desktop and close the program.
+        # and applied to the Crowd. Otherwise, the tool will just import the
+        # Crowd, switch to the Solaris desktop and close the program.
         clickedButton = self.sender()
-        
+        textures = None
+
         if clickedButton.text() == "APPLY TEXTURES":
             # Run STORETEXTURES().
             self.storeTextures()
-
-            # Create a Material Library node and connect it to the SOP Import.
-            self.mat_library_node = self.lop.createNode("materiallibrary", "set_materials")
-            self.mat_library_node.setInput(0, self.import_crowd_node)
-            self.mat_library_node.parm("materials").set(shape_optimized_count)
-            
-            # Create an Assign Material node and connect it to the Material Library.
-            self.assign_mat_node = self.lop.createNode("assignmaterial", "assign_materials")
-            self.assign_mat_node.setInput(0, self.mat_library_node)
-            self.assign_mat_node.parm("nummaterials").set(shape_optimized_count)
-                        
-            # Initialize an auxiliary list.
-            self.aux_list = []
-    
-            # Iterate the dictionary and add all the Agent Shapes to the aux list.
-            # The order in which they enter the list will be used as index.
-            # (i.e: For the first shape, we pick the File Path of the first button, etc.).
-            for agent_in_dict, shapes_in_dict in agents_shapes_dict.items():
-                for shape in shapes_in_dict:
-                    self.aux_list.append(shape)
-
-                    # Create a Principled Shader node in the Material Library.
-                    # This node will use as texture the one selected in the
-                    # corresponding button.
-                    self.matNode = self.mat_library_node.createNode(
-                        "principledshader",
-                        f"{agent_in_dict}_{shape}")
-                        
-                    self.matNode.parm("basecolor_useTexture").set(True)
-                    self.matNode.parm("basecolor_texture").set(
-                        self.buttonTextList[self.aux_list.index(shape)])
-
-                    # Set a counter to modify multiparms.
-                    parm_counter = self.aux_list.index(shape)+1
-                    
-                    # Adjust the parameters in the Material Library node.
-                    self.mat_library_node.parm(f"matnode{parm_counter}").set(
-                        f"/stage/{self.mat_library_node.name()}/{agent_in_dict}_{shape}")
-                        
-                    self.mat_library_node.parm(f"matpath{parm_counter}").set(
-                        shape.replace(".","_"))
-
-                    self.mat_library_node.parm(f"matflag{parm_counter}").set(0)
-                    self.mat_library_node.parm(f"assign{parm_counter}").set(0)
-
-                    # Adjust the parameters in the Assign Material node.
-                    self.assign_mat_node.parm(f"primpattern{parm_counter}").set(
-                        f"/crowd/{agent_in_dict}_*/{shape.replace('.','_')}")
-                        
-                    self.assign_mat_node.parm(f"matspecpath{parm_counter}").set(
-                        f"/materials/{shape.replace('.','_')}")
-                    
-            # Layout nodes in the Material Library.
-            self.mat_library_node.layoutChildren(
-                horizontal_spacing=1.0,
-                vertical_spacing=1.0)
-
-            # Display the Assign Material node as set it as selected.
-            self.assign_mat_node.setDisplayFlag(1)
-            self.assign_mat_node.setSelected(1, clear_all_selected=True)
-
-
-        # Layout nodes in the /stage context.
-        self.lop.layoutChildren()
+            textures = self.buttonTextList
+
+            # Save the textures as presets for the next shots.
+            texturePresets.save_presets(shape_slots, textures)
+
+        # Import the Crowd into /stage and create its materials.
+        # If the "USD layer" checkbox is checked, the materials are written
+        # to a USD layer instead of creating the material nodes.
+        # NOTE: Shapes using the same texture (or no texture at all) share a single material.
+        output_node, errors = crowdBuild.build_solaris(
+            crowd_cache_node,
+            shape_slots,
+            textures,
+            usd_layer=self.usdLayerCheckBox.isChecked(),
+            preflight=self.preflightCheckBox.isChecked())
+
+        if errors:
+            hou.ui.displayMessage(
+                "Some textures are missing or couldn't be converted.",
+                severity=hou.severityType.Warning,
+                details="\n".join(errors),
+                title="Crowd to Solaris")
 
         # Switch to the Solaris desktop.
         solarisDesktop = hou.ui.desktop("Solaris")
@@ -411,10 +274,16 @@ class ApplyTexturesToCrowdUI(QtWidgets.QWidget):
         networkView = hou.ui.paneTabOfType(hou.paneTabType.NetworkEditor)
         networkView.cd("/stage/")
 
+        # Show how long every phase took (if profiling is enabled).
+        shelfProfiler.report("Crowd to Solaris")
+
         # Close the program.
         self.close()
 
 
 # Create an instance of the ApplyTexturesToCrowd class and display in a new window.
-ui = ApplyTexturesToCrowdUI()
-ui.show()
+with shelfProfiler.phase("open UI"):
+    ui = ApplyTexturesToCrowdUI()
+    ui.show()
+
+shelfProfiler.report("Crowd to Solaris UI")
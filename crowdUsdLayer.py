@@ -0,0 +1,259 @@
+"""
+CROWD USD LAYER
+---------------
+Author the materials of a Crowd and their bindings in a single USD layer.
+
+Used by 'crowdToSolaris.py' as an alternative to building Material Library
+and Assign Material nodes, whose cook time grows with the number of shapes.
+
+HOW IT WORKS
+------------
+- SHAPE_PRIM_PATHS() walks the imported Crowd once and finds the prims of
+  every Agent Shape (i.e: /crowd/<agent>_*/<shape>, see SHAPE_PATTERN()).
+  NOTE: The stage only holds the Agents of the current frame.
+- WRITE_MATERIAL_LAYER() writes every material (a UsdPreviewSurface reading
+  its texture), one collection per material listing the prims using it, and
+  one collection-based 'material:binding' per material, in one batch with the
+  Sdf API, inside a single Sdf.ChangeBlock. The number of bindings grows with
+  the number of materials, not with the number of Agents or shapes.
+- The layer is then brought into Solaris by a single Sublayer LOP, so the
+  cook time stays flat no matter how many shapes there are.
+- WRITE_COLLECTION_LAYER() writes one USD collection per material, listing
+  the explicit prim paths of its shapes. Assign Material nodes can then bind
+  '/crowd.collection:<material>' instead of matching wildcard patterns
+  against the whole Crowd hierarchy.
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import built-in modules.
+import os
+
+# Import third-party modules.
+from pxr import Sdf
+
+# Where the materials are stored in the layer.
+MATERIALS_ROOT = "/materials"
+
+
+def prim_name(shape):
+    """Return the name of the prim USD uses for an Agent Shape."""
+    return shape.replace(".", "_")
+
+
+def shape_pattern(prefix, agent, shape):
+    """Return a wildcard pattern matching the prims of an Agent Shape in every Agent (e.g: /crowd/bob_*/body)."""
+    return f"{prefix}/{agent}_*/{prim_name(shape)}"
+
+
+def agent_of(name, agents):
+    """Return which Agent an Agent prim belongs to (named <agent>_<id>), or None."""
+    # Most of the time, the Agent name is everything before the last underscore.
+    agent = name.rsplit("_", 1)[0]
+    if agent in agents:
+        return agent
+
+    # Otherwise (e.g: the Agent name has an underscore too),
+    # pick the longest Agent name matching the beginning of the prim name.
+    matches = [agent for agent in agents if name.startswith(f"{agent}_")]
+
+    return max(matches, key=len) if matches else None
+
+
+def shape_prim_paths(stage, prefix, shape_slots):
+    """Find the prims of every Agent Shape in an imported Crowd.
+
+    'shape_slots' is a list of (agent, shape) pairs.
+    Returns a list with the prim paths of every slot.
+    """
+    # Map every Agent to its shape prim names and slots.
+    agent_shapes = {}
+    for slot, (agent, shape) in enumerate(shape_slots):
+        agent_shapes.setdefault(agent, {})[prim_name(shape)] = slot
+
+    # Initialize a list of prim paths per slot.
+    prim_paths = [[] for _ in shape_slots]
+
+    root = stage.GetPrimAtPath(prefix)
+    if not root:
+        return prim_paths
+
+    # Walk the Agent prims once, and look up their shapes by name.
+    for agent_prim in root.GetChildren():
+        agent = agent_of(agent_prim.GetName(), agent_shapes)
+        if agent is None:
+            continue
+
+        for shape_prim in agent_prim.GetChildren():
+            slot = agent_shapes[agent].get(shape_prim.GetName())
+            if slot is not None:
+                prim_paths[slot].append(shape_prim.GetPath())
+
+    return prim_paths
+
+
+def add_attribute(prim_spec, name, type_name, value=None, connection=None,
+                  variability=Sdf.VariabilityVarying):
+    """Add an attribute to a prim spec, with an optional value and connection."""
+    attribute = Sdf.AttributeSpec(prim_spec, name, type_name, variability)
+    if value is not None:
+        attribute.default = value
+    if connection is not None:
+        attribute.connectionPathList.explicitItems = [connection]
+
+    return attribute
+
+
+def add_shader(layer, path, shader_id):
+    """Add a Shader prim spec with the given shader id (e.g: UsdPreviewSurface)."""
+    shader = Sdf.CreatePrimInLayer(layer, path)
+    shader.specifier = Sdf.SpecifierDef
+    shader.typeName = "Shader"
+    add_attribute(
+        shader, "info:id", Sdf.ValueTypeNames.Token, shader_id,
+        variability=Sdf.VariabilityUniform)
+
+    return shader
+
+
+def add_scope(layer, path):
+    """Add a Scope prim spec (e.g: the parent of the materials)."""
+    scope = Sdf.CreatePrimInLayer(layer, path)
+    scope.specifier = Sdf.SpecifierDef
+    scope.typeName = "Scope"
+
+    return scope
+
+
+def add_material(layer, name, texture):
+    """Add a Material prim spec with a UsdPreviewSurface reading its texture."""
+    material_path = Sdf.Path(f"{MATERIALS_ROOT}/{name}")
+    material = Sdf.CreatePrimInLayer(layer, material_path)
+    material.specifier = Sdf.SpecifierDef
+    material.typeName = "Material"
+
+    # Create the surface shader and connect it to the material.
+    surface_path = material_path.AppendChild("surface")
+    surface = add_shader(layer, surface_path, "UsdPreviewSurface")
+    add_attribute(surface, "outputs:surface", Sdf.ValueTypeNames.Token)
+    add_attribute(
+        material, "outputs:surface", Sdf.ValueTypeNames.Token,
+        connection=surface_path.AppendProperty("outputs:surface"))
+
+    # Shapes without a texture just get the default surface.
+    if not texture:
+        return material_path
+
+    # Read the UVs ("st" primvar) and the texture, and plug it into the base color.
+    st_path = material_path.AppendChild("st")
+    st_reader = add_shader(layer, st_path, "UsdPrimvarReader_float2")
+    add_attribute(st_reader, "inputs:varname", Sdf.ValueTypeNames.Token, "st")
+    add_attribute(st_reader, "outputs:result", Sdf.ValueTypeNames.Float2)
+
+    texture_path = material_path.AppendChild("texture")
+    texture_reader = add_shader(layer, texture_path, "UsdUVTexture")
+    add_attribute(texture_reader, "inputs:file", Sdf.ValueTypeNames.Asset, Sdf.AssetPath(texture))
+    add_attribute(
+        texture_reader, "inputs:st", Sdf.ValueTypeNames.Float2,
+        connection=st_path.AppendProperty("outputs:result"))
+    add_attribute(texture_reader, "outputs:rgb", Sdf.ValueTypeNames.Float3)
+
+    add_attribute(
+        surface, "inputs:diffuseColor", Sdf.ValueTypeNames.Color3f,
+        connection=texture_path.AppendProperty("outputs:rgb"))
+
+    return material_path
+
+
+def bind_collection(prim_spec, name, material_path):
+    """Bind a material to a collection of a prim spec ('material:binding:collection:<name>')."""
+    collection_path = prim_spec.path.AppendProperty(f"collection:{name}")
+
+    binding = Sdf.RelationshipSpec(prim_spec, f"material:binding:collection:{name}", custom=False)
+    binding.targetPathList.explicitItems = [collection_path, material_path]
+
+
+def open_layer(filepath):
+    """Return an empty USD layer for a file on disk (reusing it if it's already open)."""
+    # Create the folder if needed.
+    folder = os.path.dirname(filepath)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    # Reuse the layer if it's already open (e.g: we are writing it again).
+    layer = Sdf.Layer.FindOrOpen(filepath) if os.path.isfile(filepath) else None
+    if layer:
+        layer.Clear()
+    else:
+        layer = Sdf.Layer.CreateNew(filepath)
+
+    return layer
+
+
+def write_material_layer(filepath, prim_path, materials, collections):
+    """Write the materials, their collections and bindings to a USD layer on disk.
+
+    'materials' is a dictionary (Keys: Material names, Values: texture files).
+    'collections' is a dictionary (Keys: Material names, Values: prim paths using them).
+    Collections and bindings are authored on a prim (e.g: /crowd).
+    """
+    layer = open_layer(filepath)
+
+    # Author everything in a single batch (change notifications are sent once).
+    with Sdf.ChangeBlock():
+        # Define the parent of the materials (an "over" would leave them undefined on the stage).
+        add_scope(layer, MATERIALS_ROOT)
+        material_paths = {
+            name: add_material(layer, name, texture)
+            for name, texture in materials.items()}
+
+        # The prim is created as an "over", so the layer only adds opinions.
+        prim = Sdf.CreatePrimInLayer(layer, prim_path)
+        prim.SetInfo("apiSchemas", Sdf.TokenListOp.Create(
+            prependedItems=["MaterialBindingAPI"]
+            + [f"CollectionAPI:{name}" for name in collections]))
+
+        # One collection and one binding per material.
+        for name, prim_paths in collections.items():
+            add_collection(prim, name, prim_paths)
+            bind_collection(prim, name, material_paths[name])
+
+    layer.Save()
+
+    return layer
+
+
+def add_collection(prim_spec, name, prim_paths):
+    """Add a collection with an explicit list of prim paths to a prim spec."""
+    # Include ONLY the listed prims (not their descendants).
+    add_attribute(
+        prim_spec, f"collection:{name}:expansionRule", Sdf.ValueTypeNames.Token,
+        "explicitOnly", variability=Sdf.VariabilityUniform)
+
+    includes = Sdf.RelationshipSpec(prim_spec, f"collection:{name}:includes", custom=False)
+    includes.targetPathList.explicitItems = list(prim_paths)
+
+
+def write_collection_layer(filepath, prim_path, collections):
+    """Write collections on a prim (e.g: /crowd) to a USD layer on disk.
+
+    'collections' is a dictionary (Keys: collection names, Values: prim paths).
+    """
+    layer = open_layer(filepath)
+
+    # Author everything in a single batch (change notifications are sent once).
+    with Sdf.ChangeBlock():
+        # The prim is created as an "over", so the layer only adds opinions.
+        prim = Sdf.CreatePrimInLayer(layer, prim_path)
+        prim.SetInfo("apiSchemas", Sdf.TokenListOp.Create(
+            prependedItems=[f"CollectionAPI:{name}" for name in collections]))
+
+        for name, prim_paths in collections.items():
+            add_collection(prim, name, prim_paths)
+
+    layer.Save()
+
+    return layer
@@ -0,0 +1,133 @@
+"""
+DIRECTORY SCANNER
+-----------------
+Walk big directory trees (e.g: an Agent Directory on a network share) fast.
+
+Used by 'agentCatalog.py' (and so by 'agentBrowser.py' and 'agentBrowser_v2.py').
+
+HOW IT WORKS
+------------
+- Every folder is listed once with os.scandir() on a thread pool, so many
+  subtrees are listed at the same time (listing a folder on a network share
+  is mostly waiting, not computing).
+- Results are streamed: SCAN() yields every matching file as soon as its
+  folder has been listed, and SCAN_FOLDERS() yields every folder with its
+  files and subfolders.
+- Files only need to match one of the INCLUDE globs (e.g: "*.fbx"), and
+  files or folders matching any EXCLUDE glob (e.g: "clips") are skipped,
+  so excluded subtrees are never listed. Globs match names, ignoring case.
+- MAX_DEPTH stops the walk N folders below the root (0: only the root).
+- A REUSE function can skip listing folders that didn't change (e.g: from a
+  catalog, see 'agentCatalog.py'): it gets the path and mtime of every
+  folder, and returns its known subfolders (or None to list it).
+- Paths use forward slashes. Symbolic links to folders are not followed.
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import built-in modules.
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import fnmatch
+import os
+import re
+
+# Number of folders listed at the same time.
+WORKERS = 16
+
+# A file found by the scanner (size and mtime in bytes and nanoseconds).
+ScanEntry = namedtuple("ScanEntry", "path name depth size mtime")
+
+# A folder found by the scanner ('listed' is False if REUSE skipped listing it,
+# in which case 'files' is empty).
+Folder = namedtuple("Folder", "path depth mtime subfolders files listed")
+
+
+def glob_matcher(patterns):
+    """Return a function matching names against any of the globs (ignoring case), or None for no globs."""
+    if not patterns:
+        return None
+
+    regex = re.compile("|".join(fnmatch.translate(pattern.lower()) for pattern in patterns))
+
+    return lambda name: regex.match(name.lower()) is not None
+
+
+def list_folder(path, depth, included, excluded, reuse):
+    """List a folder. Returns a Folder, or None if it can't be read."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+
+        # Reuse what we know about folders that didn't change.
+        if reuse is not None:
+            subfolders = reuse(path, mtime)
+            if subfolders is not None:
+                return Folder(path, depth, mtime, list(subfolders), [], False)
+
+        subfolders, files = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if excluded is not None and excluded(entry.name):
+                    continue
+
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subfolders.append(f"{path}/{entry.name}")
+
+                    elif included is None or included(entry.name):
+                        stat = entry.stat()
+                        files.append(ScanEntry(
+                            f"{path}/{entry.name}", entry.name, depth, stat.st_size, stat.st_mtime_ns))
+
+                # Skip files removed (or unreadable) while listing the folder.
+                except OSError:
+                    continue
+
+    except OSError:
+        return None
+
+    return Folder(path, depth, mtime, subfolders, files, True)
+
+
+def scan_folders(root, include=(), exclude=(), max_depth=None, workers=WORKERS, reuse=None):
+    """Walk a directory tree on a thread pool and yield every folder (a Folder) as soon as it's listed.
+
+    Folders are yielded in no particular order. Folders that can't be read are skipped.
+    """
+    root = os.path.normpath(root).replace("\\", "/")
+    included, excluded = glob_matcher(include), glob_matcher(exclude)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = {executor.submit(list_folder, root, 0, included, excluded, reuse)}
+
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                folder = future.result()
+                if folder is None:
+                    continue
+
+                # List the subfolders (unless we are already at the maximum depth).
+                if max_depth is None or folder.depth < max_depth:
+                    pending.update(
+                        executor.submit(list_folder, subfolder, folder.depth + 1, included, excluded, reuse)
+                        for subfolder in folder.subfolders)
+
+                yield folder
+
+    finally:
+        # If the caller stops early, don't list the folders still waiting.
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def scan(root, include=(), exclude=(), max_depth=None, workers=WORKERS):
+    """Walk a directory tree on a thread pool and yield every matching file (a ScanEntry)."""
+    for folder in scan_folders(root, include, exclude, max_depth, workers):
+        yield from folder.files
@@ -0,0 +1,29 @@
+"""
+HYTHON PROCESS
+--------------
+Find the 'hython' executable, to run headless workers next to Houdini.
+
+Used by 'crowdIntrospection.py' (see 'crowdShapeWorker.py') and
+'agentBrowser_v2.py' (see 'thumbnailWorker.py').
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import built-in modules.
+import os
+
+# Import third-party modules.
+import hou
+
+
+def hython_path():
+    """Return the path of the 'hython' executable, or an empty string if not found."""
+    hython = os.path.join(hou.getenv("HFS", ""), "bin", "hython")
+    for candidate in (hython, hython + ".exe"):
+        if os.path.isfile(candidate):
+            return candidate
+
+    return ""
@@ -4,32 +4,53 @@ Add textures to your Crowd sim with the help of a graphic interface.
 
 HOW IT WORKS:
 - Select the Geometry node where your Crowd cache is stored and run the tool.
-- Click the button next to each shape and choose a texture file.
+- Choose whether to look for shapes in the current frame or in every cached frame.
+- Double-click the Texture cell of each shape (or click on "...") and choose a texture file, or click on "Match Folder..." and
+  pick a folder with your textures: every shape gets the texture whose name matches it best, and the
+  match score is shown next to it so you can review it.
 - When you are done, click on "Generate Stylesheet".
-- A Principled Shader will be created for every Shape, whether you chose a texture file or not.
+- A Principled Shader will be created for every texture file. Shapes using the same texture
+  (or no texture at all) share the same Principled Shader, and the same style in the Stylesheet.
 - You can check the Material Stylesheet by creating a New Pane Tab Type > Inspectors > Data Tree.
+- The textures you choose are saved as presets (see 'texturePresets.py'), and filled in automatically
+  the next time the same Agents show up in any shot.
+- Check "Store the Stylesheet in an external file" to write it to $HIP/stylesheets/<geo>_stylesheet.json
+  instead of the hip file. The Geometry node's Material Style Sheet will read that file when needed.
+- Check "Preflight textures" to check every texture and convert it to a tiled, mip-mapped format
+  (RAT by default, see 'texturePreflight.py') before creating the Principled Shaders.
 
 IMPORTANT:
-Running this tool more than once will generate duplicate values and unexpected results.
-If you ever need to re-generate the Stylesheet, make sure to delete the previous one and also
-the Principled Shaders in the /mat/ context.
+You can run this tool again on the same cache: the previous Stylesheet is loaded and only the
+styles whose texture changed are rewritten. Principled Shaders already in the /mat/ context are
+reused instead of duplicated.
+
+To generate the same materials and Stylesheet without any UI (e.g: on the farm, or for many shots at once),
+use 'crowdBatch.py' with a shape > texture mapping file.
 
 NOTE:
 This tool looks at File Cache nodes. Feel free to change the nodeType variable with the type
 of node you want to use (e.g: If you want to look at a Crowd Source instead of a File Cache,
 change the variable to "crowdsource::3.0")
 
-*** If you are using HOUDINI 18.5, replace the .items() method by .iteritems(),
-and the zip() function by itertools.izip() so that it can be run in PYTHON 2.7 ***
+This tool needs 'crowdBuild.py', 'crowdIntrospection.py', 'crowdMaterials.py', 'crowdStylesheet.py',
+'crowdUsdLayer.py', 'hythonProcess.py', 'networkBuilder.py', 'shapeTableView.py', 'shelfProfiler.py', 'textureMatcher.py',
+'texturePreflight.py' and 'texturePresets.py' to be in your Houdini Python path (e.g: $HOUDINI_USER_PREF_DIR/python3.7libs).
+The first run writes a small manifest next to your cache (<cache name>.shapes.json),
+so later runs don't need to load the cached crowd to find its Agents and Shapes.
+
+*** This tool and its modules need PYTHON 3 (i.e: the Python 3 builds of HOUDINI 18.5 or newer) ***
 '''
 
 
 import sys
-import json
-import itertools
-from collections import OrderedDict
-from numpy import cumsum
-from PySide2 import QtGui, QtWidgets, QtCore
+from PySide2 import QtWidgets
+
+import crowdBuild
+import crowdIntrospection
+import shapeTableView
+import shelfProfiler
+import textureMatcher
+import texturePresets
 
 
 
@@ -94,98 +115,24 @@ elif cacheCount > 1:
 
 
 
-# Initialize lists to store Agent Names and Agent Shapes
-agentList = []
-shapeList = []
-
-# Iterate through the File Cache nodes
-for node in cacheNodes:
-
-    # Access the Geometry level, pick the "Agent Name" point attribute and add it to the Agent list
-    geo = node.geometry()
-    agentName = geo.pointStringAttribValues('agentname')
-    agentList.append(agentName)
-   
-    # Access the Prim level
-    prims = geo.prims()
-
-    # Iterate through the Prims
-    for prim in prims:
-   
-        # Pick the "agentshapelibrary" intrinsic and add it to an auxiliary variable
-        shapeLibrary = prim.intrinsicValue('agentshapelibrary')
-       
-        # Keep only shapes starting by "default" and ending by "GEO" (i.e: the ones we really need)
-        shapeLibrary = tuple(x for x in shapeLibrary if not x.startswith('collision'))
-               
-        # Add this tuple of shapes to the Shape list
-        shapeList.append(shapeLibrary)
-       
-     
-    # Calculate how many elements are in both the Agent list and Shape list
-    agentCount = sum([len(agentName) for agentName in agentList])
-    shapeCount = sum([len(shapeName) for shapeName in shapeList])
-   
-   
-   
-####################
-## OPTIMIZE LISTS ##    
-####################
-   
-
-
-# Iterate through every tuple in the Agent Name list
-### BACKUP: for index, tuple in enumerate(agentList) ###
-for tuple in agentList:
-
-    # Convert the tuple into an ordered dictionary to remove duplicates, and then convert into a list
-    agentList = list(OrderedDict.fromkeys(tuple))
-   
-   
-# Calculate how many agents are in the optimized Agent list    
-agentOptCount = len(agentList)
-   
-# Convert the Agent Shape list into an ordered dictionary to remove duplicates, and then convert into a list
-shapeList = list(OrderedDict.fromkeys(shapeList))
+# Let the user look for shapes in every cached frame (e.g: Agent layers that switch mid-shot)
+# NOTE: We ask first, so only the chosen search is run
+choice = hou.ui.displayMessage('Where should the tool look for Agent Shapes?',
+                               buttons=('Current Frame', 'All Cached Frames'))
 
-# Calculate how many shapes are in the optimized Shape list
-shapeOptCount = sum([len(shapeName) for shapeName in shapeList])
+# Generate a dictionary > Keys: Agent Names, Values: Agent Shapes
+# NOTE: The result is reused if you run the tool again on the same File Cache
+if choice == 1:
+    with shelfProfiler.phase('discover shapes'):
+        agentShapesDict = crowdIntrospection.discover_shapes(cacheNodes[0])
+else:
+    with shelfProfiler.phase('read shapes'):
+        agentShapesDict = crowdIntrospection.agent_shapes_index(cacheNodes[0])
 
 
 
-################################################
-## GENERATE A DICTIONARY OF AGENTS AND SHAPES ##
-################################################
-
-
-
-# Initialize a dictionary
-dict = {}
-
-# Iterate through the Agent Names and Agent Shape lists in parallel
-for agent,shape in zip(agentList,shapeList):
-   
-    # Generate a dictionary > Keys: Agent Names, Values: Agent Shapes
-    dict[agent] = shape
-
-    
-
-########################################
-## STORE LENGTH OF AGENT SHAPES LISTS ##
-########################################
-
-
-
-# Initialize a list
-lengths = []
-
-# Iterate through every list of Agent Shapes in the dictionary and add its length to the list
-for list_of_shapes in dict.values():
-    lengths.append(len(list_of_shapes))
-    
- 
-# Generate a cumulative sum of the lengths - this will act as a counter for buttons later
-counter = list(cumsum(lengths))
+# Get a stable index (i.e: slot) of every (Agent, Shape) pair
+shapeSlots = crowdIntrospection.shape_slots(agentShapesDict)
 
  
 
@@ -195,10 +142,6 @@ counter = list(cumsum(lengths))
 
 
 
-# Create a Button Group
-buttongroup = QtWidgets.QButtonGroup()
-
-
 # Define the "STYLESHEET GUI" Class    
 class StylesheetGUI(QtWidgets.QWidget):
 
@@ -221,48 +164,40 @@ class StylesheetGUI(QtWidgets.QWidget):
  
     def initUI(self):
  
-        # Set up the font
-        self.font = QtGui.QFont()
-        self.font.setBold(True)
-             
         # Apply a Grid Layout to the main window
         self.windowLayout = QtWidgets.QGridLayout()  
         self.setLayout(self.windowLayout)
-        
-        # Create the main Scroll Area
-        self.scrollMain = QtWidgets.QScrollArea()
-        self.scrollMain.setWidgetResizable(True)
 
-        # Add a Grid Layout to the main scroll area
-        self.scrollMainLayout = QtWidgets.QGridLayout()
-        self.scrollMain.setLayout(self.scrollMainLayout)        
-        
-        # Create the main widget where we will store everything
-        self.mainWidget = QtWidgets.QWidget()
-        
-        # Add a Grid Layout to the main widget
-        self.mainWidgetLayout = QtWidgets.QGridLayout()        
-        self.mainWidget.setLayout(self.mainWidgetLayout)
-                
-        # Link the main widget to the main scroll area
-        self.scrollMain.setWidget(self.mainWidget)
-        
-        # Add the main scroll area to the main window layout
-        self.windowLayout.addWidget(self.scrollMain)       
-        
-        
-        # Initialize a list to store labels
-        self.labelList = []
-     
-        # >>>> Run "addAgentName" method for each Agent Shape in the list
-        for i, (agent_in_dict, shapes_in_dict) in enumerate(dict.items()):
-            self.addAgentName(i, agent_in_dict, shapes_in_dict)
+        # Create a table with every Agent Shape and its texture
+        # NOTE: Only the visible rows are drawn, so big crowds open instantly
+        self.table = shapeTableView.ShapeTable(shapeSlots)
+        self.table.setMinimumSize(750, 400)
+        self.windowLayout.addWidget(self.table)
 
+        # Fill the shapes of known Agents with the textures used in previous shots
+        self.table.set_textures(texturePresets.preset_textures(shapeSlots, texturePresets.load_presets()))
                                    
         # Add a spacer to the main window layout
         self.spacer = QtWidgets.QSpacerItem(0,30)
         self.windowLayout.addItem(self.spacer)
      
+        # Add the "Match Folder" button to the main window layout
+        # (i.e: Fill every shape with the best matching texture in a folder)
+        self.matchButton = QtWidgets.QPushButton('Match Folder...')
+        self.matchButton.setMinimumSize(500,30)
+        self.matchButton.clicked.connect(self.matchFolder)
+        self.windowLayout.addWidget(self.matchButton)
+
+        # Add the "External file" checkbox to the main window layout
+        # (i.e: Write the Stylesheet to a file instead of storing it in the hip file)
+        self.externalCheckBox = QtWidgets.QCheckBox('Store the Stylesheet in an external file ($HIP/stylesheets)')
+        self.windowLayout.addWidget(self.externalCheckBox)
+
+        # Add the "Preflight textures" checkbox to the main window layout
+        # (i.e: Check every texture and convert it to a mip-mapped format before using it)
+        self.preflightCheckBox = QtWidgets.QCheckBox('Preflight textures (check files and convert them to mip-mapped RAT)')
+        self.windowLayout.addWidget(self.preflightCheckBox)
+
         # Add the "Generate Stylesheet" button to the main window layout
         self.applyButton = QtWidgets.QPushButton('GENERATE STYLESHEET')
         self.applyButton.setMinimumSize(500,30)
@@ -270,118 +205,52 @@ class StylesheetGUI(QtWidgets.QWidget):
         self.windowLayout.addWidget(self.applyButton)    
      
      
-    # CREATE LABEL NAMED AFTER THE AGENT
- 
-    def addAgentName(self, i, agent_in_dict, shapes_in_dict):
- 
-        # Create a widget to store the label
-        self.labelWidget = QtWidgets.QWidget()
-     
-        # Add a Grid Layout to the widget
-        self.labelWidgetLayout = QtWidgets.QGridLayout()
-        self.labelWidget.setLayout(self.labelWidgetLayout)
-     
-        # Create a label named after the agent, add it to the widget layout
-        self.label = QtWidgets.QLabel(agent_in_dict+' ({} shapes found)'.format(lengths[i]))
-        self.label.setFont(self.font)
-        self.labelWidgetLayout.addWidget(self.label)        
-     
-        # Add widget to the main widget layout
-        self.mainWidgetLayout.addWidget(self.labelWidget)
-                   
-        # >>>> Run "addShapes" method
-        self.addLabel(i, agent_in_dict, shapes_in_dict)
-     
-       
-    # CREATE A LABEL FOR EACH AGENT SHAPE  
- 
-    def addLabel(self, i, agent_in_dict, shapes_in_dict):     
-        
-        # Create a widget to store the labels
-        self.buttonWidget = QtWidgets.QWidget()
-        self.buttonWidget.setAutoFillBackground(True)
-        self.buttonWidget.setStyleSheet('background-color: #545454;')
-     
-        # Add a Grid Layout to the widget
-        self.buttonWidgetLayout = QtWidgets.QGridLayout()
-        self.buttonWidget.setLayout(self.buttonWidgetLayout)     
-     
-        # Add scroll area to the main widget layout
-        self.mainWidgetLayout.addWidget(self.buttonWidget)
-                             
-        # Iterate through the current agent's list of shapes
-        for j, shape in enumerate(shapes_in_dict):
-     
-            # Create a label named after the shape
-            self.label = QtWidgets.QLabel(shape)
- 
-            # Add label to the widget layout
-            self.buttonWidgetLayout.addWidget(self.label)
-               
-            # >>>> Run the "addButtons" method
-            self.addButtons(i, j, shape, shapes_in_dict)            
-                   
-               
-    # CREATE A BUTTON NEXT TO EACH LABEL
- 
-    def addButtons(self, i, j, shape, shapes_in_dict):  
-   
-        # Create a button
-        self.button = QtWidgets.QPushButton('Browse File')
-       
-        # CONDITIONAL: The first agent of the dictionary will have as "index" the index of the shape
-        # (i.e: Buttons will be indexed 0, 1, 2...)
-        if i == 0:
-            index = j
-           
-        # The rest of agents will have as "index" the index of the shape PLUS the length of the previous shape list
-        # (i.e: If the previous agent's buttons ended with index 2, this agent will start with index 3, 4, 5...)
-        else:
-            index = j + counter[i-1]
-     
-        # Add button to the group and tag it with an index    
-        buttongroup.addButton(self.button, index)
-       
-        # >>>> When button is clicked, run "chooseFile" method
-        self.button.clicked.connect(lambda: self.chooseFile(shape, index))
-     
-        # Add button to the widget layout and place it in the 2nd column
-        self.buttonWidgetLayout.addWidget(self.button, shapes_in_dict.index(shape), 1)
-     
-     
-    # BUTTON ACTION: LET THE USER CHOOSE A TEXTURE FILE
- 
-    def chooseFile(self, shape, index):
+    # MATCH FOLDER ACTION: FILL EVERY SHAPE WITH THE BEST MATCHING TEXTURE IN A FOLDER
 
-       
-        # Iterate through every button in the group
-        for button in buttongroup.buttons():
-               
-            # Applies the action to each button independently
-            if button is buttongroup.button(index):
-             
-                # Open a File Dialog, pick the name of the file and use it as the button's text
-                filename = QtWidgets.QFileDialog.getOpenFileName(self, 'Choose a texture file')
-                self.path = filename[0]
-                button.setText(self.path)           
+    def matchFolder(self):
+
+        # Let the user pick the folder with the textures
+        folder = QtWidgets.QFileDialog.getExistingDirectory(self, 'Choose a texture folder')
+        if not folder:
+            return
+
+        # Scan the folder once and match every shape against its textures
+        with shelfProfiler.phase('scan folder'):
+            index = textureMatcher.TextureIndex(folder)
+        with shelfProfiler.phase('match shapes'):
+            matches = index.match_slots(shapeSlots)
+
+        # Show the texture and its score next to every matched shape
+        # (shapes without a good match keep their current texture)
+        self.table.set_matches(matches)
+
+        matched = sum(1 for filepath, score in matches if filepath)
+        hou.ui.displayMessage('{} of {} shapes matched a texture in {} ({} textures found).'.format(
+            matched, len(matches), folder, len(index)))
+
+        shelfProfiler.report('Match Folder')
 
                
     # GENERATE BUTTON ACTION: STORE THE SELECTED FILES IN A LIST
  
     def generateButton(self):
  
-        # Initialize a list
-        self.buttonTextList = []
-     
-        # Pick the text on each button (i.e: file path) and add it to the list
-        for button in buttongroup.buttons():
-
-            if button.text() == 'Browse File':
-                self.buttonTextList.append('')
-            
-            else:
-                self.buttonTextList.append(button.text())     
-
+        # Pick the texture of every shape slot ('' for none)
+        self.buttonTextList = self.table.textures()
+
+        # Save the textures as presets for the next shots
+        texturePresets.save_presets(shapeSlots, self.buttonTextList)
+
+        # Group the shapes by texture content, so shapes using the same texture (or no texture at all)
+        # share a single material. If "Preflight textures" is checked, every texture is checked and
+        # its converted (mip-mapped) file is used instead
+        self.materials, self.slotMaterials, errors = crowdBuild.prepare_materials(
+            self.buttonTextList, preflight=self.preflightCheckBox.isChecked())
+
+        if errors:
+            hou.ui.displayMessage('Some textures are missing or couldn\'t be converted.',
+                                  severity=hou.severityType.Warning,
+                                  details='\n'.join(errors))
      
         # >>>> Run the "createMaterials" and "createStylesheet" methods
         self.createMaterials()
@@ -392,85 +261,35 @@ class StylesheetGUI(QtWidgets.QWidget):
    
     def createMaterials(self):
 
-        # Store the /mat/ context in a variable
-        self.mat = hou.node('/mat')
-               
-        # Initialize an auxiliary list      
-        auxList = []
-       
-        # Iterate through the dictionary and add all the Agent Shapes to the auxiliary list
-        """ The order in which they enter the list will be used as index
-        (i.e: For the first shape, we'll pick the File Path of the first button, etc.) """
-       
-        for agent_in_dict, shapes_in_dict in dict.items():
-            for shape in shapes_in_dict:
-                auxList.append(shape)
-
-                # Create a Principled Shader node pointing to the selected texture file
-                self.matNode = self.mat.createNode("principledshader", agent_in_dict+'_'+shape)
-                self.matNode.parm('basecolor_useTexture').set(True)
-                self.matNode.parm('basecolor_texture').set(self.buttonTextList[auxList.index(shape)])
-                 
-        # Layout nodes in the /mat/ context
-        self.mat.layoutChildren(horizontal_spacing=1.0, vertical_spacing=1.0)
+        # Create a Principled Shader per material in the /mat/ context (reusing the ones already there)
+        crowdBuild.build_mat_nodes(self.materials)
      
                      
     # GENERATE A STYLESHEET AND OVERRIDE MATERIALS
    
     def createStylesheet(self):
      
-        # Initialize a list where we will store the dictionaries
-        self.styleList = []              
+        # Create a style for each material, targeting every Agent Shape using it
+        # Only the styles that changed since the previous run (if any) are rewritten, or, if "External file"
+        # is checked, the Stylesheet is written to a file read by the Geometry node
+        changed, filepath = crowdBuild.build_stylesheet(geoNode, shapeSlots, self.slotMaterials,
+                                                        external=self.externalCheckBox.isChecked())
+
+        # Show how long every phase took (if profiling is enabled)
+        shelfProfiler.report('Material Stylesheets for Crowd')
 
-        # Create a dictionary (i.e: style) for each Agent Shape
-        for agent_in_dict, shapes_in_dict in dict.items():
-            for shape in shapes_in_dict:
-           
-                # Target geometry
-                self.subTargetDict = OrderedDict()
-                self.subTargetDict["label"] = "Sub-target"
-                self.subTargetDict["shape"] = shape
-             
-                self.targetDict = OrderedDict()
-                self.targetDict["label"] = "Target"
-                self.targetDict["subTarget"] = self.subTargetDict
-                         
-                # Override materials
-                self.nameDict = OrderedDict()
-                self.nameDict["type"] = "string"
-                self.nameDict["value"] = "/mat/{}_{}".format(agent_in_dict,shape)
-             
-                self.materialDict = OrderedDict()
-                self.materialDict["name"] = self.nameDict
-             
-                self.overridesDict = OrderedDict()
-                self.overridesDict["material"] = self.materialDict
-             
-                self.stylesDict = OrderedDict()
-                self.stylesDict["label"] = agent_in_dict+'_'+shape
-                self.stylesDict["target"] = self.targetDict
-                self.stylesDict["overrides"] = self.overridesDict
-             
-                # Add this dictionary to the Style list
-                self.styleList.append(self.stylesDict)
-         
-     
-        # Create the main dictionary and put inside the Style list
-        self.mainDict = OrderedDict()
-        self.mainDict["styles"] = self.styleList
-     
-        # Convert the dictionary into JSON format
-        self.json = json.dumps(self.mainDict,indent = 4)
-     
-        # Generate a Stylesheet using the JSON dictionary we just created
-        hou.styles.addStyle(geoNode.name()+'_stylesheet','',self.json)
-        
         # Throw a confirmation message and close the program
-        hou.ui.displayMessage('Material Stylesheet has been succesfully generated!')
+        if filepath:
+            hou.ui.displayMessage('Material Stylesheet has been succesfully written to {}'.format(filepath))
+        else:
+            hou.ui.displayMessage('Material Stylesheet has been succesfully generated! ({} styles updated)'.format(changed))
         self.close()
         
                       
 
 # >>>> RUN THE "STYLESHEETGUI" CLASS
-win = StylesheetGUI()
-win.show()
+with shelfProfiler.phase('open UI'):
+    win = StylesheetGUI()
+    win.show()
+
+shelfProfiler.report('Material Stylesheets UI')
@@ -5,11 +5,17 @@ Use this code if you are using models from mixamo.com for your Crowd sims
 and need to set up their joints for Foot Planting.
 
 Make sure to have your Agent node selected when clicking!
+
+This tool needs 'shelfProfiler.py' to be in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs).
 """
 
 # Import third-party modules.
 import crowdstoolutils
 
+# Import local modules.
+import shelfProfiler
+
 # Get the selected node.
 this_node = hou.selectedNodes()
 
@@ -23,7 +29,8 @@ null.setSelected(True, clear_all_selected=True)
 this_node = hou.selectedNodes()
 
 # Get the joints.
-joints = crowdstoolutils.buildTransformMenu(this_node[0])
+with shelfProfiler.phase("read joints"):
+    joints = crowdstoolutils.buildTransformMenu(this_node[0])
 
 # Create an Agent Prep node and connect it to the selected node.
 this_node = this_node[0]
@@ -91,7 +98,11 @@ for joint in joints:
         agent_prep_node.parm("hand2").set(joint)
 
 # Create Foot Plant CHOP Network.
-agent_prep_node.parm("createchopnet").pressButton()
+with shelfProfiler.phase("foot plant network"):
+    agent_prep_node.parm("createchopnet").pressButton()
 
 # Delete the auxiliary Null node.
 null.destroy()
+
+# Show how long every phase took (if profiling is enabled).
+shelfProfiler.report("Mixamo AgentPrep")
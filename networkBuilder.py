@@ -0,0 +1,171 @@
+"""
+NETWORK BUILDER
+---------------
+Build node networks from your shelf tools in a single batch.
+
+Creating nodes and setting parameters one at a time can trigger a recook
+and a network redraw after every call. This module queues those operations
+and applies them all at once.
+
+HOW IT WORKS
+------------
+- Create a NetworkBuilder and queue nodes, parameters and connections on it.
+  Queued nodes are returned as PendingNode objects, which you can use as
+  parents, inputs or parameter values of other queued operations.
+- Call APPLY() to run everything inside a single undo group, with cooking
+  suspended (Manual update mode). Networks are laid out once at the end.
+- After APPLY(), the real node is stored in the 'node' attribute of
+  every PendingNode.
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import third-party modules.
+import hou
+
+# Import local modules.
+import shelfProfiler
+
+
+class PendingNode():
+    """A node queued in a NetworkBuilder, created when the builder is applied."""
+
+
+    def __init__(self, parent, node_type, name=None):
+        """Store what we need to create the node later."""
+        self.parent = parent
+        self.node_type = node_type
+        self.name = name
+
+        # This will be the real node once the builder is applied.
+        self.node = None
+
+
+def resolve(value):
+    """Return the real node of a PendingNode (any other value is returned as is)."""
+    if isinstance(value, PendingNode):
+        return value.node
+
+    return value
+
+
+class NetworkBuilder():
+    """
+    Queue node creation, parameters and connections,
+    then apply them all at once with APPLY().
+    """
+
+
+    def __init__(self, label="Build network"):
+        """Initialize an empty queue."""
+        # Name of the undo group (e.g: "Undo Crowd to Solaris").
+        self.label = label
+
+        # Queued operations (functions with no arguments), in order.
+        self.operations = []
+
+        # Networks to lay out at the end, with their layout options.
+        self.layouts = {}
+
+
+    def create_node(self, parent, node_type, name=None, parms=None, inputs=()):
+        """Queue a new node and return it as a PendingNode."""
+        pending = PendingNode(parent, node_type, name)
+
+        def create():
+            # Create the node inside its (already created) parent.
+            if pending.name:
+                pending.node = resolve(pending.parent).createNode(pending.node_type, pending.name)
+            else:
+                pending.node = resolve(pending.parent).createNode(pending.node_type)
+
+        self.operations.append(create)
+
+        # Queue its parameters and connections right after creating it.
+        if parms:
+            self.set_parms(pending, parms)
+
+        for index, input_node in enumerate(inputs):
+            self.set_input(pending, index, input_node)
+
+        return pending
+
+
+    def set_parms(self, node, parms):
+        """Queue a dictionary of parameter values (Keys: Parm names, Values: values).
+
+        PendingNodes used as values are replaced by their node path.
+        NOTE: Set multiparm counts in an earlier call than their instances.
+        """
+        def apply_parms():
+            values = {}
+            for name, value in parms.items():
+                value = resolve(value)
+                values[name] = value.path() if isinstance(value, hou.Node) else value
+            resolve(node).setParms(values)
+
+        self.operations.append(apply_parms)
+
+
+    def set_expressions(self, node, expressions, language=None):
+        """Queue a dictionary of parameter expressions (Keys: Parm names, Values: expressions)."""
+        def apply_expressions():
+            if language is None:
+                resolve(node).setParmExpressions(expressions)
+            else:
+                resolve(node).setParmExpressions(expressions, language=language)
+
+        self.operations.append(apply_expressions)
+
+
+    def set_input(self, node, index, input_node):
+        """Queue a connection between two nodes."""
+        self.operations.append(
+            lambda: resolve(node).setInput(index, resolve(input_node)))
+
+
+    def call(self, function, *args):
+        """Queue any other operation (e.g: setting flags).
+
+        PendingNodes passed as arguments are replaced by their real nodes.
+        Example: builder.call(lambda node: node.setDisplayFlag(True), out_node)
+        """
+        self.operations.append(
+            lambda: function(*[resolve(arg) for arg in args]))
+
+
+    def layout(self, network, **kwargs):
+        """Lay out the children of a network once everything has been created."""
+        self.layouts[network] = kwargs
+
+
+    @shelfProfiler.profiled("apply network")
+    def apply(self):
+        """Run every queued operation in a single undo group, with cooking suspended."""
+        shelfProfiler.count("node ops", len(self.operations))
+
+        # Store the current update mode so we can restore it later.
+        update_mode = hou.updateModeSetting()
+
+        with hou.undos.group(self.label):
+            # Suspend cooking while the network is being built.
+            hou.setUpdateMode(hou.updateMode.Manual)
+
+            try:
+                for operation in self.operations:
+                    operation()
+
+                # Lay out every network just once.
+                for network, kwargs in self.layouts.items():
+                    resolve(network).layoutChildren(**kwargs)
+
+            finally:
+                # Restore the update mode (this cooks the new nodes if needed).
+                hou.setUpdateMode(update_mode)
+
+        # Empty the queue so the builder can be reused.
+        self.operations = []
+        self.layouts = {}
@@ -0,0 +1,300 @@
+"""
+SHAPE TABLE VIEW
+----------------
+A table listing every Agent Shape of a Crowd and its texture file.
+
+Used by 'crowdToSolaris.py' and 'materialStylesheetsGUI.py'.
+
+HOW IT WORKS
+------------
+- ShapeTableModel stores the Agent, Shape, texture file and match score of
+  every shape slot (see 'crowdIntrospection.shape_slots()'). Shapes are
+  grouped by Agent: the Agent name is only shown on its first shape.
+- ShapeTable is a QTableView showing that model. Unlike a widget per shape,
+  only the visible rows are drawn, so the window opens just as fast with
+  ten shapes as with ten thousand.
+- TextureDelegate edits the Texture column: double-click a texture (or
+  press F2) to type a path, or click on "..." to browse for a file. The
+  editor only exists while a cell is being edited.
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import built-in modules.
+import os
+
+# Import third-party modules.
+from PySide2 import QtCore, QtGui, QtWidgets
+
+# Columns of the table.
+AGENT_COLUMN, SHAPE_COLUMN, TEXTURE_COLUMN, SCORE_COLUMN = range(4)
+HEADERS = ("Agent", "Shape", "Texture", "Score")
+
+# Text shown in the Texture column of shapes without a texture.
+EMPTY_TEXTURE = "Browse File..."
+
+
+class ShapeTableModel(QtCore.QAbstractTableModel):
+    """Agent Shapes with their texture files and match scores."""
+
+
+    def __init__(self, shape_slots, parent=None):
+        """Store a list of (agent, shape) pairs, without textures."""
+        super(ShapeTableModel, self).__init__(parent)
+        self.shape_slots = list(shape_slots)
+        self.texture_list = [""] * len(self.shape_slots)
+        self.score_list = [None] * len(self.shape_slots)
+
+        # Number of shapes of every Agent, and the rows where a new Agent starts.
+        self.shape_counts = {}
+        self.first_rows = set()
+        for row, (agent, shape) in enumerate(self.shape_slots):
+            if agent not in self.shape_counts:
+                self.first_rows.add(row)
+            self.shape_counts[agent] = self.shape_counts.get(agent, 0) + 1
+
+        # Font of the Agent names.
+        self.bold_font = QtGui.QFont()
+        self.bold_font.setBold(True)
+
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        """Return the number of shapes."""
+        return 0 if parent.isValid() else len(self.shape_slots)
+
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        """Return the number of columns."""
+        return 0 if parent.isValid() else len(HEADERS)
+
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        """Return the name of every column."""
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return HEADERS[section]
+
+        return None
+
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        """Return what to show in every cell."""
+        if not index.isValid():
+            return None
+
+        row, column = index.row(), index.column()
+        agent, shape = self.shape_slots[row]
+        texture = self.texture_list[row]
+
+        if role == QtCore.Qt.DisplayRole:
+            if column == AGENT_COLUMN:
+                # Only show the Agent name on its first shape (i.e: group shapes by Agent).
+                if row in self.first_rows:
+                    return f"{agent} ({self.shape_counts[agent]} shapes)"
+                return ""
+            if column == SHAPE_COLUMN:
+                return shape
+            if column == TEXTURE_COLUMN:
+                return texture or EMPTY_TEXTURE
+            if column == SCORE_COLUMN:
+                score = self.score_list[row]
+                return "" if score is None else f"{score:.0%}"
+
+        elif role == QtCore.Qt.EditRole and column == TEXTURE_COLUMN:
+            return texture
+
+        elif role == QtCore.Qt.ToolTipRole:
+            if column == AGENT_COLUMN:
+                return agent
+            if column == TEXTURE_COLUMN and texture:
+                return texture
+
+        elif role == QtCore.Qt.FontRole and column == AGENT_COLUMN:
+            return self.bold_font
+
+        elif role == QtCore.Qt.ForegroundRole and column == TEXTURE_COLUMN and not texture:
+            return QtGui.QBrush(QtGui.QColor("grey"))
+
+        return None
+
+
+    def flags(self, index):
+        """Only the Texture column can be edited."""
+        flags = super(ShapeTableModel, self).flags(index)
+        if index.isValid() and index.column() == TEXTURE_COLUMN:
+            flags |= QtCore.Qt.ItemIsEditable
+
+        return flags
+
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        """Set the texture of a shape chosen by the user (its match score is cleared)."""
+        if not index.isValid() or index.column() != TEXTURE_COLUMN or role != QtCore.Qt.EditRole:
+            return False
+
+        self.set_texture(index.row(), value or "")
+
+        return True
+
+
+    def set_texture(self, row, texture, score=None):
+        """Set the texture (and optionally the match score) of a shape."""
+        self.texture_list[row] = texture
+        self.score_list[row] = score
+        self.dataChanged.emit(self.index(row, TEXTURE_COLUMN), self.index(row, SCORE_COLUMN))
+
+
+    def set_matches(self, matches):
+        """Set the textures found by 'textureMatcher' (a tuple of (texture, score) per slot).
+
+        Shapes without a match keep their current texture.
+        """
+        for row, (texture, score) in enumerate(matches):
+            if texture:
+                self.texture_list[row] = texture
+                self.score_list[row] = score
+
+        # Refresh the whole table at once.
+        if self.shape_slots:
+            self.dataChanged.emit(
+                self.index(0, TEXTURE_COLUMN),
+                self.index(len(self.shape_slots) - 1, SCORE_COLUMN))
+
+
+    def set_textures(self, textures):
+        """Set the texture of every slot, without a match score (e.g: from presets).
+
+        Shapes without a texture keep their current one.
+        """
+        self.set_matches([(texture, None) for texture in textures])
+
+
+    def textures(self):
+        """Return the texture file of every slot ("" for none)."""
+        return list(self.texture_list)
+
+
+class TextureEditor(QtWidgets.QWidget):
+    """A line edit with a "..." button to browse for a texture file."""
+
+    # Emitted when a file is picked with the "..." button.
+    fileChosen = QtCore.Signal()
+
+
+    def __init__(self, parent=None):
+        """Create the line edit and the button."""
+        super(TextureEditor, self).__init__(parent)
+        self.setAutoFillBackground(True)
+
+        self.lineEdit = QtWidgets.QLineEdit()
+        self.browseButton = QtWidgets.QToolButton()
+        self.browseButton.setText("...")
+        self.browseButton.clicked.connect(self.browse)
+
+        layout = QtWidgets.QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        layout.addWidget(self.lineEdit)
+        layout.addWidget(self.browseButton)
+        self.setLayout(layout)
+        self.setFocusProxy(self.lineEdit)
+
+
+    def browse(self):
+        """Let the user choose a texture file (starting in the current file's folder)."""
+        filename = QtWidgets.QFileDialog.getOpenFileName(
+            self,
+            "Choose a texture file",
+            os.path.dirname(self.lineEdit.text()))
+
+        if filename[0]:
+            self.lineEdit.setText(filename[0])
+            self.fileChosen.emit()
+
+
+class TextureDelegate(QtWidgets.QStyledItemDelegate):
+    """Edit the Texture column with a TextureEditor."""
+
+
+    def createEditor(self, parent, option, index):
+        """Create an editor for the cell being edited."""
+        editor = TextureEditor(parent)
+
+        # Store the file as soon as it's picked in the File Dialog.
+        editor.fileChosen.connect(lambda: self.commitAndClose(editor))
+
+        return editor
+
+
+    def commitAndClose(self, editor):
+        """Store the editor's file in the model and close it."""
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor, QtWidgets.QAbstractItemDelegate.NoHint)
+
+
+    def setEditorData(self, editor, index):
+        """Show the current texture in the editor."""
+        editor.lineEdit.setText(index.data(QtCore.Qt.EditRole))
+
+
+    def setModelData(self, editor, model, index):
+        """Store the editor's texture in the model."""
+        model.setData(index, editor.lineEdit.text().strip(), QtCore.Qt.EditRole)
+
+
+    def updateEditorGeometry(self, editor, option, index):
+        """Make the editor fill the cell."""
+        editor.setGeometry(option.rect)
+
+
+class ShapeTable(QtWidgets.QTableView):
+    """A table of Agent Shapes and their textures."""
+
+
+    def __init__(self, shape_slots, parent=None):
+        """Create the model and set up the view."""
+        super(ShapeTable, self).__init__(parent)
+
+        self.shapeModel = ShapeTableModel(shape_slots, self)
+        self.setModel(self.shapeModel)
+        self.textureDelegate = TextureDelegate(self)
+        self.setItemDelegateForColumn(TEXTURE_COLUMN, self.textureDelegate)
+
+        # Edit textures with a double-click, a click on a selected cell or F2.
+        self.setEditTriggers(
+            QtWidgets.QAbstractItemView.DoubleClicked
+            | QtWidgets.QAbstractItemView.SelectedClicked
+            | QtWidgets.QAbstractItemView.EditKeyPressed)
+        self.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.setAlternatingRowColors(True)
+        self.setWordWrap(False)
+
+        # Fixed row heights and column widths, so Qt never measures every row.
+        vertical_header = self.verticalHeader()
+        vertical_header.setVisible(False)
+        vertical_header.setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(24)
+
+        horizontal_header = self.horizontalHeader()
+        horizontal_header.setSectionResizeMode(QtWidgets.QHeaderView.Interactive)
+        horizontal_header.setSectionResizeMode(TEXTURE_COLUMN, QtWidgets.QHeaderView.Stretch)
+        self.setColumnWidth(AGENT_COLUMN, 200)
+        self.setColumnWidth(SHAPE_COLUMN, 200)
+        self.setColumnWidth(SCORE_COLUMN, 60)
+
+
+    def textures(self):
+        """Return the texture file of every slot ("" for none)."""
+        return self.shapeModel.textures()
+
+
+    def set_matches(self, matches):
+        """Set the textures found by 'textureMatcher' (a tuple of (texture, score) per slot)."""
+        self.shapeModel.set_matches(matches)
+
+
+    def set_textures(self, textures):
+        """Set the texture of every slot ("" keeps the current one)."""
+        self.shapeModel.set_textures(textures)
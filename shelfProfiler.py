@@ -0,0 +1,192 @@
+"""
+SHELF PROFILER
+--------------
+Find out which phase of a shelf tool is slow.
+
+Used by every shelf tool in this repository.
+
+HOW IT WORKS
+------------
+- Wrap the phases of a tool with 'with shelfProfiler.phase("name"):', or
+  decorate functions with '@shelfProfiler.profiled()'. Every phase stores
+  its wall time and how many times it ran.
+- COUNT() adds to a named counter (e.g: "node ops", which the Network
+  Builder increases by the number of node operations it applies).
+- REPORT() shows a summary in the Houdini status bar (or prints it when
+  there is no UI, e.g: hython) and, optionally, appends it as a JSON line
+  to a log file. Then every phase and counter starts from zero again.
+- The profiler is DISABLED by default, and then it costs nothing: PHASE()
+  returns a shared context manager that does nothing, PROFILED() returns the
+  function untouched, and COUNT() and REPORT() return right away.
+
+Enable it by setting these environment variables (e.g: in houdini.env):
+
+    SHELF_PROFILE = 1                              (status bar summary)
+    SHELF_PROFILE_LOG = $HOME/shelf_profile.jsonl  (JSON lines log)
+
+Or call ENABLE() from the Python Shell (decorators only notice it in
+modules imported afterwards).
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import built-in modules.
+import functools
+import json
+import os
+import time
+
+# Import third-party modules.
+import hou
+
+# Environment variables to enable the profiler and its log file.
+PROFILE_ENV = "SHELF_PROFILE"
+LOG_ENV = "SHELF_PROFILE_LOG"
+
+# Current settings.
+log_file = os.path.expandvars(os.environ.get(LOG_ENV, ""))
+enabled = bool(os.environ.get(PROFILE_ENV)) or bool(log_file)
+
+# Keys: phase names, Values: [wall time in seconds, number of calls].
+_phases = {}
+
+# Keys: counter names, Values: counts.
+_counts = {}
+
+
+class NullPhase():
+    """A phase that does nothing (used while the profiler is disabled)."""
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        return False
+
+
+# Shared by every phase while the profiler is disabled.
+NULL_PHASE = NullPhase()
+
+
+class Phase():
+    """Measure the wall time of a block of code."""
+
+    __slots__ = ("name", "start")
+
+
+    def __init__(self, name):
+        self.name = name
+        self.start = 0.0
+
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, *args):
+        seconds = time.perf_counter() - self.start
+        stored = _phases.setdefault(self.name, [0.0, 0])
+        stored[0] += seconds
+        stored[1] += 1
+        return False
+
+
+def enable(log=None):
+    """Enable the profiler (optionally logging to a JSON lines file)."""
+    global enabled, log_file
+    enabled = True
+    if log is not None:
+        log_file = log
+
+
+def disable():
+    """Disable the profiler and forget every measure."""
+    global enabled
+    enabled = False
+    reset()
+
+
+def phase(name):
+    """Return a context manager measuring a phase."""
+    if not enabled:
+        return NULL_PHASE
+
+    return Phase(name)
+
+
+def profiled(name=None):
+    """Decorate a function to measure every call as a phase (named after the function by default)."""
+    def decorator(function):
+        # Disabled: leave the function as it is (no extra cost per call).
+        if not enabled:
+            return function
+
+        label = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Phase(label):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name, amount=1):
+    """Add to a counter (e.g: "node ops")."""
+    if enabled:
+        _counts[name] = _counts.get(name, 0) + amount
+
+
+def summary():
+    """Return the phases and counters measured so far as a single line."""
+    parts = [
+        f"{name} {seconds:.3f}s" + (f" (x{calls})" if calls > 1 else "")
+        for name, (seconds, calls) in _phases.items()]
+    parts.extend(f"{name}: {amount}" for name, amount in _counts.items())
+
+    return " | ".join(parts)
+
+
+def reset():
+    """Forget every measure."""
+    _phases.clear()
+    _counts.clear()
+
+
+def report(tool):
+    """Show (and log) the measures of a tool, then start again from zero."""
+    if not enabled or not (_phases or _counts):
+        return
+
+    message = f"{tool}: {summary()}"
+    if hou.isUIAvailable():
+        hou.ui.setStatusMessage(message)
+    else:
+        print(message)
+
+    # Append a JSON line to the log file (if any).
+    # NOTE: A profiler should never break the tool, so errors writing the log are ignored.
+    if log_file:
+        record = {
+            "tool": tool,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "hip": hou.hipFile.path(),
+            "phases": {
+                name: {"seconds": seconds, "calls": calls}
+                for name, (seconds, calls) in _phases.items()},
+            "counts": dict(_counts)}
+        try:
+            with open(log_file, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            pass
+
+    reset()
@@ -0,0 +1,215 @@
+"""
+TEXTURE MATCHER
+---------------
+Find the texture of every Agent Shape in a texture folder automatically.
+
+Used by 'crowdToSolaris.py' and 'materialStylesheetsGUI.py'.
+
+HOW IT WORKS
+------------
+- TextureIndex scans a texture folder (and its subfolders) ONCE with
+  'os.scandir', and indexes every image by the words (e.g: "shirt", "red")
+  and trigrams (e.g: "shi", "hir", "irt") of its file name.
+- MATCH() splits an Agent Shape name the same way and only scores a few
+  candidates: the images in a folder named after the Agent or, if there
+  are none, the images sharing an uncommon trigram with the shape.
+  It returns the best one with a score between 0 and 1. Images in the Agent's
+  folder get a small bonus, and maps that are not a base color
+  (e.g: normal, roughness) a penalty.
+- MATCH_SLOTS() matches every (Agent, Shape) pair. Matches scoring below
+  MIN_SCORE are left empty, so the user can pick those by hand.
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import built-in modules.
+import os
+import re
+
+# Extensions of the files we consider textures.
+TEXTURE_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".tif", ".tiff", ".exr", ".tga", ".bmp", ".hdr", ".rat", ".tx")
+
+# Matches scoring below this are ignored.
+MIN_SCORE = 0.3
+
+# Maximum number of files scored per shape (files sharing only very common
+# trigrams with the shape are skipped).
+MAX_CANDIDATES = 500
+
+# Bonus for images inside a folder named after the Agent.
+AGENT_BONUS = 0.1
+
+# Penalty for images that are not a base color map.
+OTHER_MAP_PENALTY = 0.3
+
+# Words used in the file names of maps that are not a base color.
+OTHER_MAP_WORDS = {
+    "normal", "nrm", "nor", "bump", "disp", "displacement", "height", "rough", "roughness",
+    "spec", "specular", "metal", "metallic", "metalness", "gloss", "ao", "occlusion",
+    "opacity", "alpha", "mask", "emissive", "emission"}
+
+# Words that don't say anything about the shape (e.g: "shirt_diffuse" matches "shirt").
+IGNORED_WORDS = {
+    "diffuse", "diff", "basecolor", "base", "color", "colour", "albedo", "col", "tex",
+    "texture", "geo", "mesh", "shape"}
+
+# Boundaries between words: non alphanumeric characters, lower to upper case
+# changes and letter to number changes.
+WORD_SPLIT = re.compile(r"[^A-Za-z0-9]+|(?<=[a-z])(?=[A-Z])|(?<=[A-Za-z])(?=[0-9])|(?<=[0-9])(?=[A-Za-z])")
+
+
+def words(name):
+    """Return the lowercase words of a name (e.g: "Shirt_red01" > ["shirt", "red", "01"])."""
+    return [word.lower() for word in WORD_SPLIT.split(name) if word]
+
+
+def normalized(name):
+    """Return a name without case or separators (e.g: "Agent_Soldier" > "agentsoldier")."""
+    return "".join(words(name))
+
+
+def trigrams(name_words):
+    """Return the set of trigrams of a list of words (padded, so short words have some too)."""
+    result = set()
+    for word in name_words:
+        padded = f" {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    return result
+
+
+def scan_textures(root):
+    """Return every texture file inside a folder and its subfolders (one pass, no recursion)."""
+    filepaths = []
+    folders = [root]
+
+    while folders:
+        folder = folders.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                folders.append(entry.path)
+            elif entry.name.lower().endswith(TEXTURE_EXTENSIONS):
+                filepaths.append(entry.path.replace("\\", "/"))
+
+    return sorted(filepaths)
+
+
+class TextureIndex():
+    """An index of the texture files in a folder, to match them by name."""
+
+
+    def __init__(self, root):
+        """Scan the folder and index its textures by trigram."""
+        self.root = root
+        self.filepaths = scan_textures(root)
+
+        # Words of the name and trigrams of every file (by position in 'filepaths').
+        self.file_words = []
+        self.file_trigrams = []
+
+        # Keys: trigrams, Values: positions of the files using them.
+        self.trigram_files = {}
+
+        # Keys: folder names (see NORMALIZED()), Values: positions of the files inside them.
+        self.folder_files = {}
+
+        for position, filepath in enumerate(self.filepaths):
+            stem = os.path.splitext(os.path.basename(filepath))[0]
+            stem_words = words(stem)
+            stem_trigrams = trigrams(w for w in stem_words if w not in IGNORED_WORDS)
+
+            folders = os.path.dirname(os.path.relpath(filepath, root)).replace("\\", "/").split("/")
+            for folder in folders:
+                self.folder_files.setdefault(normalized(folder), set()).add(position)
+
+            self.file_words.append(set(stem_words))
+            self.file_trigrams.append(stem_trigrams)
+            for trigram in stem_trigrams:
+                self.trigram_files.setdefault(trigram, []).append(position)
+
+
+    def __len__(self):
+        """Return the number of indexed textures."""
+        return len(self.filepaths)
+
+
+    def agent_files(self, agent):
+        """Return the positions of the files inside a folder named after the Agent."""
+        return self.folder_files.get(normalized(agent), set())
+
+
+    def candidates(self, shape_trigrams, scope):
+        """Return the positions of the files worth scoring for a shape."""
+        # Few files named after the Agent (e.g: a folder per Agent): score all of them.
+        if scope and len(scope) <= MAX_CANDIDATES:
+            return scope
+
+        # Otherwise, pick the files sharing a trigram with the shape,
+        # skipping trigrams used by too many files (e.g: "par" in "part1", "part2"...).
+        postings = sorted(
+            (self.trigram_files[trigram] for trigram in shape_trigrams if trigram in self.trigram_files),
+            key=len)
+
+        positions = set()
+        for posting in postings:
+            if positions and len(posting) > MAX_CANDIDATES:
+                break
+            positions.update(posting)
+
+        return positions & scope if scope else positions
+
+
+    def match(self, shape, agent=""):
+        """Return the best texture for a shape as a tuple of (file path, score).
+
+        Returns ("", 0.0) if no texture shares anything with the shape name.
+        """
+        shape_trigrams = trigrams(w for w in words(shape) if w not in IGNORED_WORDS)
+        scope = self.agent_files(agent) if agent else set()
+
+        best, best_rank, best_score = "", 0.0, 0.0
+        for position in self.candidates(shape_trigrams, scope):
+            # Similarity of the trigram sets (Dice coefficient).
+            file_trigrams = self.file_trigrams[position]
+            if not file_trigrams:
+                continue
+            score = 2.0 * len(shape_trigrams & file_trigrams) / (len(shape_trigrams) + len(file_trigrams))
+            if not score:
+                continue
+
+            # Prefer textures in the Agent's folder, and base color maps.
+            if position in scope:
+                score += AGENT_BONUS
+            if self.file_words[position] & OTHER_MAP_WORDS:
+                score -= OTHER_MAP_PENALTY
+
+            # On a tie, keep the shortest (i.e: most specific) path.
+            filepath = self.filepaths[position]
+            if score > best_rank or (score == best_rank and len(filepath) < len(best)):
+                best, best_rank = filepath, score
+                best_score = max(0.0, min(score, 1.0))
+
+        return best, best_score
+
+
+    def match_slots(self, shape_slots, min_score=MIN_SCORE):
+        """Match every (Agent, Shape) pair.
+
+        Returns a list with a tuple of (file path, score) per slot.
+        Matches scoring below 'min_score' are returned as ("", score).
+        """
+        matches = []
+        for agent, shape in shape_slots:
+            filepath, score = self.match(shape, agent)
+            matches.append((filepath if score >= min_score else "", score))
+
+        return matches
@@ -0,0 +1,176 @@
+"""
+TEXTURE PREFLIGHT
+-----------------
+Check the textures chosen in the crowd tools and convert them to a tiled,
+mip-mapped format before they are used by any material.
+
+Used by 'crowdToSolaris.py' and 'materialStylesheetsGUI.py'.
+
+HOW IT WORKS
+------------
+- PREFLIGHT_TEXTURES() checks every texture on a thread pool: it makes sure
+  the file exists, reads its resolution and converts it (e.g: JPEG/PNG to RAT)
+  so the renderer only loads the mip levels it needs.
+- The converter is an external command. By default it's Houdini's 'imaketx',
+  but you can use any other one by setting the CROWD_TEXTURE_CONVERTER
+  environment variable (e.g: "maketx -o {output} {input}") and the extension
+  of its files with CROWD_TEXTURE_EXTENSION (e.g: ".tx").
+- Converted files are named after the SHA-1 of the texture content, so a
+  texture is only converted once, no matter how many paths point to it or how
+  many times you run the tools.
+- Textures that are already tiled (RAT/TX) are left as they are.
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import built-in modules.
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shlex
+import subprocess
+
+# Import third-party modules.
+import hou
+
+# Import local modules.
+import crowdMaterials
+
+# Environment variables to use another converter and file format.
+CONVERTER_ENV = "CROWD_TEXTURE_CONVERTER"
+EXTENSION_ENV = "CROWD_TEXTURE_EXTENSION"
+
+# Default converter command ({input} and {output} are replaced by the file paths).
+DEFAULT_CONVERTER = "imaketx {input} {output}"
+DEFAULT_EXTENSION = ".rat"
+
+# Extensions of textures that are already tiled and mip-mapped.
+TILED_EXTENSIONS = (".rat", ".tx")
+
+# Where converted textures are stored.
+CONVERTED_DIR = "$HIP/tex/converted"
+
+# Result of the preflight of a texture.
+# - 'texture': The file to use in materials (the converted one, if any).
+# - 'resolution': (width, height) of the original file, or None if it's missing.
+# - 'error': Why the file couldn't be used or converted ("" if everything went fine).
+PreflightResult = namedtuple("PreflightResult", ("texture", "resolution", "error"))
+
+
+def converter_command():
+    """Return the converter command template and the extension of its files."""
+    command = os.environ.get(CONVERTER_ENV) or DEFAULT_CONVERTER
+    extension = os.environ.get(EXTENSION_ENV) or DEFAULT_EXTENSION
+
+    return command, extension
+
+
+def converted_path(digest, extension, converted_dir=CONVERTED_DIR):
+    """Return where the converted file of a texture (by content hash) is stored."""
+    return os.path.join(hou.text.expandString(converted_dir), f"{digest}{extension}")
+
+
+def convert(filepath, output, command):
+    """Run the converter command on a texture. Returns an error message ("" if it worked)."""
+    # Convert to a temporary file first, so a failed conversion is never reused.
+    # NOTE: Keep the extension, converters use it to pick the file format.
+    root, extension = os.path.splitext(output)
+    temp_output = f"{root}.partial{extension}"
+
+    # Split the command BEFORE replacing the paths, so paths with spaces are kept whole.
+    arguments = [
+        argument.format(input=filepath, output=temp_output)
+        for argument in shlex.split(command)]
+
+    try:
+        process = subprocess.run(
+            arguments,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True)
+    except OSError as error:
+        return f"Can't run '{arguments[0]}': {error}"
+
+    if process.returncode != 0 or not os.path.isfile(temp_output):
+        return process.stderr.strip() or f"'{arguments[0]}' failed ({process.returncode})"
+
+    os.replace(temp_output, output)
+
+    return ""
+
+
+def preflight_texture(filepath, command, extension, converted_dir=CONVERTED_DIR):
+    """Check a texture file and convert it if needed. Returns a PreflightResult."""
+    if not os.path.isfile(filepath):
+        return PreflightResult(filepath, None, "File not found")
+
+    # Unreadable (or corrupt) images are reported, like missing files.
+    try:
+        resolution = tuple(hou.imageResolution(filepath))
+    except hou.Error as error:
+        return PreflightResult(filepath, None, str(error))
+
+    # Tiled textures don't need to be converted.
+    if filepath.lower().endswith(TILED_EXTENSIONS):
+        return PreflightResult(filepath, resolution, "")
+
+    # If this content was converted before, reuse it.
+    output = converted_path(crowdMaterials.texture_hash(filepath), extension, converted_dir)
+    if os.path.isfile(output):
+        return PreflightResult(output, resolution, "")
+
+    # Otherwise, convert it (keeping the original file if the conversion fails).
+    error = convert(filepath, output, command)
+
+    return PreflightResult(filepath if error else output, resolution, error)
+
+
+def preflight_textures(textures, workers=None, converted_dir=CONVERTED_DIR):
+    """Check and convert a list of texture files on a thread pool.
+
+    Empty paths are ignored, and every file is checked only once.
+    Returns a dictionary (Keys: texture files, Values: PreflightResults).
+    NOTE: Threads mostly wait for the converter processes and the disk.
+    """
+    filepaths = list(dict.fromkeys(filepath for filepath in textures if filepath))
+    if not filepaths:
+        return {}
+
+    # Create the folder of the converted files.
+    folder = hou.text.expandString(converted_dir)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    command, extension = converter_command()
+    workers = min(workers or os.cpu_count() or 1, len(filepaths))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(
+            lambda filepath: preflight_texture(filepath, command, extension, converted_dir),
+            filepaths)
+
+        return dict(zip(filepaths, results))
+
+
+def preflight_materials(materials, workers=None):
+    """Check and convert the texture of every material.
+
+    'materials' is a dictionary (Keys: Material names, Values: texture files).
+    Returns a tuple of:
+    - The same dictionary, using the converted texture files.
+    - A list of error messages (one per texture with problems).
+    """
+    results = preflight_textures(materials.values(), workers)
+
+    converted = {
+        name: results[texture].texture if texture else texture
+        for name, texture in materials.items()}
+
+    errors = [
+        f"{filepath}: {result.error}"
+        for filepath, result in results.items() if result.error]
+
+    return converted, errors
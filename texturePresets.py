@@ -0,0 +1,113 @@
+"""
+TEXTURE PRESETS
+---------------
+Remember the texture of every Agent Shape between shots.
+
+Used by 'crowdToSolaris.py' and 'materialStylesheetsGUI.py'.
+
+HOW IT WORKS
+------------
+- Every time you apply textures, SAVE_PRESETS() stores them per Agent
+  definition (Keys: Agent names, Values: {shape: texture}) in a preset file.
+- When the tools open, LOAD_PRESETS() reads that file and PRESET_TEXTURES()
+  fills every shape of a known Agent with its texture, so re-texturing a
+  sequence doesn't need a single File Dialog.
+- The preset file is $CROWD_TEXTURE_PRESETS if it's set, $JOB/crowd_texture_presets.json
+  if $JOB is set (i.e: shared by every shot of a show), or
+  $HOUDINI_USER_PREF_DIR/crowd_texture_presets.json otherwise.
+- The file is versioned: {"version": 1, "agents": {...}}. Files with another
+  version are ignored (and replaced the next time presets are saved).
+  It can also be used as the mapping file of 'crowdBatch.py'.
+
+IMPORTANT
+---------
+Make sure this file is in your Houdini Python path
+(e.g: $HOUDINI_USER_PREF_DIR/python3.7libs) so the shelf tools can import it.
+"""
+
+# Import built-in modules.
+import json
+import os
+
+# Import third-party modules.
+import hou
+
+# Version of the preset file format. Files with another version are ignored.
+PRESETS_VERSION = 1
+
+# Environment variable to use another preset file.
+PRESETS_ENV = "CROWD_TEXTURE_PRESETS"
+
+# Name of the preset file in $JOB or $HOUDINI_USER_PREF_DIR.
+PRESETS_FILE = "crowd_texture_presets.json"
+
+
+def presets_path():
+    """Return the path of the preset file."""
+    filepath = os.environ.get(PRESETS_ENV)
+    if filepath:
+        return hou.text.expandString(filepath)
+
+    folder = hou.getenv("JOB") or hou.getenv("HOUDINI_USER_PREF_DIR") or ""
+
+    return os.path.join(folder, PRESETS_FILE)
+
+
+def load_presets(filepath=None):
+    """Return the presets in a file (Keys: Agent names, Values: {shape: texture}).
+
+    Returns an empty dictionary if the file doesn't exist or has another version.
+    """
+    filepath = filepath or presets_path()
+
+    try:
+        with open(filepath) as f:
+            presets = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(presets, dict) or presets.get("version") != PRESETS_VERSION:
+        return {}
+
+    return presets.get("agents", {})
+
+
+def preset_textures(shape_slots, presets):
+    """Return the texture of every (Agent, Shape) pair in the presets ("" for none)."""
+    return [presets.get(agent, {}).get(shape, "") for agent, shape in shape_slots]
+
+
+def save_presets(shape_slots, textures, filepath=None):
+    """Store the texture of every slot in the preset file.
+
+    Textures of other Agents (and other shapes of the same Agents) are kept.
+    Shapes without a texture don't remove the texture stored for them.
+    """
+    filepath = filepath or presets_path()
+    presets = load_presets(filepath)
+
+    # Merge the new textures into the stored ones.
+    changed = False
+    for (agent, shape), texture in zip(shape_slots, textures):
+        if texture and presets.get(agent, {}).get(shape) != texture:
+            presets.setdefault(agent, {})[shape] = texture
+            changed = True
+
+    if not changed:
+        return
+
+    # If the file can't be written (e.g: read-only folder), just don't store the presets.
+    try:
+        # Create the folder if needed.
+        folder = os.path.dirname(filepath)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+
+        # Write to a temporary file first, so other shots never read a half-written file.
+        temp_filepath = f"{filepath}.tmp"
+        with open(temp_filepath, "w") as f:
+            json.dump({"version": PRESETS_VERSION, "agents": presets}, f, indent=1, sort_keys=True)
+
+        os.replace(temp_filepath, filepath)
+    except OSError:
+        pass
@@ -0,0 +1,197 @@
+"""
+THUMBNAIL WORKER
+----------------
+Headless worker rendering the thumbnails of 'agentBrowser_v2.py'.
+
+HOW IT WORKS
+------------
+- Run with 'hython thumbnailWorker.py [--renderer NAME] [--size PIXELS]'.
+- Reads a JSON list of .FBX files from stdin.
+- Renders the thumbnail of every file (a .JPEG next to it, see
+  'agentCatalog.thumbnail_path()') and prints one JSON line per file as soon
+  as it's done: {"fbx": ..., "thumbnail": ..., "error": ...} ("" if it worked).
+- Renderers are functions taking (fbx_path, thumbnail_path, size). The
+  default one ("opengl") frames the character from the front and renders it
+  with an OpenGL ROP. To use your own, set --renderer (or $AGENT_THUMBNAIL_RENDERER)
+  to "<module>.<function>" (the module must be in the Python path).
+- The Agent Browser runs a few of these workers at the same time
+  ($AGENT_THUMBNAIL_WORKERS, 4 by default), so Houdini stays responsive.
+  NOTE: Every 'hython' process uses a license.
+
+IMPORTANT
+---------
+Keep this file next to 'agentCatalog.py' and 'directoryScanner.py'
+(e.g: in $HOUDINI_USER_PREF_DIR/python3.7libs).
+"""
+
+# Import built-in modules.
+import argparse
+import importlib
+import json
+import os
+import sys
+
+# Make sure we can import the modules living next to this script.
+# NOTE: Only when it runs as a worker, so importing it (e.g: from the Agent Browser)
+# doesn't change the Python path of the Houdini session.
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Import third-party modules.
+import hou
+
+# Import local modules.
+import agentCatalog
+
+# Script run by every worker process.
+WORKER_SCRIPT = os.path.abspath(__file__)
+
+# Environment variables to pick the renderer and the number of workers.
+RENDERER_ENV = "AGENT_THUMBNAIL_RENDERER"
+WORKERS_ENV = "AGENT_THUMBNAIL_WORKERS"
+
+# Default number of workers, and size of the thumbnails (in pixels).
+WORKERS = 4
+SIZE = 720
+
+# Space around the character (1.0: the character touches the edges).
+FRAME_PADDING = 1.1
+
+
+def render_opengl(fbx_path, thumbnail, size):
+    """Render a character from the front with an OpenGL ROP."""
+    obj = hou.node("/obj")
+    nodes = []
+
+    try:
+        # Create a Geometry node with an Agent node reading the .FBX file.
+        geo = obj.createNode("geo", "thumbnail_agent")
+        nodes.append(geo)
+        agent_node = geo.createNode("agent")
+        agent_node.parm("input").set(2)
+        agent_node.parm("fbxfile").set(fbx_path)
+
+        # Frame the bounding box of the character from the front
+        # (there's no viewport here, so we place an orthographic camera ourselves).
+        bbox = agent_node.geometry().boundingBox()
+        center, size_vector = bbox.center(), bbox.sizevec()
+
+        cam_node = obj.createNode("cam", "thumbnail_cam")
+        nodes.append(cam_node)
+        cam_node.parmTuple("res").set((size, size))
+        cam_node.parm("projection").set(1)
+        cam_node.parmTuple("t").set((center[0], center[1], bbox.maxvec()[2] + size_vector[2] + 1))
+        cam_node.parm("orthowidth").set(max(size_vector[0], size_vector[1]) * FRAME_PADDING)
+
+        # Create an OpenGL node in /out and render the current frame.
+        opengl_node = hou.node("/out").createNode("opengl", "thumbnail_opengl")
+        nodes.append(opengl_node)
+        opengl_node.parm("trange").set(0)
+        opengl_node.parm("camera").set(cam_node.path())
+        opengl_node.parm("picture").set(thumbnail)
+        opengl_node.parm("vobjects").set(geo.name())
+        opengl_node.render()
+
+    finally:
+        # Clean up the network for the next character.
+        for node in reversed(nodes):
+            node.destroy()
+
+
+# Keys: renderer names, Values: functions taking (fbx_path, thumbnail_path, size).
+RENDERERS = {"opengl": render_opengl}
+
+
+def get_renderer(name):
+    """Return a renderer by name, or by import path ("<module>.<function>")."""
+    if name in RENDERERS:
+        return RENDERERS[name]
+
+    module_name, function_name = name.rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def partial_path(fbx_path):
+    """Return the temporary file a thumbnail is rendered to (renamed once it's complete)."""
+    root, extension = os.path.splitext(agentCatalog.thumbnail_path(fbx_path))
+    return f"{root}.partial{extension}"
+
+
+def remove_partial(fbx_path):
+    """Remove the temporary file of a thumbnail, if any (e.g: after killing its worker)."""
+    try:
+        os.remove(partial_path(fbx_path))
+    except OSError:
+        pass
+
+
+def render_thumbnail(renderer, fbx_path, size):
+    """Render the thumbnail of an .FBX file. Returns a result dictionary."""
+    thumbnail = agentCatalog.thumbnail_path(fbx_path)
+
+    # Render to a temporary file first, so the Agent Browser never loads half a thumbnail.
+    partial = partial_path(fbx_path)
+
+    try:
+        renderer(fbx_path, partial, size)
+        os.replace(partial, thumbnail)
+        error = ""
+    except Exception as e:
+        error = f"{fbx_path}: {e}"
+        remove_partial(fbx_path)
+
+    return {"fbx": fbx_path, "thumbnail": thumbnail, "error": error}
+
+
+def worker_count():
+    """Return the number of workers to run at the same time."""
+    try:
+        return max(1, int(os.environ.get(WORKERS_ENV, WORKERS)))
+    except ValueError:
+        return WORKERS
+
+
+def worker_arguments(renderer=None, size=SIZE):
+    """Return the command line arguments of a worker (to run with 'hython')."""
+    renderer = renderer or os.environ.get(RENDERER_ENV) or "opengl"
+    return [WORKER_SCRIPT, "--renderer", renderer, "--size", str(size)]
+
+
+def parse_result(line):
+    """Return the result printed by a worker on a line of its output, or None for any other line."""
+    line = line.strip()
+    if not line.startswith("{"):
+        return None
+
+    try:
+        result = json.loads(line)
+    except ValueError:
+        return None
+
+    return result if isinstance(result, dict) and "fbx" in result else None
+
+
+def parse_args(argv=None):
+    """Return the command line options."""
+    parser = argparse.ArgumentParser(
+        description="Render the thumbnails of a JSON list of .FBX files read from stdin.")
+    parser.add_argument(
+        "--renderer", default=os.environ.get(RENDERER_ENV) or "opengl",
+        help="Renderer name (e.g: opengl) or import path (<module>.<function>).")
+    parser.add_argument(
+        "--size", type=int, default=SIZE,
+        help="Width and height of the thumbnails, in pixels.")
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    renderer = get_renderer(args.renderer)
+
+    # Read the list of .FBX files.
+    fbx_paths = json.load(sys.stdin)
+
+    # Render them one at a time, and print every result as soon as it's ready.
+    for fbx_path in fbx_paths:
+        print(json.dumps(render_thumbnail(renderer, fbx_path, args.size)), flush=True)